@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+_config = getattr(settings, 'ACCOUNT_AUTH', {})
+USER_CACHE_TIMEOUT = _config.get('USER_CACHE_TIMEOUT', 60)
+
+
+def user_cache_key(user_id):
+    return f'account:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that keeps loaded users in the cache for a short TTL.
+
+    Used where a real CustomUser instance is needed (djoser's user endpoints,
+    the browsable API). Saving or deleting a user drops its cache entry.
+    """
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
+
+
+class StatelessJWTAuthentication(CachedJWTAuthentication):
+    """
+    Authorizes reads from the token claims alone, without a user query.
+
+    For safe methods request.user is a TokenUser; `role`, `is_staff` and
+    `is_superuser` come from the claims added by RoleTokenObtainPairSerializer
+    and restamped on every refresh, so reads see the role as it was when the
+    access token was minted. Writes, and tokens issued before the role claim
+    existed, load the user through the cache, so a role change or
+    deactivation applies to them right away.
+    """
+    load_user = False
+
+    def authenticate(self, request):
+        self.load_user = request.method not in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if (self.load_user or 'role' not in validated_token
+                or api_settings.USER_ID_CLAIM not in validated_token):
+            return super().get_user(validated_token)
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+
+class QueryTokenJWTAuthentication(StatelessJWTAuthentication):
+    """
+    Reads the access token from the ``token`` query parameter, for browser
+    EventSource clients, which cannot send an Authorization header. URLs end
+    up in access logs, so only the stream accepts it.
+    """
+    query_param = 'token'
+
+    def authenticate(self, request):
+        raw_token = request.query_params.get(self.query_param)
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token.encode())
+        return self.get_user(validated_token), validated_token
+
+
+# For API views that only need the user's id and role. JWT comes first so
+# the common case never reaches the password hash in BasicAuthentication.
+STATELESS_AUTHENTICATION_CLASSES = [
+    StatelessJWTAuthentication,
+    SessionAuthentication,
+    BasicAuthentication,
+]
@@ -1,3 +1,93 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from account.models import CustomUser
+from stock.models import Company
+
+
+PASSWORD = 'pw12345!'
+
+
+class RoleClaimTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email='editor@example.com', password=PASSWORD, role='editor',
+            first_name='Ed', last_name='Itor', phone_no='1', gender='male'
+        )
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+
+    def tokens(self):
+        response = self.client.post('/auth/jwt/create/', {'email': self.user.email, 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def user_queries(self, method, path, token, **data):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data, HTTP_AUTHORIZATION=f'Bearer {token}')
+        return response.status_code, [q for q in queries.captured_queries if 'account_customuser' in q['sql']]
+
+    def test_tokens_carry_role_claims(self):
+        access = AccessToken(self.tokens()['access'])
+        self.assertEqual((access['role'], access['is_staff'], access['is_superuser']), ('editor', False, False))
+
+    def test_reads_skip_the_user_query(self):
+        access = self.tokens()['access']
+        for path in ('/api/companies/', '/api/companies/async/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.user_queries('get', path, access), (200, []))
+        # djoser still gets a real user
+        response = self.client.get('/auth/users/me/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.json()['email'], self.user.email)
+
+    def test_tokens_without_role_load_the_user_through_the_cache(self):
+        legacy = str(AccessToken.for_user(self.user))
+        status, queries = self.user_queries('get', '/api/companies/', legacy)
+        self.assertEqual((status, len(queries)), (200, 1))
+        self.assertEqual(self.user_queries('get', '/api/companies/', legacy), (200, []))
+        # Saving the user drops the cached copy
+        self.user.save()
+        status, queries = self.user_queries('get', '/api/companies/async/', legacy)
+        self.assertEqual((status, len(queries)), (200, 1))
+
+    def test_writes_use_the_current_user(self):
+        self.user.role = 'admin'
+        self.user.save()
+        access = self.tokens()['access']
+        self.user.role = 'editor'
+        self.user.save()
+
+        # Reads trust the claim, writes see the demotion
+        self.assertEqual(self.client.get('/api/companies/', HTTP_AUTHORIZATION=f'Bearer {access}').status_code, 200)
+        response = self.client.delete(f'/api/companies/{self.company.pk}/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 403)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post('/api/companies/', {'name': 'New', 'symbol': 'NEW'},
+                                    HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_restamps_claims(self):
+        refresh = self.tokens()['refresh']
+        self.user.role = 'admin'
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.client.post('/auth/jwt/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 200, response.content)
+        access = AccessToken(response.json()['access'])
+        self.assertEqual((access['role'], access['is_staff']), ('admin', True))
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post('/auth/jwt/refresh/', {'refresh': response.json()['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_deleted_users_get_no_tokens(self):
+        refresh = self.tokens()['refresh']
+        self.user.delete()
+        self.assertEqual(self.client.post('/auth/jwt/refresh/', {'refresh': refresh}).status_code, 401)
@@ -0,0 +1,24 @@
+"""
+Gunicorn settings for both deployments of the API.
+
+    # Sync (WSGI) workers
+    gunicorn -c gunicorn.conf.py stockscrapper.wsgi:application
+
+    # Async (ASGI) workers, serving the /api/companies/async/ endpoints on the event loop
+    GUNICORN_ASGI=1 gunicorn -c gunicorn.conf.py stockscrapper.asgi:application
+
+Compare the two with ``python manage.py loadtest``.
+"""
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+if os.environ.get('GUNICORN_ASGI'):
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
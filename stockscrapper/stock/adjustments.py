@@ -0,0 +1,162 @@
+"""
+Split/bonus/rights adjustment of price history.
+
+Each CorporateAction contributes a factor to every price dated before its
+ex_date. The running products are materialized in PriceAdjustment, one row
+per ex_date, and updated incrementally when an action is added, so reading an
+adjusted series costs one small query plus a searchsorted over the dates.
+"""
+from itertools import groupby
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+
+from .models import CorporateAction, PriceAdjustment, PriceHistory
+
+
+def action_factor(action: CorporateAction) -> float:
+    """
+    Price multiplier for rows before the action's ex_date.
+
+    Bonus shares and splits divide the price by the new share count. A rights
+    issue uses the theoretical ex-rights price against the last close before
+    ex_date; without such a close there is nothing to adjust.
+    """
+    ratio = float(action.ratio)
+    if action.action_type != 'rights' or not action.issue_price:
+        return 1 / (1 + ratio)
+
+    last_close = (
+        PriceHistory.objects.filter(company_id=action.company_id, date__lt=action.ex_date)
+        .order_by('-date')
+        .values_list('close_price', flat=True)
+        .first()
+    )
+    if not last_close:
+        return 1.0
+    last_close = float(last_close)
+    ex_rights = (last_close + float(action.issue_price) * ratio) / (1 + ratio)
+    return ex_rights / last_close
+
+
+def apply_corporate_action(action: CorporateAction) -> None:
+    """
+    Fold a newly added action into the materialized factors of its company.
+
+    Every segment ending on or before the ex_date picks up the new factor, and
+    the segment that the ex_date falls inside is split in two.
+    """
+    factor = action_factor(action)
+    with transaction.atomic():
+        adjustments = PriceAdjustment.objects.select_for_update().filter(company_id=action.company_id)
+        adjustments.filter(ex_date__lte=action.ex_date).update(factor=F('factor') * factor)
+
+        if adjustments.filter(ex_date=action.ex_date).exists():
+            return
+
+        following = adjustments.filter(ex_date__gt=action.ex_date).order_by('ex_date').first()
+        PriceAdjustment.objects.create(
+            company_id=action.company_id,
+            ex_date=action.ex_date,
+            factor=factor * (following.factor if following else 1.0)
+        )
+
+
+def rebuild_adjustments(company_id) -> None:
+    """
+    Recompute a company's factors from all of its actions, for edits and
+    deletes that the incremental path cannot express.
+    """
+    actions = sorted(
+        CorporateAction.objects.filter(company_id=company_id),
+        key=lambda action: action.ex_date,
+        reverse=True
+    )
+    rows = []
+    cumulative = 1.0
+    for ex_date, same_day in groupby(actions, key=lambda action: action.ex_date):
+        for action in same_day:
+            cumulative *= action_factor(action)
+        rows.append(PriceAdjustment(company_id=company_id, ex_date=ex_date, factor=cumulative))
+
+    with transaction.atomic():
+        PriceAdjustment.objects.filter(company_id=company_id).delete()
+        PriceAdjustment.objects.bulk_create(rows)
+
+
+def refresh_rights_factors(company_id, first, last) -> bool:
+    """
+    Rebuild a company's factors when prices saved between ``first`` and
+    ``last`` include the last close before a rights issue's ex_date, which
+    its factor is computed from. Returns whether a rebuild ran.
+    """
+    actions = CorporateAction.objects.filter(
+        company_id=company_id, action_type='rights', issue_price__gt=0, ex_date__gt=first
+    )
+    for ex_date in actions.values_list('ex_date', flat=True).distinct():
+        cum_date = (
+            PriceHistory.objects.filter(company_id=company_id, date__lt=ex_date)
+            .order_by('-date')
+            .values_list('date', flat=True)
+            .first()
+        )
+        if cum_date is not None and first <= cum_date <= last:
+            rebuild_adjustments(company_id)
+            return True
+    return False
+
+
+def adjustment_table(company):
+    return list(
+        PriceAdjustment.objects.filter(company=company)
+        .order_by('ex_date')
+        .values_list('ex_date', 'factor')
+    )
+
+
+async def aadjustment_table(company):
+    return [
+        row async for row in
+        PriceAdjustment.objects.filter(company=company)
+        .order_by('ex_date')
+        .values_list('ex_date', 'factor')
+    ]
+
+
+def factors_for(table, dates) -> np.ndarray:
+    """
+    Factor for each of ``dates`` given ``adjustment_table`` output
+    """
+    if not table:
+        return np.ones(len(dates))
+    ex_dates = np.array([ex_date for ex_date, _ in table], dtype='datetime64[D]')
+    factors = np.append([factor for _, factor in table], 1.0)
+    return factors[np.searchsorted(ex_dates, np.array(dates, dtype='datetime64[D]'), side='right')]
+
+
+def adjust_rows(table, rows) -> list[tuple]:
+    """
+    Adjust ``PRICE_HISTORY_COLUMNS`` rows; prices come back as floats
+    """
+    if not table or not rows:
+        return rows
+    factors = factors_for(table, [row[0] for row in rows])
+    return [
+        (day, float(o) * f, float(h) * f, float(l) * f, float(c) * f, round(volume / f))
+        for (day, o, h, l, c, volume), f in zip(rows, factors)
+    ]
+
+
+def adjust_serialized(table, items) -> list[dict]:
+    """
+    Adjust PriceHistorySerializer output in place
+    """
+    if not table or not items:
+        return items
+    factors = factors_for(table, [item['date'] for item in items])
+    for item, factor in zip(items, factors):
+        for field in ('open_price', 'high_price', 'low_price', 'close_price'):
+            item[field] = f'{float(item[field]) * factor:.2f}'
+        item['volume'] = round(item['volume'] / factor)
+    return items
@@ -1,5 +1,106 @@
+import csv
+
 from django.contrib import admin
-from .models import Company, PriceHistory
+from django.core.paginator import Paginator
+from django.db import connection
+from django.http import QueryDict, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .adjustments import rebuild_adjustments
+from .models import (
+    Company, CorporateAction, PageFingerprint, PriceAdjustment, PriceHistory, QuarantinedPriceRow, ScrapeTask
+)
+
+
+# Below this many rows an exact COUNT(*) is cheap enough to keep
+EXACT_COUNT_THRESHOLD = 100000
+
+
+def estimated_row_count(model):
+    """
+    Approximate row count of a model's table without scanning it, or None
+    when the database has no cheap estimate.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            # Rowids only grow, so this over-counts by the number of deleted rows
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reports the table estimate instead of running COUNT(*)
+    when the changelist is unfiltered and the table is large.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model)
+            if estimate is not None and estimate > EXACT_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class Echo:
+    """
+    File-like object that hands csv.writer's output straight back.
+    """
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class CompanySymbolFilter(admin.SimpleListFilter):
+    """
+    Company filter with a text box and autocomplete suggestions instead of
+    a link for every company.
+    """
+    title = 'company'
+    parameter_name = 'company_symbol'
+    template = 'admin/stock/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(company__symbol=self.value().strip().upper())
+        return queryset
+
+    def choices(self, changelist):
+        query_string = changelist.get_query_string(remove=[self.parameter_name, 'p'])
+        yield {
+            'parameter_name': self.parameter_name,
+            'value': self.value() or '',
+            'query_parts': QueryDict(query_string.lstrip('?')).lists(),
+            'autocomplete_url': '{}?app_label={}&model_name={}&field_name=company'.format(
+                reverse('admin:autocomplete'),
+                changelist.opts.app_label,
+                changelist.opts.model_name,
+            ),
+        }
+
+
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'symbol', 'sector', 'email', 'created_at', 'updated_at')
@@ -72,10 +173,14 @@ class PriceHistorySerializer(serializers.ModelSerializer):
 @admin.register(PriceHistory)
 class PriceHistoryAdmin(admin.ModelAdmin):
     list_display = ('company', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
-    list_filter = ('company', 'date')
+    list_filter = (CompanySymbolFilter, 'date')
     search_fields = ('company__name', 'company__symbol')
-    date_hierarchy = 'date'
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('company',)
+    list_select_related = ('company',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    actions = ['export_csv']
     
     fieldsets = (
         ('Company Information', {
@@ -117,6 +222,89 @@ class PriceHistoryAdmin(admin.ModelAdmin):
             
         super().save_model(request, obj, form, change)
 
-    # # Custom list display formatting
-    # def get_queryset(self, request):
-    #     return super().get_queryset(request).select_related('company')
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('company')
+
+    @admin.action(description='Export selected rows as CSV')
+    def export_csv(self, request, queryset):
+        columns = ['company__symbol', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+        rows = queryset.order_by('company__symbol', 'date').values_list(*columns).iterator(chunk_size=2000)
+        header = ['symbol', 'date', 'open', 'high', 'low', 'close', 'volume']
+        response = StreamingHttpResponse(stream_csv(header, rows), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="price_history.csv"'
+        return response
+
+
+@admin.register(QuarantinedPriceRow)
+class QuarantinedPriceRowAdmin(admin.ModelAdmin):
+    list_display = ('company', 'date', 'reason', 'source', 'reviewed', 'created_at')
+    list_filter = ('reviewed', 'source', 'reason')
+    search_fields = ('company__name', 'company__symbol')
+    readonly_fields = ('company', 'date', 'reason', 'source', 'data', 'created_at')
+    actions = ['mark_reviewed']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('company')
+
+    @admin.action(description='Mark selected rows as reviewed')
+    def mark_reviewed(self, request, queryset):
+        updated = queryset.update(reviewed=True)
+        self.message_user(request, f'{updated} rows marked as reviewed')
+
+
+@admin.register(CorporateAction)
+class CorporateActionAdmin(admin.ModelAdmin):
+    list_display = ('company', 'action_type', 'ex_date', 'ratio', 'issue_price', 'created_at')
+    list_filter = ('action_type', 'ex_date')
+    search_fields = ('company__name', 'company__symbol')
+    autocomplete_fields = ('company',)
+    list_select_related = ('company',)
+    actions = ['rebuild']
+
+    @admin.action(description='Rebuild adjustment factors for the selected companies')
+    def rebuild(self, request, queryset):
+        company_ids = set(queryset.values_list('company_id', flat=True))
+        for company_id in company_ids:
+            rebuild_adjustments(company_id)
+        self.message_user(request, f'Rebuilt adjustments for {len(company_ids)} companies')
+
+
+@admin.register(PriceAdjustment)
+class PriceAdjustmentAdmin(admin.ModelAdmin):
+    list_display = ('company', 'ex_date', 'factor')
+    search_fields = ('company__symbol',)
+    list_select_related = ('company',)
+    readonly_fields = ('company', 'ex_date', 'factor')
+
+
+@admin.register(ScrapeTask)
+class ScrapeTaskAdmin(admin.ModelAdmin):
+    list_display = ('company', 'status', 'due_at', 'lease_owner', 'lease_expires_at', 'attempts', 'last_finished_at')
+    list_filter = ('status',)
+    search_fields = ('company__symbol', 'lease_owner')
+    list_select_related = ('company',)
+    readonly_fields = (
+        'company', 'status', 'lease_owner', 'lease_expires_at', 'heartbeat_at', 'attempts',
+        'last_error', 'last_started_at', 'last_finished_at'
+    )
+    actions = ['scrape_now']
+
+    @admin.action(description='Make the selected companies due now')
+    def scrape_now(self, request, queryset):
+        updated = queryset.update(due_at=timezone.now())
+        self.message_user(request, f'{updated} tasks are due now')
+
+
+@admin.register(PageFingerprint)
+class PageFingerprintAdmin(admin.ModelAdmin):
+    """
+    Delete a company's fingerprint to make its next scrape read every page
+    """
+    list_display = ('company', 'page_count', 'full_pass_at', 'updated_at')
+    search_fields = ('company__symbol',)
+    list_select_related = ('company',)
+    readonly_fields = ('company', 'page_hashes', 'updated_at')
+
+    @admin.display(description='Pages')
+    def page_count(self, obj):
+        return len(obj.page_hashes)
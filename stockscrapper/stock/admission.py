@@ -0,0 +1,227 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a scrape cannot be admitted (queue full or wait timed out).
+    """
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Seconds a finished scrape's outcome stays readable by the requests sharing it
+RESULT_TIMEOUT = 60
+
+
+class ScrapeAdmission:
+    """
+    Admission control for browser scrapes, shared by every process that uses
+    the same cache.
+
+    At most ``max_in_flight`` scrapes run at once: each holds one of that many
+    slot keys, taken with cache.add and expiring after ``shared_timeout`` so a
+    crashed process cannot hold one for good. A running scrape renews its slot
+    and flight keys every third of ``shared_timeout``, so a scrape may run
+    longer than that as long as its process is alive. Further requests wait, up to
+    ``max_queued`` of them, instead of being rejected; a waiter only takes a
+    free slot when nobody with a lower priority value is waiting. A request
+    for a company that is already being scraped waits for that scrape and
+    shares its result, so each company has at most one scrape in flight.
+
+    Waiters poll the cache every ``poll_interval`` seconds. With the default
+    per-process LocMemCache all of this is per process; configure a shared
+    cache backend when several processes serve the update endpoint.
+    """
+
+    def __init__(self, max_in_flight: int = 2, max_queued: int = 8,
+                 queue_timeout: float = 30, shared_timeout: float = 300,
+                 poll_interval: float = 0.2, cache=None, prefix: str = 'stock:scrape') -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.shared_timeout = shared_timeout
+        self.poll_interval = poll_interval
+        self.cache = default_cache if cache is None else cache
+        self.prefix = prefix
+        # Counters of this process, for /metrics
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._shared = 0
+        self._rejected = 0
+        self._waited_seconds = 0.0
+
+    def run(self, key, fn, priority: int = 1):
+        """
+        Run ``fn()`` for ``key`` once admitted and return ``(result, shared)``.
+
+        ``shared`` is True when the result came from a scrape another request
+        had already started for the same key. ``fn``'s result must be
+        picklable. When it raises, requests waiting on it get a RuntimeError
+        with the same message.
+        """
+        token = uuid.uuid4().hex
+        flight_key = self._key('flight', key)
+        while not self.cache.add(flight_key, token, self.shared_timeout):
+            leader = self.cache.get(flight_key)
+            if leader is not None:
+                return self._follow(flight_key, leader), True
+            # The running scrape finished between the two calls; try again
+
+        try:
+            slot = self._acquire(priority, token)
+        except AdmissionRejected as e:
+            self._finish(flight_key, token, ('rejected', str(e), e.retry_after))
+            raise
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._renew, args=((flight_key, self._key('slot', slot)), token, stop), daemon=True
+        )
+        heartbeat.start()
+        try:
+            result = fn()
+        except Exception as e:
+            self._release(slot, token)
+            self._finish(flight_key, token, ('error', str(e)))
+            raise
+        finally:
+            stop.set()
+        self._release(slot, token)
+        self._finish(flight_key, token, ('ok', result))
+        return result, False
+
+    def stats(self) -> dict:
+        slots = self.cache.get_many([self._key('slot', i) for i in range(self.max_in_flight)])
+        with self._lock:
+            return {
+                'in_flight': len(slots),
+                'queued': max(self.cache.get(self._key('queued'), 0), 0),
+                'admitted': self._admitted,
+                'shared': self._shared,
+                'rejected': self._rejected,
+                'queue_wait_seconds': self._waited_seconds,
+            }
+
+    def _key(self, *parts) -> str:
+        return ':'.join([self.prefix, *map(str, parts)])
+
+    def _add(self, **deltas) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, f'_{name}', getattr(self, f'_{name}') + delta)
+
+    def _follow(self, flight_key: str, leader: str):
+        self._add(shared=1)
+        result_key = self._key('result', leader)
+        # No deadline: the leader renews the flight key while it runs and it
+        # expires within shared_timeout once the leader's process is gone
+        while True:
+            outcome = self.cache.get(result_key)
+            if outcome is None and self.cache.get(flight_key) != leader:
+                # The leader stores its outcome before letting go of the flight
+                outcome = self.cache.get(result_key)
+                if outcome is None:
+                    raise AdmissionRejected('The running scrape was lost', int(self.queue_timeout))
+            if outcome is not None:
+                kind, *value = outcome
+                if kind == 'ok':
+                    return value[0]
+                if kind == 'rejected':
+                    raise AdmissionRejected(*value)
+                raise RuntimeError(value[0])
+            time.sleep(self.poll_interval)
+
+    def _renew(self, keys, token: str, stop: threading.Event) -> None:
+        while not stop.wait(self.shared_timeout / 3):
+            for key in keys:
+                if self.cache.get(key) == token:
+                    self.cache.touch(key, self.shared_timeout)
+
+    def _take_slot(self, token: str) -> int | None:
+        for slot in range(self.max_in_flight):
+            if self.cache.add(self._key('slot', slot), token, self.shared_timeout):
+                return slot
+        return None
+
+    def _release(self, slot: int, token: str) -> None:
+        key = self._key('slot', slot)
+        if self.cache.get(key) == token:
+            self.cache.delete(key)
+
+    def _queue(self, priority: int, delta: int) -> None:
+        # Counters expire once nobody has touched them for a while, so a
+        # waiter lost with its process only holds its place that long
+        for key in (self._key('queued'), self._key('queued', priority)):
+            self.cache.add(key, 0, self.queue_timeout * 2)
+            try:
+                self.cache.incr(key, delta)
+            except ValueError:
+                pass
+            self.cache.touch(key, self.queue_timeout * 2)
+
+    def _ahead(self, priority: int) -> int:
+        waiting = self.cache.get_many([self._key('queued', p) for p in range(priority)])
+        return sum(max(count, 0) for count in waiting.values())
+
+    def _acquire(self, priority: int, token: str) -> int:
+        started = time.monotonic()
+        if not self.cache.get(self._key('queued')):
+            slot = self._take_slot(token)
+            if slot is not None:
+                self._add(admitted=1)
+                return slot
+
+        if self.cache.get(self._key('queued'), 0) >= self.max_queued:
+            self._add(rejected=1)
+            raise AdmissionRejected('Too many scrapes queued', int(self.queue_timeout))
+
+        self._queue(priority, 1)
+        try:
+            deadline = started + self.queue_timeout
+            while True:
+                slot = None if self._ahead(priority) else self._take_slot(token)
+                if slot is not None:
+                    self._add(admitted=1, waited_seconds=time.monotonic() - started)
+                    return slot
+                if time.monotonic() >= deadline:
+                    self._add(rejected=1)
+                    raise AdmissionRejected('Timed out waiting for a scrape slot', int(self.queue_timeout))
+                time.sleep(self.poll_interval)
+        finally:
+            self._queue(priority, -1)
+
+    def _finish(self, flight_key: str, token: str, outcome: tuple) -> None:
+        self.cache.set(self._key('result', token), outcome, RESULT_TIMEOUT)
+        if self.cache.get(flight_key) == token:
+            self.cache.delete(flight_key)
+
+
+_config = getattr(settings, 'STOCK_SCRAPE_ADMISSION', {})
+
+scrape_admission = ScrapeAdmission(
+    max_in_flight=_config.get('MAX_IN_FLIGHT', 2),
+    max_queued=_config.get('MAX_QUEUED', 8),
+    queue_timeout=_config.get('QUEUE_TIMEOUT', 30),
+    shared_timeout=_config.get('SHARED_TIMEOUT', 300),
+    poll_interval=_config.get('POLL_INTERVAL', 0.2),
+)
+
+ROLE_PRIORITY = _config.get('ROLE_PRIORITY', {'admin': 0, 'editor': 1})
+
+
+def scrape_priority(user) -> int:
+    return ROLE_PRIORITY.get(getattr(user, 'role', None), max(ROLE_PRIORITY.values(), default=0) + 1)
+
+
+def scrape_admission_metrics():
+    stats = scrape_admission.stats()
+    return [
+        (f'scrape_admission_{name}', f'Scrape admission {name.replace("_", " ")}', stats[name], {})
+        for name in ('in_flight', 'queued', 'admitted', 'shared', 'rejected', 'queue_wait_seconds')
+    ]
@@ -0,0 +1,252 @@
+"""
+Cross-company return statistics: correlation, covariance and beta.
+
+Closes for every company over the requested window come from one query and
+are pivoted into an aligned date x company matrix (split/bonus adjusted, so
+ex-dates do not show up as crashes). Daily log returns are NaN wherever a
+company has no price on either day, and every statistic is computed over the
+days both sides have a return ("pairwise complete"), with matrix products
+instead of a loop over pairs.
+
+Betas are against two equal-weighted indices: the whole market and the
+company's own sector (``Company.sector``).
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+
+from .adjustments import factors_for
+from .models import Company, PriceAdjustment, PriceHistory, TradingDay
+
+
+_config = getattr(settings, 'STOCK_ANALYTICS', {})
+DEFAULT_WINDOW = _config.get('DEFAULT_WINDOW', 250)
+MAX_WINDOW = _config.get('MAX_WINDOW', 1250)
+# Pairs with fewer common returns than this get null statistics
+MIN_PERIODS = _config.get('MIN_PERIODS', 20)
+CACHE_TIMEOUT = _config.get('CACHE_TIMEOUT', 300)
+
+
+def window_dates(window: int, end=None):
+    """
+    (start, end) spanning the last ``window`` returns, i.e. ``window + 1``
+    trading days, up to ``end``; None when there are no prices
+
+    The days come from the trading calendar, or from the price rows
+    themselves when the calendar does not reach the latest price or has too
+    few days (rows saved without a TradingDay, e.g. through the admin).
+    """
+    prices = PriceHistory.objects.all()
+    calendar = TradingDay.objects.all()
+    if end is not None:
+        prices = prices.filter(date__lte=end)
+        calendar = calendar.filter(date__lte=end)
+    latest = prices.aggregate(latest=Max('date'))['latest']
+    if latest is None:
+        return None
+
+    days = list(calendar.order_by('-date').values_list('date', flat=True)[:window + 1])
+    if len(days) <= window or days[0] != latest:
+        days = list(prices.order_by('-date').values_list('date', flat=True).distinct()[:window + 1])
+    return days[-1], days[0]
+
+
+def close_matrix(start, end):
+    """
+    (dates, company_ids, closes): closes is a dates x companies float array,
+    NaN where a company has no price, adjusted for corporate actions
+    """
+    rows = list(
+        PriceHistory.objects.filter(date__gte=start, date__lte=end)
+        .values_list('company_id', 'date', 'close_price')
+    )
+    if not rows:
+        return np.empty(0, 'datetime64[D]'), np.empty(0, np.int64), np.empty((0, 0))
+
+    company_col, date_col, close_col = zip(*rows)
+    dates, date_index = np.unique(np.array(date_col, dtype='datetime64[D]'), return_inverse=True)
+    company_ids, company_index = np.unique(np.array(company_col, dtype=np.int64), return_inverse=True)
+    closes = np.full((len(dates), len(company_ids)), np.nan)
+    closes[date_index, company_index] = np.array(close_col, dtype=np.float64)
+
+    tables = defaultdict(list)
+    for company_id, ex_date, factor in (
+        PriceAdjustment.objects.filter(company_id__in=company_ids.tolist(), ex_date__gt=start)
+        .order_by('company_id', 'ex_date')
+        .values_list('company_id', 'ex_date', 'factor')
+    ):
+        tables[company_id].append((ex_date, factor))
+    for column, company_id in enumerate(company_ids.tolist()):
+        if company_id in tables:
+            closes[:, column] *= factors_for(tables[company_id], dates)
+
+    return dates, company_ids, closes
+
+
+def log_returns(closes: np.ndarray) -> np.ndarray:
+    """
+    Day-over-day log returns, one row shorter than ``closes``
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.diff(np.log(closes), axis=0)
+
+
+def pairwise_moments(x: np.ndarray, y: np.ndarray, min_periods: int = MIN_PERIODS):
+    """
+    Pairwise-complete (cov, var_x, var_y, n) of every column of ``x``
+    against every column of ``y``; each result is x.shape[1] x y.shape[1],
+    with NaN where fewer than ``min_periods`` rows have both values
+    """
+    x_mask, y_mask = ~np.isnan(x), ~np.isnan(y)
+    x0, y0 = np.where(x_mask, x, 0.0), np.where(y_mask, y, 0.0)
+    x_mask, y_mask = x_mask.astype(np.float64), y_mask.astype(np.float64)
+
+    n = x_mask.T @ y_mask
+    sum_x = x0.T @ y_mask
+    sum_y = x_mask.T @ y0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = (x0.T @ y0 - sum_x * sum_y / n) / (n - 1)
+        var_x = ((x0 * x0).T @ y_mask - sum_x * sum_x / n) / (n - 1)
+        var_y = (x_mask.T @ (y0 * y0) - sum_y * sum_y / n) / (n - 1)
+
+    too_few = n < max(min_periods, 2)
+    for values in (cov, var_x, var_y):
+        values[too_few] = np.nan
+    return cov, var_x, var_y, n
+
+
+def rolling_beta(x: np.ndarray, index: np.ndarray, window: int, min_periods: int = MIN_PERIODS) -> np.ndarray:
+    """
+    Beta of every column of ``x`` against the ``index`` series over each
+    trailing ``window`` rows, from cumulative sums; (rows - window + 1) x columns
+    """
+    mask = ~np.isnan(x) & ~np.isnan(index)[:, None]
+    x0 = np.where(mask, x, 0.0)
+    m0 = np.where(mask, index[:, None], 0.0)
+
+    def trailing(values):
+        total = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+        return total[window:] - total[:-window]
+
+    n = trailing(mask.astype(np.float64))
+    sum_x, sum_m = trailing(x0), trailing(m0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = trailing(x0 * m0) - sum_x * sum_m / n
+        var = trailing(m0 * m0) - sum_m * sum_m / n
+        beta = cov / var
+    beta[n < max(min_periods, 2)] = np.nan
+    return beta
+
+
+def equal_weight_index(returns: np.ndarray) -> np.ndarray:
+    """
+    Mean return of the columns that have one, per row
+    """
+    counts = (~np.isnan(returns)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.nansum(returns, axis=1) / counts, np.nan)
+
+
+def correlation_report(window=DEFAULT_WINDOW, end=None, sector=None, symbols=None, rolling=None) -> dict | None:
+    """
+    Correlation, covariance and betas of the selected companies (all, one
+    sector, or ``symbols``) over the last ``window`` daily returns up to
+    ``end``; with ``rolling``, also each company's market beta over every
+    trailing ``rolling`` days. None when there are no prices in the window.
+    """
+    span = window_dates(window, end)
+    if span is None:
+        return None
+    dates, company_ids, closes = close_matrix(*span)
+    if len(dates) < 2:
+        return None
+
+    companies = {
+        pk: (symbol, company_sector)
+        for pk, symbol, company_sector in Company.objects.filter(pk__in=company_ids.tolist())
+        .values_list('pk', 'symbol', 'sector')
+    }
+    returns = log_returns(closes)
+    return_dates = dates[1:]
+    sectors = np.array([companies[pk][1] for pk in company_ids.tolist()])
+
+    # Indices are built from the whole market, whatever subset is reported
+    market = equal_weight_index(returns)
+    sector_names = sorted(set(sectors.tolist()))
+    sector_index = np.column_stack([equal_weight_index(returns[:, sectors == name]) for name in sector_names])
+
+    selected = np.ones(len(company_ids), dtype=bool)
+    if sector:
+        selected &= sectors == sector
+    if symbols:
+        selected &= np.isin([companies[pk][0] for pk in company_ids.tolist()], symbols)
+    selected = np.flatnonzero(selected)
+    order = sorted(selected.tolist(), key=lambda column: companies[company_ids[column]][0])
+    picked = returns[:, order]
+    picked_sectors = sectors[order]
+
+    cov, var_x, var_y, n = pairwise_moments(picked, picked)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.sqrt(var_x * var_y)
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(cov)), np.nan, 1.0))
+
+    market_cov, _, market_var, _ = pairwise_moments(picked, market[:, None])
+    own_sector = np.array([sector_names.index(name) for name in picked_sectors], dtype=np.int64)
+    sector_cov, _, sector_var, _ = pairwise_moments(picked, sector_index)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        market_beta = market_cov[:, 0] / market_var[:, 0]
+        sector_beta = (sector_cov / sector_var)[np.arange(len(order)), own_sector]
+
+    index_cov, index_var_x, index_var_y, _ = pairwise_moments(sector_index, sector_index)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sector_corr = index_cov / np.sqrt(index_var_x * index_var_y)
+
+    picked_symbols = [companies[company_ids[column]][0] for column in order]
+    report = {
+        'start_date': str(return_dates[0]),
+        'end_date': str(return_dates[-1]),
+        'window': window,
+        'observations': len(return_dates),
+        'symbols': picked_symbols,
+        'sectors': picked_sectors.tolist(),
+        'correlation': _clean(corr),
+        'covariance': _clean(cov, digits=10),
+        'betas': [
+            {
+                'symbol': symbol,
+                'sector': company_sector,
+                'market_beta': _clean(market_b),
+                'sector_beta': _clean(sector_b),
+                'observations': int(count),
+            }
+            for symbol, company_sector, market_b, sector_b, count in zip(
+                picked_symbols, picked_sectors.tolist(), market_beta, sector_beta, np.diag(n)
+            )
+        ],
+        'sector_correlation': {
+            'sectors': sector_names,
+            'correlation': _clean(sector_corr),
+        },
+    }
+    if rolling:
+        if rolling > len(return_dates):
+            rolling = len(return_dates)
+        betas = rolling_beta(picked, market, rolling, min_periods=min(MIN_PERIODS, rolling))
+        report['rolling'] = {
+            'window': rolling,
+            'dates': [str(day) for day in return_dates[rolling - 1:]],
+            'market_beta': {symbol: _clean(betas[:, i]) for i, symbol in enumerate(picked_symbols)},
+        }
+    return report
+
+
+def _clean(values, digits: int = 6):
+    """
+    Rounded JSON-ready numbers with NaN as None
+    """
+    values = np.round(np.asarray(values, dtype=np.float64), digits)
+    if values.ndim == 0:
+        return None if np.isnan(values) else float(values)
+    return np.where(np.isnan(values), None, values).tolist()
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class StockConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stock'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .admission import scrape_admission_metrics
+        from .metrics import registry
+        from .resolvers import symbol_resolver_metrics
+
+        registry.register_collector(symbol_resolver_metrics)
+        registry.register_collector(scrape_admission_metrics)
@@ -0,0 +1,265 @@
+"""
+Async versions of the read-heavy endpoints, built on Django's async ORM.
+
+They answer the same query parameters with the same payloads as the DRF views
+in views.py, but run on the event loop when served through ASGI
+(stockscrapper.asgi), so many concurrent dashboard clients do not each hold a
+worker thread while waiting on the database.
+"""
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+
+from account.authentication import STATELESS_AUTHENTICATION_CLASSES, QueryTokenJWTAuthentication
+from account.permissions import IsAdminOrEditorReadOnly
+from .caching import COMPANY_LIST_CACHE_TIMEOUT, acompany_list_cache_key
+from .adjustments import aadjustment_table, adjust_rows, adjust_serialized
+from .downsample import PRICE_HISTORY_COLUMNS, downsample_price_rows
+from .metrics import record_phase
+from .models import Company, PriceHistory
+from .pagination import CompanyPagination, paginated_data
+from .pubsub import price_broker
+from .queries import (
+    QueryParamError, adjusted_param, company_list_queryset, downsample_params,
+    latest_prices_queryset, price_history_filter
+)
+from .resolvers import symbol_resolver
+from .serializers import CompanySerializer, PriceHistorySerializer, SnapshotSerializer
+from .throttling import RoleTokenBucketThrottle
+
+
+def error_response(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+class AsyncAPIView(View):
+    """
+    Async view with DRF authentication and permission classes.
+
+    Authentication may need a user query, so it runs through sync_to_async;
+    everything after it stays on the event loop.
+    """
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
+    throttle_classes = [RoleTokenBucketThrottle]
+
+    async def dispatch(self, request, *args, **kwargs):
+        drf_request = Request(
+            request,
+            authenticators=[auth() for auth in self.authentication_classes]
+        )
+        try:
+            await sync_to_async(lambda: drf_request.user)()
+        except exceptions.APIException as e:
+            return error_response(str(e.detail), e.status_code)
+
+        for permission in self.permission_classes:
+            if not permission().has_permission(drf_request, self):
+                if not drf_request.user.is_authenticated:
+                    return error_response('Authentication credentials were not provided.', 401)
+                return error_response('You do not have permission to perform this action.', 403)
+
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not await throttle.aallow_request(drf_request, self):
+                response = error_response('Request was throttled.', 429)
+                response['Retry-After'] = str(math.ceil(throttle.wait()))
+                return response
+
+        handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+        return await handler(drf_request, *args, **kwargs)
+
+    def json(self, data, status=200):
+        return JsonResponse(data, status=status, encoder=DjangoJSONEncoder, safe=False)
+
+
+class AsyncCompanyListAPIView(AsyncAPIView):
+    """
+    List companies (async)
+    """
+
+    async def get(self, request):
+        cache_key = await acompany_list_cache_key(request.query_params)
+        # Cached without links; those depend on the requesting host
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            return self.json(paginated_data(request, **cached))
+
+        try:
+            companies, fields = company_list_queryset(request.query_params)
+        except QueryParamError as e:
+            return error_response(str(e), 400)
+
+        pagination = CompanyPagination()
+        page_size = pagination.get_page_size(request)
+        try:
+            page_number = int(request.query_params.get('page', 1))
+            if page_number < 1:
+                raise ValueError
+        except ValueError:
+            return error_response('Invalid page.', 404)
+
+        count = await companies.acount()
+        offset = (page_number - 1) * page_size
+        if offset and offset >= count:
+            return error_response('Invalid page.', 404)
+        page = [company async for company in companies[offset:offset + page_size]]
+
+        with record_phase('serialize'):
+            results = CompanySerializer(page, many=True, fields=fields).data
+
+        page_data = {'count': count, 'page_number': page_number, 'page_size': page_size, 'results': results}
+        await cache.aset(cache_key, page_data, COMPANY_LIST_CACHE_TIMEOUT)
+        return self.json(paginated_data(request, **page_data))
+
+
+class AsyncCompanyDetailAPIView(AsyncAPIView):
+    """
+    Retrieve a company instance (async)
+    """
+
+    async def get(self, request, pk):
+        try:
+            company = await Company.objects.aget(pk=pk)
+        except Company.DoesNotExist:
+            return error_response('No Company matches the given query.', 404)
+
+        with record_phase('serialize'):
+            data = CompanySerializer(company).data
+        return self.json(data)
+
+
+class AsyncPriceHistoryAPIView(AsyncAPIView):
+    """
+    Retrieve price history with filtering capabilities (async)
+    """
+
+    async def get(self, request):
+        company_symbol = request.query_params.get('symbol')
+
+        if not company_symbol:
+            return error_response('Company symbol is required', 400)
+
+        try:
+            company = await symbol_resolver.aresolve(company_symbol)
+        except Company.DoesNotExist:
+            return error_response(f'Company with symbol {company_symbol} not found', 404)
+
+        try:
+            query = price_history_filter(company, request.query_params)
+            max_points, mode = downsample_params(request.query_params)
+            adjusted = adjusted_param(request.query_params)
+        except QueryParamError as e:
+            return error_response(str(e), 400)
+
+        table = await aadjustment_table(company) if adjusted else None
+
+        if max_points:
+            rows = [
+                row async for row in
+                PriceHistory.objects.filter(query).order_by('date').values_list(*PRICE_HISTORY_COLUMNS)
+            ]
+            if not rows:
+                return error_response('No price history found for the specified criteria', 404)
+            if adjusted:
+                rows = adjust_rows(table, rows)
+
+            with record_phase('serialize'):
+                points = downsample_price_rows(rows, max_points, mode)
+            points.reverse()
+
+            response_data = {
+                'company_symbol': company.symbol,
+                'company_name': company.name,
+                'total_records': len(rows),
+                'mode': mode,
+                'points': len(points),
+                'price_history': points
+            }
+            if adjusted:
+                response_data['adjusted'] = True
+            return self.json(response_data)
+
+        price_history = [
+            row async for row in PriceHistory.objects.filter(query).order_by('-date')
+        ]
+        if not price_history:
+            return error_response('No price history found for the specified criteria', 404)
+
+        with record_phase('serialize'):
+            data = PriceHistorySerializer(price_history, many=True).data
+            if adjusted:
+                data = adjust_serialized(table, data)
+
+        response_data = {
+            'company_symbol': company.symbol,
+            'company_name': company.name,
+            'total_records': len(price_history),
+            'price_history': data
+        }
+        if adjusted:
+            response_data['adjusted'] = True
+        return self.json(response_data)
+
+
+class AsyncMarketSnapshotAPIView(AsyncAPIView):
+    """
+    Latest price of every company, optionally filtered by sector (async)
+    """
+
+    async def get(self, request):
+        latest = [row async for row in latest_prices_queryset(request.query_params.get('sector'))]
+
+        with record_phase('serialize'):
+            data = SnapshotSerializer(latest, many=True).data
+        return self.json({'count': len(data), 'results': data})
+
+
+class PriceStreamView(AsyncAPIView):
+    """
+    Server-Sent Events stream of price updates as scrapes are saved.
+
+    ?symbol=NABIL,NBL limits the stream to those companies; without it every
+    update is sent. ?token=<access token> authenticates EventSource clients.
+    Needs the ASGI deployment.
+    """
+    authentication_classes = [QueryTokenJWTAuthentication, *STATELESS_AUTHENTICATION_CLASSES]
+    keepalive = getattr(settings, 'STOCK_PUSH', {}).get('KEEPALIVE', 15)
+
+    async def get(self, request):
+        symbols = [s.strip() for s in request.query_params.get('symbol', '').split(',') if s.strip()]
+        for symbol in symbols:
+            try:
+                await symbol_resolver.aresolve(symbol)
+            except Company.DoesNotExist:
+                return error_response(f'Company with symbol {symbol} not found', 404)
+
+        subscription = price_broker.subscribe(symbols)
+
+        async def events():
+            try:
+                yield 'retry: 5000\n\n'
+                while True:
+                    event = await subscription.get(timeout=self.keepalive)
+                    if event is None:
+                        # Comment line keeps proxies from closing an idle stream
+                        yield ': keepalive\n\n'
+                        continue
+                    payload = json.dumps(event, cls=DjangoJSONEncoder)
+                    yield f'id: {event["id"]}\nevent: {event["event"]}\ndata: {payload}\n\n'
+            finally:
+                subscription.close()
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,4 @@
+"""
+Reproducible benchmarks for the API endpoints, the price history write path
+and the scraper's table parser. Run them with ``python manage.py benchmark``.
+"""
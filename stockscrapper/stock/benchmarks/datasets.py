@@ -0,0 +1,103 @@
+import datetime
+
+import numpy as np
+
+from ..models import Company, PriceHistory
+
+
+# NEPSE trades Sunday to Thursday
+TRADING_WEEKDAYS = {6, 0, 1, 2, 3}
+
+
+def trading_days(years: int, end: datetime.date | None = None) -> list[datetime.date]:
+    end = end or datetime.date(2024, 12, 12)
+    start = end - datetime.timedelta(days=round(365.25 * years))
+    day = start
+    days = []
+    while day <= end:
+        if day.weekday() in TRADING_WEEKDAYS:
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def synthetic_ohlcv(rng: np.random.Generator, length: int) -> dict[str, np.ndarray]:
+    """
+    Geometric random walk with consistent OHLC bars (low <= open/close <= high)
+    """
+    start = rng.uniform(100, 1500)
+    returns = rng.normal(0.0003, 0.02, length)
+    close = start * np.exp(np.cumsum(returns))
+    open_ = np.empty(length)
+    open_[0] = start
+    open_[1:] = close[:-1] * (1 + rng.normal(0, 0.005, length - 1))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, length))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, length))
+    volume = rng.integers(100, 200_000, length)
+    return {
+        'open_price': np.round(open_, 2),
+        'high_price': np.round(high, 2),
+        'low_price': np.round(low, 2),
+        'close_price': np.round(close, 2),
+        'volume': volume,
+    }
+
+
+def price_rows(rng: np.random.Generator, days: list[datetime.date]) -> list[dict]:
+    """
+    Synthetic price history as row dicts, ascending by date
+    """
+    bars = synthetic_ohlcv(rng, len(days))
+    return [
+        {
+            'date': day,
+            'open_price': float(bars['open_price'][i]),
+            'high_price': float(bars['high_price'][i]),
+            'low_price': float(bars['low_price'][i]),
+            'close_price': float(bars['close_price'][i]),
+            'total_traded_quantity': int(bars['volume'][i]),
+        }
+        for i, day in enumerate(days)
+    ]
+
+
+def generate_market(companies: int, years: int, seed: int = 42, batch_size: int = 10_000) -> list[Company]:
+    """
+    Create ``companies`` synthetic companies, each with ``years`` of daily
+    price history, and return the companies.
+    """
+    rng = np.random.default_rng(seed)
+    sectors = [code for code, _ in Company.SECTOR_CHOICES]
+    Company.objects.bulk_create(
+        Company(
+            name=f'Synthetic Company {i:05d}',
+            symbol=f'SYN{i:05d}',
+            sector=sectors[i % len(sectors)],
+            website=f'https://example.com/company/SYN{i:05d}',
+            description='Synthetic benchmark company. ' * 20,
+        )
+        for i in range(companies)
+    )
+    created = list(Company.objects.filter(symbol__startswith='SYN').order_by('symbol'))
+
+    days = trading_days(years)
+    batch = []
+    for company in created:
+        bars = synthetic_ohlcv(rng, len(days))
+        for i, day in enumerate(days):
+            batch.append(PriceHistory(
+                company=company,
+                date=day,
+                open_price=bars['open_price'][i],
+                high_price=bars['high_price'][i],
+                low_price=bars['low_price'][i],
+                close_price=bars['close_price'][i],
+                volume=int(bars['volume'][i]),
+            ))
+        if len(batch) >= batch_size:
+            PriceHistory.objects.bulk_create(batch, batch_size=batch_size)
+            batch = []
+    if batch:
+        PriceHistory.objects.bulk_create(batch, batch_size=batch_size)
+
+    return created
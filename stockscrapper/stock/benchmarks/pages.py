@@ -0,0 +1,53 @@
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+# Rows shown per page of the #pricehistorys table
+PAGE_SIZE = 20
+
+
+def render_price_table(rows: list[dict], offset: int = 0) -> str:
+    """
+    Render rows (newest first) as the tbody HTML of the #pricehistorys table
+    """
+    cells = []
+    for i, row in enumerate(rows, start=offset + 1):
+        close = row['close_price']
+        quantity = row['total_traded_quantity']
+        values = [
+            str(i),
+            str(row['date']),
+            f'{row["open_price"]:,.2f}',
+            f'{row["high_price"]:,.2f}',
+            f'{row["low_price"]:,.2f}',
+            f'{close:,.2f}',
+            f'{quantity:,}',
+            f'{quantity * close:,.2f}',
+            f'{close:,.2f}',
+            f'{row["high_price"]:,.2f}',
+            f'{row["low_price"]:,.2f}',
+            f'{max(quantity // 50, 1):,}',
+            f'{close:,.2f}',
+        ]
+        cells.append('<tr>' + ''.join(f'<td>{value}</td>' for value in values) + '</tr>')
+    return '<tbody>' + ''.join(cells) + '</tbody>'
+
+
+def render_pages(rows: list[dict], page_size: int = PAGE_SIZE) -> list[str]:
+    """
+    Split rows (ascending) into site pages, newest first like the live table
+    """
+    newest_first = rows[::-1]
+    return [
+        render_price_table(newest_first[start:start + page_size], offset=start)
+        for start in range(0, len(newest_first), page_size)
+    ]
+
+
+def load_fixture_pages(directory: Path | str | None = None) -> list[str]:
+    """
+    Saved tbody HTML pages, in file name order
+    """
+    directory = Path(directory) if directory else FIXTURES_DIR
+    return [path.read_text() for path in sorted(directory.glob('*.html'))]
+
@@ -0,0 +1,100 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import django
+
+
+class BenchmarkRunner:
+    """
+    Times callables and collects the results into a JSON-serializable report
+    """
+
+    def __init__(self, repeat: int = 5, warmup: int = 1) -> None:
+        self.repeat = repeat
+        self.warmup = warmup
+        self.results: list[dict] = []
+
+    def measure(self, name: str, func, setup=None, repeat: int | None = None, **meta) -> dict:
+        """
+        Run ``func`` ``repeat`` times after the warmup runs. ``setup`` runs
+        before every call and is not timed.
+        """
+        repeat = repeat or self.repeat
+        timings = []
+        for i in range(self.warmup + repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            if i >= self.warmup:
+                timings.append(elapsed * 1000)
+
+        timings.sort()
+        result = {
+            'name': name,
+            **meta,
+            'repeat': repeat,
+            'min_ms': round(timings[0], 3),
+            'median_ms': round(statistics.median(timings), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'max_ms': round(timings[-1], 3),
+        }
+        self.results.append(result)
+        return result
+
+    def report(self, **meta) -> dict:
+        return {
+            'meta': {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'git_commit': _git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'platform': platform.platform(),
+                **meta,
+            },
+            'results': self.results,
+        }
+
+
+def result_key(result: dict) -> tuple:
+    return (result['name'], result.get('companies'))
+
+
+def compare(current: dict, baseline: dict) -> list[dict]:
+    """
+    Median ratio of every benchmark present in both reports (< 1 is faster)
+    """
+    previous = {result_key(result): result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        before = previous.get(result_key(result))
+        if before and before['median_ms']:
+            rows.append({
+                'name': result['name'],
+                'companies': result.get('companies'),
+                'baseline_ms': before['median_ms'],
+                'current_ms': result['median_ms'],
+                'ratio': round(result['median_ms'] / before['median_ms'], 3),
+            })
+    return rows
+
+
+def load_report(path) -> dict:
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
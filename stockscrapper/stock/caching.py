@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+COMPANY_LIST_VERSION_KEY = 'stock:company-list:version'
+COMPANY_LIST_CACHE_TIMEOUT = getattr(settings, 'COMPANY_LIST_CACHE_TIMEOUT', 300)
+
+
+def get_company_list_version():
+    """
+    Current version of the cached company list, created on first use
+    """
+    version = cache.get(COMPANY_LIST_VERSION_KEY)
+    if version is None:
+        cache.add(COMPANY_LIST_VERSION_KEY, 1, timeout=None)
+        version = cache.get(COMPANY_LIST_VERSION_KEY, 1)
+    return version
+
+
+async def aget_company_list_version():
+    version = await cache.aget(COMPANY_LIST_VERSION_KEY)
+    if version is None:
+        await cache.aadd(COMPANY_LIST_VERSION_KEY, 1, timeout=None)
+        version = await cache.aget(COMPANY_LIST_VERSION_KEY, 1)
+    return version
+
+
+def bump_company_list_version():
+    """
+    Invalidate every cached company list page at once by moving to a new version
+    """
+    try:
+        cache.incr(COMPANY_LIST_VERSION_KEY)
+    except ValueError:
+        cache.set(COMPANY_LIST_VERSION_KEY, 2, timeout=None)
+
+
+def company_list_cache_key(query_params):
+    """
+    Build a cache key from the query parameters that shape the response
+    """
+    return _company_list_key(query_params, get_company_list_version())
+
+
+async def acompany_list_cache_key(query_params):
+    return _company_list_key(query_params, await aget_company_list_version())
+
+
+def _company_list_key(query_params, version):
+    parts = [
+        f'{name}={query_params.get(name, "")}'
+        for name in ('page', 'page_size', 'fields', 'sector', 'symbol')
+    ]
+    return f'stock:company-list:v{version}:' + '&'.join(parts)
+
+
+PRICE_DATA_VERSION_KEY = 'stock:price-data:version'
+
+
+def get_price_data_version():
+    """
+    Version of the stored prices and adjustments; results derived from them
+    (e.g. the analytics matrices) are cached under it
+    """
+    version = cache.get(PRICE_DATA_VERSION_KEY)
+    if version is None:
+        cache.add(PRICE_DATA_VERSION_KEY, 1, timeout=None)
+        version = cache.get(PRICE_DATA_VERSION_KEY, 1)
+    return version
+
+
+def bump_price_data_version():
+    try:
+        cache.incr(PRICE_DATA_VERSION_KEY)
+    except ValueError:
+        cache.set(PRICE_DATA_VERSION_KEY, 2, timeout=None)
+
+
+def analytics_cache_key(name, params: dict):
+    """
+    Cache key for an analytics result; changes whenever prices do
+    """
+    parts = []
+    for key in sorted(params):
+        value = params[key]
+        if isinstance(value, (list, tuple)):
+            value = ','.join(map(str, value))
+        parts.append(f'{key}={"" if value is None else value}')
+    return f'stock:analytics:{name}:v{get_price_data_version()}:' + '&'.join(parts)
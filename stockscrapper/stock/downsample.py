@@ -0,0 +1,115 @@
+import numpy as np
+
+
+PRICE_HISTORY_COLUMNS = ('date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
+
+
+def _bucket_starts(length: int, buckets: int) -> np.ndarray:
+    """
+    Start offsets of ``buckets`` contiguous, near-equal slices of ``length`` rows
+    """
+    return np.unique(np.linspace(0, length, buckets + 1).astype(np.int64)[:-1])
+
+
+def ohlc_buckets(dates, opens, highs, lows, closes, volumes, max_points: int) -> list[dict]:
+    """
+    Aggregate ascending OHLCV rows into at most ``max_points`` candles.
+
+    Each candle keeps the first open, the highest high, the lowest low, the last
+    close and the summed volume of its bucket, so the chart shape is preserved.
+    """
+    length = len(dates)
+    starts = _bucket_starts(length, max_points)
+    ends = np.append(starts[1:], length) - 1
+
+    opens = np.asarray(opens, dtype=np.float64)
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.int64)
+
+    bucket_open = opens[starts]
+    bucket_high = np.maximum.reduceat(highs, starts)
+    bucket_low = np.minimum.reduceat(lows, starts)
+    bucket_close = closes[ends]
+    bucket_volume = np.add.reduceat(volumes, starts)
+
+    return [
+        {
+            'date': dates[start],
+            'end_date': dates[end],
+            'open_price': f'{bucket_open[i]:.2f}',
+            'high_price': f'{bucket_high[i]:.2f}',
+            'low_price': f'{bucket_low[i]:.2f}',
+            'close_price': f'{bucket_close[i]:.2f}',
+            'volume': int(bucket_volume[i]),
+        }
+        for i, (start, end) in enumerate(zip(starts, ends))
+    ]
+
+
+def lttb(x, y, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of ``threshold`` points that keep the
+    visual shape of the (x, y) line. The first and last points are always kept.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    length = len(x)
+    if threshold >= length:
+        return np.arange(length)
+    if threshold < 3:
+        raise ValueError('LTTB needs a threshold of at least 3 points')
+
+    # The interior points are split into threshold - 2 buckets
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def downsample_price_rows(rows, max_points: int, mode: str = 'candle') -> list[dict]:
+    """
+    Downsample ascending ``values_list(*PRICE_HISTORY_COLUMNS)`` rows.
+
+    mode='candle' aggregates OHLC buckets, mode='line' keeps the LTTB-selected
+    original rows based on the close price. Rows that already fit are returned
+    unchanged.
+    """
+    dates, opens, highs, lows, closes, volumes = zip(*rows)
+
+    if mode == 'candle' and len(rows) > max_points:
+        return ohlc_buckets(dates, opens, highs, lows, closes, volumes, max_points)
+
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.float64, count=len(dates))
+    return [
+        {
+            'date': dates[i],
+            'open_price': f'{opens[i]:.2f}',
+            'high_price': f'{highs[i]:.2f}',
+            'low_price': f'{lows[i]:.2f}',
+            'close_price': f'{closes[i]:.2f}',
+            'volume': volumes[i],
+        }
+        for i in lttb(ordinals, closes, max_points)
+    ]
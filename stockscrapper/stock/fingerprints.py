@@ -0,0 +1,164 @@
+"""
+Content-hash change detection for price history scrapes.
+
+A refresh used to parse every page and rewrite every row. Now:
+
+* each page's tbody HTML is hashed, and a page whose hash equals the one
+  recorded for the same page number on the last successful scrape is not
+  parsed (PageFingerprint);
+* each parsed row is hashed from its normalized values, and, when
+  STOP_AFTER_UNCHANGED is set, the scrape stops paginating once that many
+  pages in a row brought nothing new (unchanged hash, or every row already
+  stored as is), since the site lists the newest rows first;
+* save_price_history compares row hashes against the stored rows and skips
+  the writes that would not change anything.
+
+Stopping early never sees corrections to older rows or rows missing from
+the middle of the history, and a skipped page is only as good as the save
+that followed it. So every FULL_PASS_SECONDS a company gets a full pass
+that reads and parses every page.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PageFingerprint, PriceHistory
+
+
+_config = getattr(settings, 'STOCK_CHANGE_DETECTION', {})
+CHANGE_DETECTION_ENABLED = _config.get('ENABLED', True)
+# Stop paginating after this many unchanged pages in a row (0 = read every page)
+STOP_AFTER_UNCHANGED = _config.get('STOP_AFTER_UNCHANGED', 0)
+# Seconds between full passes over every page of a company (0 = never)
+FULL_PASS_SECONDS = _config.get('FULL_PASS_SECONDS', 7 * 86400)
+
+PRICE_COLUMNS = ('date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def page_digest(html: str) -> str:
+    return _digest(html)
+
+
+def row_digest(day, open_price, high_price, low_price, close_price, volume) -> str | None:
+    """
+    Hash of a price row normalized to what PriceHistory stores (two decimal
+    places, whole volume); None when a value is missing
+    """
+    try:
+        return _digest(
+            f'{str(day)[:10]}|{float(open_price):.2f}|{float(high_price):.2f}|'
+            f'{float(low_price):.2f}|{float(close_price):.2f}|{int(float(volume))}'
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def scraped_row_digest(row: dict) -> str | None:
+    return row_digest(
+        str(row.get('date', '')).strip(), row.get('open_price'), row.get('high_price'),
+        row.get('low_price'), row.get('close_price'), row.get('total_traded_quantity')
+    )
+
+
+def stored_row_digests(company, start=None, end=None) -> dict:
+    """
+    {date: row_digest} of the company's stored rows, optionally within a date range
+    """
+    rows = PriceHistory.objects.filter(company=company)
+    if start is not None:
+        rows = rows.filter(date__gte=start)
+    if end is not None:
+        rows = rows.filter(date__lte=end)
+    return {row[0]: row_digest(*row) for row in rows.values_list(*PRICE_COLUMNS)}
+
+
+class ChangeDetector:
+    """
+    Per-scrape page bookkeeping used by the scrapers' scrap_data loop.
+
+    The default instance knows nothing about earlier runs, so it never skips
+    a page or stops early: a full pass.
+    """
+
+    def __init__(self, previous_hashes: dict | None = None, known_rows=frozenset(),
+                 stop_after: int = 0, full: bool = True) -> None:
+        self.previous_hashes = previous_hashes or {}
+        self.known_rows = known_rows
+        self.stop_after = stop_after
+        self.full = full
+        self.page_hashes = {}
+        self.unchanged_run = 0
+
+    def skip_page(self, number: int, html: str) -> bool:
+        """
+        Record the page's hash; True when it matches the last run's page
+        ``number``, so its rows need not be parsed
+        """
+        digest = page_digest(html)
+        self.page_hashes[str(number)] = digest
+        if self.previous_hashes.get(str(number)) == digest:
+            self.unchanged_run += 1
+            return True
+        return False
+
+    def parsed(self, rows: list[dict]) -> None:
+        if rows and self.known_rows and all(scraped_row_digest(row) in self.known_rows for row in rows):
+            self.unchanged_run += 1
+        else:
+            self.unchanged_run = 0
+
+    @property
+    def done(self) -> bool:
+        return bool(self.stop_after) and self.unchanged_run >= self.stop_after
+
+
+def full_pass_due(last_full_pass) -> bool:
+    if last_full_pass is None:
+        return True
+    return bool(FULL_PASS_SECONDS) and timezone.now() - last_full_pass >= timedelta(seconds=FULL_PASS_SECONDS)
+
+
+def detect_changes(scraper, company, full: bool = False) -> None:
+    """
+    Give ``scraper`` the page hashes of the company's last successful scrape
+    and the hashes of its stored rows. With ``full``, or when the company's
+    last full pass is FULL_PASS_SECONDS old, the scrape reads every page and
+    only records their hashes.
+    """
+    if not CHANGE_DETECTION_ENABLED:
+        return
+    previous, last_full_pass = (
+        PageFingerprint.objects.filter(company=company)
+        .values_list('page_hashes', 'full_pass_at')
+        .first()
+    ) or (None, None)
+    if full or full_pass_due(last_full_pass):
+        scraper.changes = ChangeDetector()
+        return
+    scraper.changes = ChangeDetector(
+        previous_hashes=previous,
+        known_rows=frozenset(stored_row_digests(company).values()),
+        stop_after=STOP_AFTER_UNCHANGED,
+        full=False,
+    )
+
+
+def remember_pages(scraper, company) -> None:
+    """
+    Keep the page hashes of a scrape whose rows were saved. Call only after
+    the save succeeded, or skipped pages would never be stored.
+    """
+    changes = scraper.changes
+    if not CHANGE_DETECTION_ENABLED or not changes.page_hashes:
+        return
+    # Pages past an early stop keep their previous hashes
+    defaults = {'page_hashes': {**changes.previous_hashes, **changes.page_hashes}}
+    if changes.full:
+        defaults['full_pass_at'] = timezone.now()
+    PageFingerprint.objects.update_or_create(company=company, defaults=defaults)
@@ -0,0 +1,169 @@
+"""
+Gap analysis and targeted repair of price history.
+
+A gap is a trading day (a TradingDay row) between a company's first and last
+stored price on which that company has no PriceHistory row. All gaps come
+from one set-based query; repairs fetch only the paginator pages that should
+hold the missing dates instead of re-scraping the whole history.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import PriceHistory, TradingDay
+from .services import save_price_history
+
+
+_config = getattr(settings, 'STOCK_GAPS', {})
+# Rows per page of the site's #pricehistorys table, newest first
+PAGE_SIZE = _config.get('PAGE_SIZE', 20)
+# Extra pages to try when the estimated page does not cover a missing date
+MAX_PROBES = _config.get('MAX_PROBES', 3)
+
+
+GAPS_SQL = '''
+    SELECT span.company_id, day.date
+    FROM {tradingday} AS day
+    JOIN (
+        SELECT company_id, MIN(date) AS first_date, MAX(date) AS last_date
+        FROM {pricehistory}
+        {span_where}
+        GROUP BY company_id
+    ) AS span ON day.date > span.first_date AND day.date < span.last_date
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {pricehistory} AS price
+        WHERE price.company_id = span.company_id AND price.date = day.date
+    ) {day_where}
+    ORDER BY span.company_id, day.date
+'''
+
+
+def rebuild_trading_calendar() -> int:
+    """
+    Re-derive the calendar from every date present in PriceHistory; returns
+    the number of trading days. Missing days are added and days without any
+    price are dropped in one transaction, so concurrent readers never see
+    an empty calendar.
+    """
+    dates = PriceHistory.objects.values_list('date', flat=True).distinct()
+    with transaction.atomic():
+        TradingDay.objects.bulk_create(
+            [TradingDay(date=day) for day in dates.iterator()],
+            batch_size=5_000,
+            ignore_conflicts=True
+        )
+        TradingDay.objects.exclude(date__in=dates).delete()
+        return TradingDay.objects.count()
+
+
+def find_gaps(company_ids=None, start=None, end=None) -> dict[int, list]:
+    """
+    Missing trading days per company id, optionally limited to some
+    companies and to a date range
+    """
+    span_where, day_where, params = '', '', []
+    if company_ids is not None:
+        company_ids = list(company_ids)
+        if not company_ids:
+            return {}
+        span_where = f'WHERE company_id IN ({", ".join(["%s"] * len(company_ids))})'
+        params.extend(company_ids)
+    if start is not None:
+        day_where += ' AND day.date >= %s'
+        params.append(start)
+    if end is not None:
+        day_where += ' AND day.date <= %s'
+        params.append(end)
+
+    sql = GAPS_SQL.format(
+        tradingday=connection.ops.quote_name(TradingDay._meta.db_table),
+        pricehistory=connection.ops.quote_name(PriceHistory._meta.db_table),
+        span_where=span_where,
+        day_where=day_where,
+    )
+    gaps = defaultdict(list)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for company_id, day in cursor.fetchall():
+            # SQLite hands raw dates back as text
+            gaps[company_id].append(date.fromisoformat(day) if isinstance(day, str) else day)
+    return dict(gaps)
+
+
+def estimate_pages(missing) -> dict:
+    """
+    Paginator page expected to hold each missing date: the site lists one
+    row per trading day, newest first
+    """
+    if not missing:
+        return {}
+    calendar = list(
+        TradingDay.objects.filter(date__gte=min(missing))
+        .order_by('date')
+        .values_list('date', flat=True)
+    )
+    return {
+        day: (len(calendar) - bisect_right(calendar, day)) // PAGE_SIZE + 1
+        for day in missing
+    }
+
+
+def repair_gaps(company, scraper, missing, report=None) -> dict:
+    """
+    Fetch the pages that should hold ``missing`` dates through
+    ``scraper.fetch_page(number)`` and save the rows found for them.
+
+    The estimate can be off when the company did not trade on some calendar
+    days, so a page that does not reach a date is followed by its neighbour,
+    up to MAX_PROBES extra pages per date.
+    """
+    remaining = set(missing)
+    estimates = estimate_pages(remaining)
+    fetched = {}
+    found = {}
+
+    def page_rows(number):
+        if number not in fetched:
+            fetched[number] = scraper.fetch_page(number)
+            for row in fetched[number]:
+                day = _row_date(row)
+                if day in remaining:
+                    found[day] = row
+                    remaining.discard(day)
+        return fetched[number]
+
+    last_page = None
+    for day in sorted(missing, reverse=True):
+        number = estimates[day] if last_page is None else min(estimates[day], last_page)
+        for _ in range(MAX_PROBES + 1):
+            if day not in remaining or number < 1:
+                break
+            dates = [d for d in map(_row_date, page_rows(number)) if d is not None]
+            if not dates:
+                # Past the last page: the site has fewer rows than the calendar
+                last_page = number - 1
+                number = last_page
+                continue
+            if min(dates) <= day <= max(dates):
+                # The site has no row for this day either
+                break
+            number += 1 if min(dates) > day else -1
+
+    saved = save_price_history(company, list(found.values()), report) if found else []
+    return {
+        'missing': len(missing),
+        'found': len(found),
+        'repaired': len(saved),
+        'unresolved': sorted(day.isoformat() for day in remaining),
+        'pages_fetched': sorted(fetched),
+    }
+
+
+def _row_date(row):
+    try:
+        return date.fromisoformat(str(row['date']).strip()[:10])
+    except (KeyError, ValueError):
+        return None
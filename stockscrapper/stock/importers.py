@@ -0,0 +1,230 @@
+import time
+from pathlib import Path
+
+import pandas as pd
+from django.db import transaction
+
+from .adjustments import refresh_rights_factors
+from .caching import bump_price_data_version
+from .models import Company, PriceHistory, QuarantinedPriceRow, TradingDay
+from .series_store import rebuild_series
+from .services import without_held_rows
+from .validation import PRICE_COLUMNS, ohlc_rejections, parse_dates
+
+
+# Accepted header spellings for each PriceHistory field
+COLUMN_ALIASES = {
+    'symbol': 'symbol',
+    'company': 'symbol',
+    'date': 'date',
+    'open': 'open_price',
+    'open_price': 'open_price',
+    'high': 'high_price',
+    'high_price': 'high_price',
+    'low': 'low_price',
+    'low_price': 'low_price',
+    'close': 'close_price',
+    'close_price': 'close_price',
+    'ltp': 'close_price',
+    'volume': 'volume',
+    'total_traded_quantity': 'volume',
+}
+
+REQUIRED_COLUMNS = ['date'] + PRICE_COLUMNS + ['volume']
+
+# Rejected rows kept in the returned report; the rest only go to rejects_path
+REPORT_REJECTED_LIMIT = 100
+
+
+class PriceHistoryImportError(Exception):
+    pass
+
+
+def read_chunks(source, file_format: str, chunksize: int):
+    """
+    Yield DataFrame chunks of a CSV or XLSX file (path or file object)
+    """
+    if file_format == 'csv':
+        yield from pd.read_csv(source, chunksize=chunksize, dtype=str, skipinitialspace=True)
+    elif file_format == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(cell) if cell is not None else '' for cell in next(rows, [])]
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunksize:
+                    yield pd.DataFrame(chunk, columns=header)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header)
+        finally:
+            workbook.close()
+    else:
+        raise PriceHistoryImportError(f'Unsupported file format {file_format}. Use csv or xlsx')
+
+
+def detect_format(name: str) -> str:
+    suffix = Path(name).suffix.lower().lstrip('.')
+    return 'xlsx' if suffix in ('xlsx', 'xlsm') else 'csv'
+
+
+def prepare_chunk(chunk: pd.DataFrame, symbol: str | None = None) -> pd.DataFrame:
+    """
+    Rename columns to PriceHistory fields and parse dates and numbers
+    """
+    chunk = chunk.rename(columns=lambda name: COLUMN_ALIASES.get(str(name).strip().lower(), name))
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if symbol is None and 'symbol' not in chunk.columns:
+        missing.append('symbol')
+    if missing:
+        raise PriceHistoryImportError(f'Missing columns: {", ".join(missing)}')
+
+    frame = pd.DataFrame(index=chunk.index)
+    frame['symbol'] = symbol.upper() if symbol else chunk['symbol'].astype(str).str.strip().str.upper()
+
+    frame['date'] = parse_dates(chunk['date'])
+
+    for column in PRICE_COLUMNS + ['volume']:
+        values = chunk[column]
+        if values.dtype == object:
+            values = values.astype(str).str.replace(',', '', regex=False).str.strip()
+        frame[column] = pd.to_numeric(values, errors='coerce')
+    frame[PRICE_COLUMNS] = frame[PRICE_COLUMNS].round(2)
+    return frame
+
+
+def import_price_history(source, file_format: str | None = None, symbol: str | None = None,
+                         chunksize: int = 50_000, rejects_path: str | Path | None = None) -> dict:
+    """
+    Stream a CSV/XLSX price history file into PriceHistory.
+
+    Every chunk is validated with vectorized OHLC checks and valid rows are
+    upserted on (company, date) with bulk_create. When ``symbol`` is given the
+    file is for that single company and needs no symbol column. Rejected rows
+    are written to ``rejects_path`` (CSV) when given.
+    """
+    if file_format is None:
+        file_format = detect_format(getattr(source, 'name', str(source)))
+
+    started = time.perf_counter()
+    report = {
+        'rows_read': 0,
+        'rows_loaded': 0,
+        'rows_rejected': 0,
+        'chunks': 0,
+        'rejected': [],
+    }
+    company_ids: dict[str, int | None] = {}
+    # First and last loaded date of each company
+    loaded: dict[int, tuple] = {}
+    rejects_header = True
+
+    for chunk in read_chunks(source, file_format, chunksize):
+        frame = prepare_chunk(chunk, symbol)
+        # 1-based line numbers in the source file, after the header
+        frame.index = range(report['rows_read'] + 2, report['rows_read'] + 2 + len(frame))
+        report['rows_read'] += len(frame)
+        report['chunks'] += 1
+
+        unknown = [s for s in frame['symbol'].unique() if s not in company_ids]
+        if unknown:
+            found = dict(Company.objects.filter(symbol__in=unknown).values_list('symbol', 'id'))
+            company_ids.update({s: found.get(s) for s in unknown})
+        frame['company_id'] = frame['symbol'].map(company_ids)
+
+        reasons = ohlc_rejections(frame)
+        reasons[(reasons == '') & frame['company_id'].isna()] = 'Unknown company symbol'
+
+        rejected = reasons != ''
+        if rejected.any():
+            rejects = chunk[rejected.to_numpy()].copy()
+            rejects.insert(0, 'reason', reasons[rejected].to_numpy())
+            rejects.insert(0, 'line', frame.index[rejected.to_numpy()])
+            report['rows_rejected'] += len(rejects)
+            room = REPORT_REJECTED_LIMIT - len(report['rejected'])
+            if room > 0:
+                sample = rejects.head(room).astype(object)
+                report['rejected'].extend(sample.where(sample.notna(), None).to_dict('records'))
+            if rejects_path:
+                rejects.to_csv(rejects_path, mode='w' if rejects_header else 'a',
+                               header=rejects_header, index=False)
+                rejects_header = False
+            quarantine_rejects(frame[rejected], reasons[rejected], chunk[rejected.to_numpy()])
+
+        # Last row wins for repeated (company, date) pairs, as in update_or_create
+        valid = frame[~rejected].drop_duplicates(subset=['company_id', 'date'], keep='last')
+        report['rows_loaded'] += _upsert(valid)
+        for pk, dates in valid.groupby('company_id')['date']:
+            first, last = dates.min().date(), dates.max().date()
+            if int(pk) in loaded:
+                first, last = min(first, loaded[int(pk)][0]), max(last, loaded[int(pk)][1])
+            loaded[int(pk)] = (first, last)
+
+    for pk, (first, last) in loaded.items():
+        refresh_rights_factors(pk, first, last)
+    # One query per touched company beats merging every chunk into its file
+    rebuild_series(loaded)
+    if loaded:
+        bump_price_data_version()
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def quarantine_rejects(frame: pd.DataFrame, reasons: pd.Series, raw: pd.DataFrame) -> None:
+    """
+    Hold rejected rows of known companies for review, as the scrapes do
+    """
+    known = frame['company_id'].notna().to_numpy()
+    if not known.any():
+        return
+    raw = raw[known].astype(object)
+    raw = raw.where(raw.notna(), None)
+    QuarantinedPriceRow.objects.bulk_create(
+        without_held_rows([
+            QuarantinedPriceRow(
+                company_id=int(row.company_id),
+                date=None if row.date != row.date else row.date.date(),  # NaT != NaT
+                reason=reason,
+                source='import',
+                data={str(key): None if value is None else str(value) for key, value in data.items()},
+            )
+            for row, reason, data in zip(
+                frame[known].itertuples(index=False), reasons[known], raw.to_dict('records')
+            )
+        ]),
+        ignore_conflicts=True
+    )
+
+
+def _upsert(frame: pd.DataFrame) -> int:
+    if frame.empty:
+        return 0
+    objects = [
+        PriceHistory(
+            company_id=int(row.company_id),
+            date=row.date.date(),
+            open_price=row.open_price,
+            high_price=row.high_price,
+            low_price=row.low_price,
+            close_price=row.close_price,
+            volume=int(row.volume),
+        )
+        for row in frame.itertuples(index=False)
+    ]
+    with transaction.atomic():
+        PriceHistory.objects.bulk_create(
+            objects,
+            batch_size=5_000,
+            update_conflicts=True,
+            unique_fields=['company', 'date'],
+            update_fields=PRICE_COLUMNS + ['volume', 'updated_at'],
+        )
+        TradingDay.objects.bulk_create(
+            [TradingDay(date=day) for day in {obj.date for obj in objects}],
+            ignore_conflicts=True
+        )
+    return len(objects)
@@ -0,0 +1,170 @@
+import json
+import time
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from stock.benchmarks.datasets import generate_market, price_rows, trading_days
+from stock.benchmarks.pages import load_fixture_pages, render_pages
+from stock.benchmarks.runner import BenchmarkRunner, compare, load_report
+from stock.models import Company, PriceHistory
+from stock.series_store import series_store
+from stock.services import save_price_history
+from stock.scrapers import get_scraper
+from stock.utils import parse_price_table
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the company list, price history and update endpoints, '
+        '_save_price_history and the price table parser on synthetic data. '
+        'Runs against a throwaway test database and writes the results as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000],
+                            help='Number of synthetic companies per dataset')
+        parser.add_argument('--years', type=int, default=10,
+                            help='Years of daily history per company')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--pages-dir',
+                            help='Directory of saved #pricehistorys tbody pages to replay')
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--compare', help='Earlier results file to compare against')
+
+    def handle(self, *args, **options):
+        runner = BenchmarkRunner(repeat=options['repeat'])
+
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # The synthetic companies' series must not land in, or be deleted
+        # from, the live store
+        try:
+            with series_store.scratch():
+                self._bench_parser(runner, options)
+                for size in options['sizes']:
+                    self._bench_dataset(runner, size, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = runner.report(
+            sizes=options['sizes'],
+            years=options['years'],
+            seed=options['seed'],
+            database=connection.vendor,
+        )
+        with open(options['output'], 'w') as fp:
+            json.dump(report, fp, indent=2, default=str)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        if options['compare']:
+            for row in compare(report, load_report(options['compare'])):
+                self.stdout.write(
+                    f'{row["name"]:<32} {str(row["companies"] or ""):>6} '
+                    f'{row["baseline_ms"]:>10.3f} -> {row["current_ms"]:>10.3f} ms  x{row["ratio"]}'
+                )
+
+    def _log(self, result):
+        label = result['name'] + (f' [{result["companies"]}]' if result.get('companies') else '')
+        self.stdout.write(f'{label:<44} median {result["median_ms"]:>10.3f} ms  p95 {result["p95_ms"]:>10.3f} ms')
+
+    def _bench_parser(self, runner, options):
+        pages = load_fixture_pages(options['pages_dir'])
+        rng = np.random.default_rng(options['seed'])
+        pages += render_pages(price_rows(rng, trading_days(options['years'])))
+        rows = sum(len(parse_price_table(html)) for html in pages)
+
+        def parse_all():
+            for html in pages:
+                parse_price_table(html)
+
+        self._log(runner.measure('parser_replay', parse_all, pages=len(pages), rows=rows))
+
+    def _bench_dataset(self, runner, size, options):
+        Company.objects.all().delete()
+        CustomUser.objects.all().delete()
+        cache.clear()
+
+        started = time.perf_counter()
+        companies = generate_market(size, options['years'], seed=options['seed'])
+        self.stdout.write(
+            f'Generated {size} companies x {options["years"]} years '
+            f'({PriceHistory.objects.count()} rows) in {time.perf_counter() - started:.1f}s'
+        )
+
+        user = CustomUser.objects.create_user(
+            email='benchmark@example.com', password='benchmark', role='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        rng = np.random.default_rng(options['seed'])
+        company = companies[int(rng.integers(len(companies)))]
+        start_date = trading_days(1)[0].isoformat()
+
+        def get(path, **params):
+            return lambda: client.get(path, params)
+
+        benches = [
+            ('company_list_cold', get('/api/companies/'), cache.clear),
+            ('company_list_warm', get('/api/companies/'), None),
+            ('company_list_sparse', get('/api/companies/', fields='symbol,name', page_size=500), cache.clear),
+            ('price_history_full', get('/api/companies/price-history/', symbol=company.symbol), None),
+            ('price_history_1y', get('/api/companies/price-history/', symbol=company.symbol,
+                                     start_date=start_date), None),
+            ('price_history_max_points', get('/api/companies/price-history/', symbol=company.symbol,
+                                             max_points=800), None),
+        ]
+        for name, func, setup in benches:
+            self._log(runner.measure(name, func, setup=setup, companies=size))
+
+        # Update endpoint with the browser replaced by pre-rendered pages of the same history
+        history = list(
+            company.price_history.order_by('date').values(
+                'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'
+            )
+        )
+        rows = [
+            {
+                'date': row['date'],
+                'open_price': float(row['open_price']),
+                'high_price': float(row['high_price']),
+                'low_price': float(row['low_price']),
+                'close_price': float(row['close_price']),
+                'total_traded_quantity': row['volume'],
+            }
+            for row in history
+        ]
+        pages = render_pages(rows)
+        with mock.patch(
+            'stock.views.get_scraper',
+            lambda company: get_scraper(company, backend='replay', pages=pages)
+        ):
+            self._log(runner.measure(
+                'update_endpoint',
+                lambda: client.post('/api/companies/price-history/update/', {'company': company.symbol}),
+                companies=size, rows=len(rows), repeat=max(1, options['repeat'] // 2)
+            ))
+
+        # _save_price_history straight, first as inserts then as updates of the same rows
+        scraped = [{**row, 'date': row['date'].isoformat()} for row in rows]
+        target = Company.objects.create(name='Benchmark Target', symbol='BENCHT')
+        self._log(runner.measure(
+            'save_price_history_insert',
+            lambda: save_price_history(target, scraped),
+            setup=lambda: target.price_history.all().delete(),
+            companies=size, rows=len(scraped), repeat=max(1, options['repeat'] // 2)
+        ))
+        self._log(runner.measure(
+            'save_price_history_update',
+            lambda: save_price_history(target, scraped),
+            companies=size, rows=len(scraped), repeat=max(1, options['repeat'] // 2)
+        ))
@@ -0,0 +1,82 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+HEAVY_MODULES = ('pandas', 'numpy', 'selenium', 'bs4', 'openpyxl')
+
+# Run in a fresh interpreter: boot Django, import every view through the
+# URLconf like a worker does, then whatever the scenario adds.
+BOOT_SCRIPT = '''
+import json, os, resource, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+{extra}
+print(json.dumps({{
+    'seconds': time.perf_counter() - started,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+    'heavy': [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+SCENARIOS = {
+    'api_worker': '',
+    'scraper_worker': (
+        'from stock.scrapers import load_backend\n'
+        'load_backend()\n'
+        'import stock.importers, stock.validation'
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure worker boot time and resident memory of a read-only API process '
+        'against one that also loads the scraping stack, each in a fresh interpreter.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'stockscrapper.settings')}
+        results = {}
+        for name, extra in SCENARIOS.items():
+            runs = [self._run(extra, env) for _ in range(options['repeat'])]
+            results[name] = {
+                'median_seconds': statistics.median(run['seconds'] for run in runs),
+                'median_max_rss_mb': statistics.median(run['max_rss_kb'] for run in runs) / 1024,
+                'modules': runs[-1]['modules'],
+                'heavy_modules': runs[-1]['heavy'],
+            }
+            row = results[name]
+            self.stdout.write(
+                f'{name:<16} boot {row["median_seconds"] * 1000:>8.1f} ms  '
+                f'rss {row["median_max_rss_mb"]:>7.1f} MB  modules {row["modules"]:>5}  '
+                f'heavy: {", ".join(row["heavy_modules"]) or "-"}'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as fp:
+                json.dump(results, fp, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+    def _run(self, extra, env):
+        script = BOOT_SCRIPT.format(extra=extra, heavy=HEAVY_MODULES)
+        completed = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise CommandError(completed.stderr.strip().splitlines()[-1])
+        return json.loads(completed.stdout.strip().splitlines()[-1])
@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stock.importers import PriceHistoryImportError, import_price_history
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk load price history from a CSV or XLSX file. Rows are validated '
+        'per chunk and upserted on (company, date); rejected rows are reported.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--symbol',
+                            help='Company symbol when the file has no symbol column')
+        parser.add_argument('--format', choices=['csv', 'xlsx'],
+                            help='File format (default: from the file extension)')
+        parser.add_argument('--chunksize', type=int, default=50_000)
+        parser.add_argument('--rejects', metavar='CSV',
+                            help='Write every rejected row with its reason to this file')
+
+    def handle(self, *args, **options):
+        try:
+            report = import_price_history(
+                options['path'],
+                file_format=options['format'],
+                symbol=options['symbol'],
+                chunksize=options['chunksize'],
+                rejects_path=options['rejects'],
+            )
+        except (PriceHistoryImportError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {report["rows_read"]} rows in {report["chunks"]} chunks: '
+            f'{report["rows_loaded"]} loaded, {report["rows_rejected"]} rejected '
+            f'in {report["seconds"]}s'
+        ))
+        if report['rejected'] and not options['rejects']:
+            self.stdout.write(json.dumps(report['rejected'][:20], indent=2, default=str))
@@ -0,0 +1,111 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Read endpoints that exist in both the sync and the async API
+ENDPOINTS = {
+    'price-history': ('price-history/', 'async/price-history/'),
+    'company-list': ('', 'async/'),
+    'snapshot': ('snapshot/', 'async/snapshot/'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test a running server: hit the same read endpoint on the sync (WSGI) '
+        'and async (ASGI) deployments at increasing concurrency and report the '
+        'concurrency at which the async deployment overtakes the sync one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync-url', default='http://127.0.0.1:8000',
+                            help='Base URL of the WSGI deployment')
+        parser.add_argument('--async-url', default='http://127.0.0.1:8001',
+                            help='Base URL of the ASGI deployment')
+        parser.add_argument('--token', required=True, help='JWT access token')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='price-history')
+        parser.add_argument('--symbol', help='Symbol for the price-history endpoint')
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32, 64, 128])
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per run')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['endpoint'] == 'price-history' and not options['symbol']:
+            raise CommandError('--symbol is required for the price-history endpoint')
+
+        sync_path, async_path = ENDPOINTS[options['endpoint']]
+        params = {'symbol': options['symbol']} if options['symbol'] else {}
+        targets = {
+            'sync': f'{options["sync_url"].rstrip("/")}/api/companies/{sync_path}',
+            'async': f'{options["async_url"].rstrip("/")}/api/companies/{async_path}',
+        }
+
+        results = []
+        for concurrency in options['concurrency']:
+            row = {'concurrency': concurrency}
+            for mode, url in targets.items():
+                row[mode] = self._run(url, params, options['token'], concurrency, options['duration'])
+                self.stdout.write(
+                    f'{mode:>5} c={concurrency:<4} {row[mode]["rps"]:>9.1f} req/s  '
+                    f'p50 {row[mode]["p50_ms"]:>8.1f} ms  p95 {row[mode]["p95_ms"]:>8.1f} ms  '
+                    f'errors {row[mode]["errors"]}'
+                )
+            results.append(row)
+
+        crossover = next(
+            (row['concurrency'] for row in results if row['async']['rps'] > row['sync']['rps']),
+            None
+        )
+        if crossover is None:
+            self.stdout.write('The async deployment did not overtake the sync one at the tested concurrency')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Async overtakes sync from concurrency {crossover}'))
+
+        if options['output']:
+            with open(options['output'], 'w') as fp:
+                json.dump({'endpoint': options['endpoint'], 'crossover': crossover,
+                           'results': results}, fp, indent=2)
+
+    def _run(self, url, params, token, concurrency, duration):
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            nonlocal errors
+            session = requests.Session()
+            session.headers['Authorization'] = f'Bearer {token}'
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    ok = session.get(url, params=params, timeout=30).status_code == 200
+                except requests.RequestException:
+                    ok = False
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    if ok:
+                        latencies.append(elapsed)
+                    else:
+                        errors += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': statistics.median(latencies) if latencies else 0.0,
+            'p95_ms': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        }
@@ -0,0 +1,87 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stock.gaps import estimate_pages, find_gaps, rebuild_trading_calendar, repair_gaps
+from stock.models import Company
+from stock.scrapers import get_scraper
+
+
+class Command(BaseCommand):
+    help = (
+        'List trading days missing from each company\'s price history and, with '
+        '--repair, scrape only the paginator pages that should hold them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Limit to these symbols (default: all)')
+        parser.add_argument('--start', type=date.fromisoformat, help='First date to check (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last date to check (YYYY-MM-DD)')
+        parser.add_argument('--repair', action='store_true',
+                            help='Fetch the pages covering each gap and save the missing rows')
+        parser.add_argument('--backend', default=None,
+                            help='Scraper backend for repairs (default: STOCK_SCRAPER_BACKEND)')
+        parser.add_argument('--rebuild-calendar', action='store_true',
+                            help='Re-derive the trading calendar from all stored prices first')
+
+    def handle(self, *args, **options):
+        if options['rebuild_calendar']:
+            self.stdout.write(f'Trading calendar rebuilt: {rebuild_trading_calendar()} days')
+
+        companies = Company.objects.all()
+        if options['symbols']:
+            symbols = [symbol.upper() for symbol in options['symbols']]
+            companies = companies.filter(symbol__in=symbols)
+            unknown = set(symbols) - set(companies.values_list('symbol', flat=True))
+            if unknown:
+                raise CommandError(f'Unknown symbols: {", ".join(sorted(unknown))}')
+        companies = {company.pk: company for company in companies}
+
+        gaps = find_gaps(
+            companies if options['symbols'] else None,
+            options['start'],
+            options['end']
+        )
+        if not gaps:
+            self.stdout.write(self.style.SUCCESS('No gaps found'))
+            return
+
+        for company_id, missing in sorted(gaps.items(), key=lambda item: companies[item[0]].symbol):
+            company = companies[company_id]
+            pages = sorted(set(estimate_pages(missing).values()))
+            self.stdout.write(
+                f'{company.symbol:<10} {len(missing):>5} missing days '
+                f'({missing[0]} .. {missing[-1]}), pages {_ranges(pages)}'
+            )
+            if options['repair']:
+                self._repair(company, missing, options)
+
+    def _repair(self, company, missing, options):
+        scraper = None
+        try:
+            scraper = get_scraper(company, backend=options['backend'])
+            result = repair_gaps(company, scraper, missing)
+        except Exception as e:
+            self.stderr.write(f'{company.symbol}: repair failed: {e}')
+            return
+        finally:
+            if scraper and scraper.driver:
+                scraper.driver.quit()
+
+        self.stdout.write(
+            f'{"":<10} repaired {result["repaired"]}/{result["missing"]} from '
+            f'{len(result["pages_fetched"])} pages, {len(result["unresolved"])} not on the site'
+        )
+
+
+def _ranges(pages):
+    """
+    1,2,3,7 -> "1-3,7"
+    """
+    spans = []
+    for page in pages:
+        if spans and page == spans[-1][1] + 1:
+            spans[-1][1] = page
+        else:
+            spans.append([page, page])
+    return ','.join(str(a) if a == b else f'{a}-{b}' for a, b in spans)
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stock.models import Company
+from stock.series_store import series_store
+
+
+class Command(BaseCommand):
+    help = (
+        'Rewrite the memory-mapped price series (STOCK_SERIES_STORE) from the '
+        'database, for all companies or the given symbols.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Limit to these symbols (default: all)')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('symbol')
+        if options['symbols']:
+            symbols = [symbol.upper() for symbol in options['symbols']]
+            companies = companies.filter(symbol__in=symbols)
+            unknown = set(symbols) - set(companies.values_list('symbol', flat=True))
+            if unknown:
+                raise CommandError(f'Unknown symbols: {", ".join(sorted(unknown))}')
+
+        started = time.perf_counter()
+        company_ids = list(companies.values_list('pk', flat=True))
+        rows = sum(series_store.rebuild(company_id) for company_id in company_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows} rows for {len(company_ids)} companies to {series_store.directory} '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stock.fingerprints import detect_changes, remember_pages
+from stock.models import Company
+from stock.scrapers import get_scraper
+from stock.services import save_price_history
+
+
+class Command(BaseCommand):
+    help = (
+        'Scrape and save price history for the given symbols. --record saves every '
+        'page for later, --replay runs the same parse and save path over recorded '
+        'pages without a browser.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='+')
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument('--record', metavar='DIR',
+                          help='Save each page to DIR/<SYMBOL>/ while scraping live')
+        mode.add_argument('--replay', metavar='DIR',
+                          help='Replay pages from DIR/<SYMBOL>/ instead of scraping live')
+        parser.add_argument('--backend', default=None,
+                            help='Scraper backend for live runs (default: STOCK_SCRAPER_BACKEND)')
+        parser.add_argument('--repeat', type=int, default=1,
+                            help='Replay each recording this many times (throughput runs)')
+        parser.add_argument('--no-save', action='store_true',
+                            help='Parse only, skip _save_price_history')
+        parser.add_argument('--full', action='store_true',
+                            help='Parse every page even if unchanged since the last run')
+
+    def handle(self, *args, **options):
+        if options['repeat'] > 1 and not options['replay']:
+            raise CommandError('--repeat only applies to --replay runs')
+
+        for symbol in options['symbols']:
+            try:
+                company = Company.objects.get(symbol=symbol.upper())
+            except Company.DoesNotExist:
+                raise CommandError(f'Company with symbol {symbol} not found')
+
+            for _ in range(options['repeat']):
+                self._run(company, options)
+
+    def _run(self, company, options):
+        scraper = None
+        try:
+            if options['replay']:
+                scraper = get_scraper(company, backend='replay', record_dir=options['replay'])
+            else:
+                scraper = get_scraper(company, backend=options['backend'], record_dir=options['record'])
+
+            # Recordings and throughput runs need every page
+            if not (options['record'] or options['repeat'] > 1):
+                detect_changes(scraper, company, full=options['full'])
+
+            started = time.perf_counter()
+            scraped_data = scraper.scrap_data()
+            scrape_seconds = time.perf_counter() - started
+
+            saved = 0
+            report = {}
+            save_seconds = 0.0
+            if not options['no_save']:
+                started = time.perf_counter()
+                saved = len(save_price_history(company, scraped_data, report))
+                save_seconds = time.perf_counter() - started
+                remember_pages(scraper, company)
+        finally:
+            if scraper and scraper.driver:
+                scraper.driver.quit()
+
+        total = scrape_seconds + save_seconds
+        rows_per_second = len(scraped_data) / total if total else 0
+        self.stdout.write(
+            f'{company.symbol}: {scraper.stats["pages"]} pages ({scraper.stats["pages_skipped"]} unchanged), '
+            f'{len(scraped_data)} rows, {saved} saved, {report.get("unchanged", 0)} unchanged | '
+            f'scrape {scrape_seconds:.3f}s (parse {scraper.stats["parse_seconds"]:.3f}s) '
+            f'save {save_seconds:.3f}s | {rows_per_second:,.0f} rows/s'
+        )
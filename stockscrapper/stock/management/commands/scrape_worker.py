@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from stock.scrape_queue import (
+    LEASE_SECONDS, Heartbeat, claim_task, ensure_tasks, heartbeat, release_task, worker_id
+)
+from stock.fingerprints import detect_changes, remember_pages
+from stock.scrapers import get_scraper
+from stock.services import save_price_history
+
+
+class Command(BaseCommand):
+    help = (
+        'Claim due companies from the shared scrape queue and scrape them. Run any '
+        'number of these on any number of hosts; each company is scraped by one '
+        'worker at a time and a crashed worker\'s tasks are taken over when its '
+        'lease expires.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', default=None,
+                            help='Scraper backend (default: STOCK_SCRAPER_BACKEND)')
+        parser.add_argument('--lease', type=float, default=LEASE_SECONDS,
+                            help='Lease length in seconds, renewed every third of it')
+        parser.add_argument('--poll', type=float, default=10,
+                            help='Seconds to sleep when nothing is due')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when nothing is due instead of polling')
+        parser.add_argument('--max-tasks', type=int, default=0,
+                            help='Exit after this many tasks (0 = no limit)')
+        parser.add_argument('--full', action='store_true',
+                            help='Read every page, as in the periodic full pass')
+
+    def handle(self, *args, **options):
+        owner = worker_id()
+        created = ensure_tasks()
+        if created:
+            self.stdout.write(f'Queued {created} new companies')
+
+        done = 0
+        while not options['max_tasks'] or done < options['max_tasks']:
+            task = claim_task(owner, options['lease'])
+            if task is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+                # Companies added without signals (bulk_create, raw SQL) get
+                # their task here; the post_save receiver covers the rest
+                ensure_tasks()
+                continue
+
+            self._run(task, owner, options)
+            done += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{owner} finished {done} tasks'))
+
+    def _run(self, task, owner, options):
+        company = task.company
+        scraper = None
+        started = time.perf_counter()
+        try:
+            with Heartbeat(task, owner, options['lease']) as beat:
+                scraper = get_scraper(company, backend=options['backend'])
+                detect_changes(scraper, company, full=options['full'])
+                scraped_data = scraper.scrap_data()
+
+                # Another worker took over while we scraped; let it save
+                if beat.lost.is_set() or not heartbeat(task, owner, options['lease']):
+                    self.stderr.write(f'{company.symbol}: lease lost, discarding scrape')
+                    return
+
+                report = {}
+                saved = len(save_price_history(company, scraped_data, report))
+                remember_pages(scraper, company)
+        except Exception as e:
+            release_task(task, owner, error=str(e) or e.__class__.__name__)
+            self.stderr.write(f'{company.symbol}: {e}')
+            return
+        finally:
+            if scraper and scraper.driver:
+                scraper.driver.quit()
+
+        release_task(task, owner)
+        self.stdout.write(
+            f'{company.symbol}: saved {saved} rows, {report.get("unchanged", 0)} unchanged, '
+            f'{scraper.stats["pages_skipped"]}/{scraper.stats["pages"]} pages skipped '
+            f'{"(full pass) " if scraper.changes.full else ""}in {time.perf_counter() - started:.1f}s'
+        )
@@ -0,0 +1,117 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Phase durations (seconds) collected for the request being handled, if any
+current_phases: ContextVar[dict | None] = ContextVar('current_phases', default=None)
+
+
+class MetricsRegistry:
+    """
+    Process-local counters and summaries rendered in the Prometheus text format.
+
+    Each worker process keeps its own registry, so scrape every worker (or run
+    a single worker per container) to see the full picture.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._summaries: dict[str, dict[tuple, list[float]]] = {}
+        self._help: dict[str, str] = {}
+        self._collectors = []
+
+    def inc(self, name: str, value: float = 1, help: str = '', **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, help: str = '', **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            count_sum = series.setdefault(key, [0, 0.0])
+            count_sum[0] += 1
+            count_sum[1] += value
+            if help:
+                self._help.setdefault(name, help)
+
+    def register_collector(self, collector) -> None:
+        """
+        Register a callable returning ``[(name, help, value, labels), ...]`` gauges
+        that are read at render time.
+        """
+        self._collectors.append(collector)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._header(lines, name, 'counter')
+                for key, value in series.items():
+                    lines.append(f'{name}{_labels(key)} {_number(value)}')
+
+            for name, series in sorted(self._summaries.items()):
+                self._header(lines, name, 'summary')
+                for key, (count, total) in series.items():
+                    lines.append(f'{name}_count{_labels(key)} {count}')
+                    lines.append(f'{name}_sum{_labels(key)} {_number(total)}')
+
+        gauges: dict[str, list] = {}
+        for collector in self._collectors:
+            for name, help, value, labels in collector():
+                gauges.setdefault(name, []).append((help, value, labels))
+        for name, samples in sorted(gauges.items()):
+            lines.append(f'# HELP {name} {samples[0][0]}')
+            lines.append(f'# TYPE {name} gauge')
+            for _, value, labels in samples:
+                lines.append(f'{name}{_labels(tuple(sorted(labels.items())))} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, lines: list[str], name: str, kind: str) -> None:
+        if name in self._help:
+            lines.append(f'# HELP {name} {self._help[name]}')
+        lines.append(f'# TYPE {name} {kind}')
+
+
+def _labels(key: tuple) -> str:
+    if not key:
+        return ''
+    pairs = []
+    for name, value in key:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def record_phase(name: str):
+    """
+    Time a phase of the current request (e.g. serialization) for the request
+    metrics and the Server-Timing header. Outside a request it is a no-op timer.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = current_phases.get()
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - started
@@ -0,0 +1,121 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import current_phases, registry
+
+
+# SQL query count and time for the request being handled, if any. A context
+# variable rather than a per-request execute_wrapper, because async views run
+# their queries on a different thread (and connection) than the middleware.
+current_queries: ContextVar[dict | None] = ContextVar('current_queries', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every database connection
+    """
+    queries = current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries['count'] += 1
+        queries['seconds'] += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """
+    connection_created receiver
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records per-endpoint request count, duration, SQL query count and time,
+    serializer time and response size, and optionally reports them to the
+    client in a ``Server-Timing`` header (``STOCK_SERVER_TIMING = True``).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'STOCK_SERVER_TIMING', False)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        state = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            self._stop(state)
+        return self._finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._stop(state)
+        return self._finish(request, response, state)
+
+    def _start(self):
+        phases = {}
+        queries = {'count': 0, 'seconds': 0.0}
+        return {
+            'phases': phases,
+            'queries': queries,
+            'tokens': (current_phases.set(phases), current_queries.set(queries)),
+            'started': time.perf_counter(),
+        }
+
+    def _stop(self, state):
+        state['duration'] = time.perf_counter() - state['started']
+        phases_token, queries_token = state['tokens']
+        current_phases.reset(phases_token)
+        current_queries.reset(queries_token)
+
+    def _finish(self, request, response, state):
+        duration, phases, queries = state['duration'], state['phases'], state['queries']
+
+        match = request.resolver_match
+        labels = {
+            'endpoint': match.view_name if match else 'unmatched',
+            'method': request.method,
+        }
+        size = 0 if response.streaming else len(response.content)
+
+        registry.inc('http_requests_total', help='HTTP requests handled',
+                     status=response.status_code, **labels)
+        registry.observe('http_request_duration_seconds', duration,
+                         help='Time spent handling the request', **labels)
+        registry.observe('http_request_db_queries', queries['count'],
+                         help='SQL queries executed per request', **labels)
+        registry.observe('http_request_db_seconds', queries['seconds'],
+                         help='Time spent in SQL queries per request', **labels)
+        registry.observe('http_response_bytes', size,
+                         help='Response body size', **labels)
+        for name, seconds in phases.items():
+            registry.observe(f'http_request_{name}_seconds', seconds,
+                             help=f'Time spent in the {name} phase per request', **labels)
+
+        if self.server_timing:
+            entries = [f'db;dur={queries["seconds"] * 1000:.2f};desc="{queries["count"]} queries"']
+            entries += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in phases.items()]
+            entries.append(f'total;dur={duration * 1000:.2f}')
+            response['Server-Timing'] = ', '.join(entries)
+
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuarantinedPriceRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(blank=True, null=True)),
+                ('reason', models.CharField(max_length=100)),
+                ('source', models.CharField(choices=[('scrape', 'Scrape'), ('import', 'Import')], default='scrape', max_length=20)),
+                ('data', models.JSONField()),
+                ('reviewed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quarantined_prices', to='stock.company')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['company', 'date'], name='stock_quara_company_dc2a92_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:36
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0002_quarantinedpricerow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorporateAction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action_type', models.CharField(choices=[('bonus', 'Bonus'), ('rights', 'Rights'), ('split', 'Split')], max_length=20)),
+                ('ex_date', models.DateField()),
+                ('ratio', models.DecimalField(decimal_places=6, max_digits=12, validators=[django.core.validators.MinValueValidator(0)])),
+                ('issue_price', models.DecimalField(blank=True, decimal_places=2, help_text='Subscription price of a rights issue', max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0)])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='corporate_actions', to='stock.company')),
+            ],
+            options={
+                'ordering': ['-ex_date'],
+                'indexes': [models.Index(fields=['company', 'ex_date'], name='stock_corpo_company_2ba1b4_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceAdjustment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ex_date', models.DateField()),
+                ('factor', models.FloatField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_adjustments', to='stock.company')),
+            ],
+            options={
+                'ordering': ['ex_date'],
+                'unique_together': {('company', 'ex_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+def fill_calendar(apps, schema_editor):
+    PriceHistory = apps.get_model('stock', 'PriceHistory')
+    TradingDay = apps.get_model('stock', 'TradingDay')
+    dates = PriceHistory.objects.values_list('date', flat=True).distinct()
+    TradingDay.objects.bulk_create(
+        [TradingDay(date=day) for day in dates.iterator()],
+        batch_size=5_000,
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0004_scrapetask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradingDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.RunPython(fill_calendar, migrations.RunPython.noop),
+    ]
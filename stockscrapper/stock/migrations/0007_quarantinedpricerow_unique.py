@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-19 13:02
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicates(apps, schema_editor):
+    QuarantinedPriceRow = apps.get_model('stock', 'QuarantinedPriceRow')
+    keep = (
+        QuarantinedPriceRow.objects.filter(date__isnull=False)
+        .values('company', 'date', 'reason', 'source')
+        .annotate(first=Min('id'))
+        .values_list('first', flat=True)
+    )
+    QuarantinedPriceRow.objects.filter(date__isnull=False).exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0006_pagefingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quarantinedpricerow',
+            constraint=models.UniqueConstraint(fields=('company', 'date', 'reason', 'source'), name='unique_quarantined_row'),
+        ),
+    ]
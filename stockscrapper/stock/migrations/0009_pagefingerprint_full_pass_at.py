@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0008_priceevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagefingerprint',
+            name='full_pass_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -79,3 +79,201 @@ class PriceHistory(models.Model):
 
     def __str__(self):
         return f"{self.company.symbol} - {self.date}"
+
+
+class QuarantinedPriceRow(models.Model):
+    """
+    A scraped price history row that failed validation and was held back
+    for review instead of being saved.
+    """
+    SOURCE_CHOICES = [
+        ('scrape', 'Scrape'),
+        ('import', 'Import'),
+    ]
+
+    company = models.ForeignKey(
+        'Company',
+        on_delete=models.CASCADE,
+        related_name='quarantined_prices'
+    )
+    date = models.DateField(blank=True, null=True)
+    reason = models.CharField(max_length=100)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='scrape')
+    data = models.JSONField()
+    reviewed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['company', 'date']),
+        ]
+        constraints = [
+            # A row rejected again on the next refresh is not held twice
+            models.UniqueConstraint(
+                fields=['company', 'date', 'reason', 'source'],
+                name='unique_quarantined_row'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.company.symbol} - {self.date} ({self.reason})"
+
+
+class CorporateAction(models.Model):
+    """
+    A bonus, rights or split event that changes the share count from ex_date on.
+
+    ``ratio`` is new shares per share held: 0.1 for a 10% bonus, 0.5 for a
+    1:2 rights issue, 1 for a 2-for-1 split.
+    """
+    ACTION_CHOICES = [
+        ('bonus', 'Bonus'),
+        ('rights', 'Rights'),
+        ('split', 'Split'),
+    ]
+
+    company = models.ForeignKey(
+        'Company',
+        on_delete=models.CASCADE,
+        related_name='corporate_actions'
+    )
+    action_type = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    ex_date = models.DateField()
+    ratio = models.DecimalField(
+        max_digits=12,
+        decimal_places=6,
+        validators=[MinValueValidator(0)]
+    )
+    issue_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(0)],
+        help_text='Subscription price of a rights issue'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-ex_date']
+        indexes = [
+            models.Index(fields=['company', 'ex_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.company.symbol} - {self.action_type} {self.ratio} ({self.ex_date})"
+
+
+class PriceAdjustment(models.Model):
+    """
+    Materialized cumulative adjustment factor: prices dated before ex_date
+    (and on or after the previous ex_date) are multiplied by factor, volumes
+    divided by it. Maintained from CorporateAction by stock/adjustments.py.
+    """
+    company = models.ForeignKey(
+        'Company',
+        on_delete=models.CASCADE,
+        related_name='price_adjustments'
+    )
+    ex_date = models.DateField()
+    factor = models.FloatField()
+
+    class Meta:
+        ordering = ['ex_date']
+        unique_together = ['company', 'ex_date']
+
+    def __str__(self):
+        return f"{self.company.symbol} - before {self.ex_date} x{self.factor:.6f}"
+
+
+class ScrapeTask(models.Model):
+    """
+    Per-company entry in the database-backed scrape queue.
+
+    A worker owns the task while ``lease_expires_at`` is in the future and
+    keeps extending it with heartbeats; once the lease lapses any worker may
+    claim the task again. See stock/scrape_queue.py.
+    """
+    STATUS_CHOICES = [
+        ('idle', 'Idle'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+
+    company = models.OneToOneField(
+        'Company',
+        on_delete=models.CASCADE,
+        related_name='scrape_task'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='idle')
+    due_at = models.DateTimeField()
+    lease_owner = models.CharField(max_length=255, blank=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    last_started_at = models.DateTimeField(blank=True, null=True)
+    last_finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['due_at']
+        indexes = [
+            models.Index(fields=['due_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.company.symbol} - {self.status} (due {self.due_at})"
+
+
+class TradingDay(models.Model):
+    """
+    Trading calendar: every date on which any company has a price row.
+
+    Filled as prices are saved; used to find the days missing from a single
+    company's history (see stock/gaps.py).
+    """
+    date = models.DateField(unique=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return str(self.date)
+
+
+class PageFingerprint(models.Model):
+    """
+    Content hashes of the price history pages seen on a company's last
+    successful scrape, keyed by page number, so the next scrape can skip
+    pages that did not change. See stock/fingerprints.py.
+    """
+    company = models.OneToOneField(
+        'Company',
+        on_delete=models.CASCADE,
+        related_name='page_fingerprint'
+    )
+    page_hashes = models.JSONField(default=dict, blank=True)
+    # When every page was last read and parsed; see FULL_PASS_SECONDS
+    full_pass_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.company.symbol} - {len(self.page_hashes)} pages"
+
+
+class PriceEvent(models.Model):
+    """
+    Price update published to the stream subscribers. Each ASGI process polls
+    for rows past the last id it has seen, so updates saved in any process
+    (web, scrape_worker, management commands) reach every stream.
+    """
+    symbol = models.CharField(max_length=20)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.symbol} - {self.created_at}"
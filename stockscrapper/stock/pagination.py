@@ -0,0 +1,31 @@
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CompanyPagination(PageNumberPagination):
+    """
+    Page number pagination for the company list endpoint
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def paginated_data(request, count, page_number, page_size, results):
+    """
+    Paginated response body. The next/previous links are built from the
+    current request, so a cached page never leaks another client's host.
+    """
+    url = request.build_absolute_uri()
+    previous = None
+    if page_number > 1:
+        previous = (
+            remove_query_param(url, 'page') if page_number == 2
+            else replace_query_param(url, 'page', page_number - 1)
+        )
+    return {
+        'count': count,
+        'next': replace_query_param(url, 'page', page_number + 1) if page_number * page_size < count else None,
+        'previous': previous,
+        'results': results,
+    }
@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Max
+
+from .metrics import registry
+from .models import PriceEvent
+
+
+_config = getattr(settings, 'STOCK_PUSH', {})
+POLL_INTERVAL = _config.get('POLL_INTERVAL', 1.0)
+RETENTION_SECONDS = _config.get('RETENTION_SECONDS', 600)
+
+ALL_SYMBOLS = '*'
+
+
+class Subscription:
+    """
+    One client's queue of price events, bound to the event loop it was created on
+    """
+
+    def __init__(self, broker, symbols: set[str], queue_size: int) -> None:
+        self.broker = broker
+        self.symbols = symbols
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def deliver(self, event: dict) -> None:
+        # Slow clients lose their oldest events rather than holding memory
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> dict | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class PriceBroker:
+    """
+    Per-process fan-out of per-symbol price updates to stream subscribers.
+
+    publish() may be called from any thread; events are handed to each
+    subscriber's event loop thread-safely. Events reach the broker through an
+    EventPoller reading the PriceEvent table, so publishers in other processes
+    are seen too.
+    """
+
+    def __init__(self, queue_size: int = 100) -> None:
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self.poller = EventPoller(self, POLL_INTERVAL)
+
+    def subscribe(self, symbols=None) -> Subscription:
+        """
+        Subscribe to the given symbols, or to every symbol when none are given.
+        Must be called from a coroutine.
+        """
+        keys = {symbol.upper() for symbol in symbols} if symbols else {ALL_SYMBOLS}
+        subscription = Subscription(self, keys, self.queue_size)
+        with self._lock:
+            for key in keys:
+                self._subscribers.setdefault(key, set()).add(subscription)
+        self.poller.ensure_running()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for key in subscription.symbols:
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[key]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({sub for subs in self._subscribers.values() for sub in subs})
+
+    def publish(self, symbol: str, event: dict) -> int:
+        """
+        Send ``event`` to the subscribers of ``symbol``; returns how many were reached
+        """
+        with self._lock:
+            targets = self._subscribers.get(symbol.upper(), set()) | self._subscribers.get(ALL_SYMBOLS, set())
+        delivered = 0
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+                delivered += 1
+            except RuntimeError:
+                # The subscriber's loop is closed; the stream is gone
+                self.unsubscribe(subscription)
+        return delivered
+
+
+class EventPoller:
+    """
+    Background thread feeding PriceEvent rows to the broker while the process
+    has subscribers. It starts from the newest row at the time it starts, so
+    subscribers only see updates published after they connected.
+    """
+
+    def __init__(self, broker: PriceBroker, interval: float) -> None:
+        self.broker = broker
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def ensure_running(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='price-event-poller', daemon=True)
+                self._thread.start()
+
+    def _idle(self) -> bool:
+        # Checked under the lock so a subscribe racing the exit starts a new thread
+        with self._lock:
+            if self.broker.subscriber_count():
+                return False
+            self._thread = None
+            return True
+
+    def _run(self) -> None:
+        last_id = None
+        try:
+            while not self._idle():
+                try:
+                    if last_id is None:
+                        last_id = PriceEvent.objects.aggregate(last=Max('id'))['last'] or 0
+                    for pk, symbol, payload in (
+                        PriceEvent.objects.filter(pk__gt=last_id)
+                        .order_by('pk')
+                        .values_list('pk', 'symbol', 'payload')
+                    ):
+                        self.broker.publish(symbol, {**payload, 'id': pk})
+                        last_id = pk
+                except DatabaseError:
+                    # Keep polling; the streams only see a delay
+                    registry.inc('stock_price_event_poll_errors_total',
+                                 help='Failed polls of the PriceEvent table')
+                    connection.close()
+                time.sleep(self.interval)
+        finally:
+            connection.close()
+
+
+price_broker = PriceBroker(queue_size=_config.get('QUEUE_SIZE', 100))
+
+
+def publish_price_update(company, entries) -> int | None:
+    """
+    Publish saved PriceHistory rows of ``company`` to the subscribers of every
+    process; returns the event id
+    """
+    if not entries:
+        return None
+    rows = sorted(
+        (
+            {
+                'date': entry.date.isoformat(),
+                'open_price': f'{entry.open_price:.2f}',
+                'high_price': f'{entry.high_price:.2f}',
+                'low_price': f'{entry.low_price:.2f}',
+                'close_price': f'{entry.close_price:.2f}',
+                'volume': entry.volume,
+            }
+            for entry in entries
+        ),
+        key=lambda row: row['date'],
+        reverse=True
+    )
+    now = datetime.now(timezone.utc)
+    PriceEvent.objects.filter(created_at__lt=now - timedelta(seconds=RETENTION_SECONDS)).delete()
+    event = PriceEvent.objects.create(symbol=company.symbol.upper(), payload={
+        'event': 'price_update',
+        'company_symbol': company.symbol,
+        'saved_at': now.isoformat(),
+        'rows': rows,
+    })
+    return event.pk
@@ -0,0 +1,192 @@
+from datetime import datetime
+
+from django.db.models import OuterRef, Q, Subquery
+
+from .models import Company, PriceHistory
+from .serializers import CompanySerializer
+
+
+class QueryParamError(Exception):
+    """
+    Invalid query parameter; the message is returned to the client as a 400
+    """
+
+
+def company_list_queryset(params):
+    """
+    Company queryset for the list endpoints plus the requested sparse fieldset
+    (None for all fields)
+    """
+    companies = Company.objects.all()
+
+    # Sparse fieldset: ?fields=symbol,name
+    fields = params.get('fields')
+    if fields:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        allowed = CompanySerializer.Meta.fields
+        unknown = [f for f in fields if f not in allowed]
+        if unknown:
+            raise QueryParamError(f'Unknown fields: {", ".join(unknown)}. Allowed: {", ".join(allowed)}')
+        companies = companies.only(*fields)
+    else:
+        fields = None
+
+    sector = params.get('sector')
+    if sector:
+        sector = sector.upper()
+        if sector not in dict(Company.SECTOR_CHOICES):
+            raise QueryParamError(f'Invalid sector {sector}')
+        companies = companies.filter(sector=sector)
+
+    # Symbols are stored upper-cased, so a case-sensitive prefix match can use the index
+    symbol_prefix = params.get('symbol')
+    if symbol_prefix:
+        companies = companies.filter(symbol__startswith=symbol_prefix.upper())
+
+    return companies, fields
+
+
+def date_range_params(params):
+    """
+    (start_date, end_date) from ?start_date=&end_date=, either may be None
+    """
+    dates = []
+    for name in ('start_date', 'end_date'):
+        value = params.get(name)
+        try:
+            dates.append(datetime.strptime(value, '%Y-%m-%d').date() if value else None)
+        except ValueError:
+            raise QueryParamError(f'Invalid {name} format. Use YYYY-MM-DD')
+    return tuple(dates)
+
+
+def price_history_filter(company, params):
+    """
+    Q object for the price history date and price range filters
+    """
+    query = Q(company=company)
+
+    start_date, end_date = date_range_params(params)
+    if start_date:
+        query &= Q(date__gte=start_date)
+    if end_date:
+        query &= Q(date__lte=end_date)
+
+    min_price = params.get('min_price')
+    if min_price:
+        try:
+            min_price = float(min_price)
+        except ValueError:
+            raise QueryParamError('Invalid min_price format. Must be a number')
+        query &= (
+            Q(open_price__gte=min_price) |
+            Q(close_price__gte=min_price) |
+            Q(high_price__gte=min_price) |
+            Q(low_price__gte=min_price)
+        )
+
+    max_price = params.get('max_price')
+    if max_price:
+        try:
+            max_price = float(max_price)
+        except ValueError:
+            raise QueryParamError('Invalid max_price format. Must be a number')
+        query &= (
+            Q(open_price__lte=max_price) |
+            Q(close_price__lte=max_price) |
+            Q(high_price__lte=max_price) |
+            Q(low_price__lte=max_price)
+        )
+
+    return query
+
+
+def downsample_params(params):
+    """
+    (max_points, mode) for chart downsampling; max_points is None when not requested
+    """
+    max_points = params.get('max_points')
+    mode = params.get('mode', 'candle')
+    if not max_points:
+        return None, mode
+
+    try:
+        max_points = int(max_points)
+        if max_points < 3:
+            raise ValueError
+    except ValueError:
+        raise QueryParamError('Invalid max_points format. Must be an integer of at least 3')
+    if mode not in ('candle', 'line'):
+        raise QueryParamError('Invalid mode. Use candle or line')
+    return max_points, mode
+
+
+def adjusted_param(params):
+    """
+    Whether split/bonus/rights adjusted prices were requested (?adjusted=true)
+    """
+    value = params.get('adjusted', '').lower()
+    if value in ('', '0', 'false', 'no'):
+        return False
+    if value in ('1', 'true', 'yes'):
+        return True
+    raise QueryParamError('Invalid adjusted value. Use true or false')
+
+
+def analytics_params(params, default_window: int, max_window: int):
+    """
+    window, end_date, sector, symbols and rolling for the analytics endpoints
+    """
+    def positive_int(name, default, smallest):
+        value = params.get(name)
+        if not value:
+            return default
+        try:
+            value = int(value)
+            if value < smallest:
+                raise ValueError
+        except ValueError:
+            raise QueryParamError(f'Invalid {name}. Must be an integer of at least {smallest}')
+        return value
+
+    window = positive_int('window', default_window, 2)
+    if window > max_window:
+        raise QueryParamError(f'window can be at most {max_window}')
+    rolling = positive_int('rolling', None, 2)
+    if rolling and rolling > window:
+        raise QueryParamError('rolling cannot be longer than window')
+
+    _, end_date = date_range_params(params)
+
+    sector = params.get('sector', '').upper() or None
+    if sector and sector not in dict(Company.SECTOR_CHOICES):
+        raise QueryParamError(f'Invalid sector {sector}')
+
+    symbols = sorted({s.strip().upper() for s in params.get('symbols', '').split(',') if s.strip()})
+
+    return {
+        'window': window,
+        'end': end_date,
+        'sector': sector,
+        'symbols': symbols or None,
+        'rolling': rolling,
+    }
+
+
+def latest_prices_queryset(sector=None):
+    """
+    The most recent PriceHistory row of every company, in one query
+    """
+    latest_date = (
+        PriceHistory.objects.filter(company=OuterRef('company'))
+        .order_by('-date')
+        .values('date')[:1]
+    )
+    queryset = (
+        PriceHistory.objects.filter(date=Subquery(latest_date))
+        .select_related('company')
+        .order_by('company__symbol')
+    )
+    if sector:
+        queryset = queryset.filter(company__sector=sector.upper())
+    return queryset
@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Company
+
+
+RESOLVER_VERSION_KEY = 'stock:symbol-resolver:version'
+
+
+class SymbolResolver:
+    """
+    Resolves a company symbol to its Company row through an in-process LRU cache
+    with a TTL, optionally backed by Django's cache framework so several workers
+    can share lookups and invalidations.
+
+    Entries are dropped by the Company post_save/post_delete signals
+    (see stock/signals.py).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, shared_cache: bool = False) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_cache = shared_cache
+        self._entries: OrderedDict[str, tuple[Company, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def resolve(self, symbol: str) -> Company:
+        """
+        Return the Company for ``symbol`` (case-insensitive).
+
+        Raises Company.DoesNotExist like ``Company.objects.get`` would.
+        """
+        symbol = symbol.upper()
+        version = self._shared_version() if self.shared_cache else 0
+        now = time.monotonic()
+
+        company = self._local_get(symbol, version, now)
+        if company is not None:
+            return company
+
+        if self.shared_cache:
+            company = cache.get(self._shared_key(symbol, version))
+            if company is not None:
+                with self._lock:
+                    self._shared_hits += 1
+
+        if company is None:
+            company = Company.objects.get(symbol=symbol)
+            with self._lock:
+                self._misses += 1
+            if self.shared_cache:
+                cache.set(self._shared_key(symbol, version), company, self.ttl)
+
+        self._store(symbol, company, now + self.ttl, version)
+        return company
+
+    async def aresolve(self, symbol: str) -> Company:
+        """
+        Async version of resolve() for the async views; hits never leave the event loop.
+        """
+        symbol = symbol.upper()
+        version = await self._ashared_version() if self.shared_cache else 0
+        now = time.monotonic()
+
+        company = self._local_get(symbol, version, now)
+        if company is not None:
+            return company
+
+        if self.shared_cache:
+            company = await cache.aget(self._shared_key(symbol, version))
+            if company is not None:
+                with self._lock:
+                    self._shared_hits += 1
+
+        if company is None:
+            company = await Company.objects.aget(symbol=symbol)
+            with self._lock:
+                self._misses += 1
+            if self.shared_cache:
+                await cache.aset(self._shared_key(symbol, version), company, self.ttl)
+
+        self._store(symbol, company, now + self.ttl, version)
+        return company
+
+    def invalidate(self, company: Company | None = None) -> None:
+        """
+        Drop cached entries for ``company``, or everything when no company is given
+        """
+        with self._lock:
+            if company is None:
+                self._entries.clear()
+            else:
+                stale = [
+                    symbol for symbol, (cached, _, _) in self._entries.items()
+                    if symbol == company.symbol or cached.pk == company.pk
+                ]
+                for symbol in stale:
+                    del self._entries[symbol]
+
+        if self.shared_cache:
+            # A symbol can change on update, so move every worker to a new key space
+            try:
+                cache.incr(RESOLVER_VERSION_KEY)
+            except ValueError:
+                cache.set(RESOLVER_VERSION_KEY, 2, timeout=None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._shared_hits + self._misses
+            return {
+                'hits': self._hits,
+                'shared_hits': self._shared_hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_ratio': (self._hits + self._shared_hits) / lookups if lookups else 0.0,
+            }
+
+    def _local_get(self, symbol: str, version: int, now: float) -> Company | None:
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None:
+                return None
+            company, expires_at, entry_version = entry
+            if expires_at > now and entry_version == version:
+                self._entries.move_to_end(symbol)
+                self._hits += 1
+                return company
+            del self._entries[symbol]
+            return None
+
+    def _store(self, symbol: str, company: Company, expires_at: float, version: int) -> None:
+        with self._lock:
+            self._entries[symbol] = (company, expires_at, version)
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _shared_version(self) -> int:
+        version = cache.get(RESOLVER_VERSION_KEY)
+        if version is None:
+            cache.add(RESOLVER_VERSION_KEY, 1, timeout=None)
+            version = cache.get(RESOLVER_VERSION_KEY, 1)
+        return version
+
+    async def _ashared_version(self) -> int:
+        version = await cache.aget(RESOLVER_VERSION_KEY)
+        if version is None:
+            await cache.aadd(RESOLVER_VERSION_KEY, 1, timeout=None)
+            version = await cache.aget(RESOLVER_VERSION_KEY, 1)
+        return version
+
+    def _shared_key(self, symbol: str, version: int) -> str:
+        return f'stock:symbol-resolver:v{version}:{symbol}'
+
+
+_config = getattr(settings, 'STOCK_SYMBOL_RESOLVER', {})
+
+symbol_resolver = SymbolResolver(
+    maxsize=_config.get('MAXSIZE', 1024),
+    ttl=_config.get('TTL', 300),
+    shared_cache=_config.get('SHARED_CACHE', False),
+)
+
+
+def symbol_resolver_metrics():
+    stats = symbol_resolver.stats()
+    return [
+        (f'symbol_resolver_{name}', f'Symbol resolver {name.replace("_", " ")}', stats[name], {})
+        for name in ('hits', 'shared_hits', 'misses', 'evictions', 'size')
+    ]
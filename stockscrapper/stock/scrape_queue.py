@@ -0,0 +1,154 @@
+"""
+Lease-based scrape queue shared by any number of worker processes or hosts.
+
+Workers claim the most overdue ScrapeTask whose lease is free or expired,
+extend the lease with heartbeats while scraping, and release it with the next
+due time when done. A crashed worker stops heartbeating, its lease lapses and
+another worker takes the task over.
+
+Claims are atomic: ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database
+supports it (PostgreSQL, MySQL 8), otherwise a conditional UPDATE that only
+succeeds if the lease is still free (compare-and-set), which is enough on
+SQLite because it serializes writers.
+"""
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Company, ScrapeTask
+
+
+_config = getattr(settings, 'STOCK_SCRAPE_QUEUE', {})
+LEASE_SECONDS = _config.get('LEASE_SECONDS', 300)
+INTERVAL_SECONDS = _config.get('INTERVAL_SECONDS', 86400)
+RETRY_SECONDS = _config.get('RETRY_SECONDS', 900)
+
+
+def worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def ensure_tasks(due_at=None) -> int:
+    """
+    Create a task, due at ``due_at`` (now), for every company that has none
+    """
+    due_at = due_at or timezone.now()
+    missing = Company.objects.filter(scrape_task__isnull=True).values_list('pk', flat=True)
+    created = ScrapeTask.objects.bulk_create(
+        [ScrapeTask(company_id=pk, due_at=due_at) for pk in missing],
+        ignore_conflicts=True
+    )
+    return len(created)
+
+
+def claimable(now):
+    return Q(due_at__lte=now) & (Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now))
+
+
+def claim_task(owner: str, lease_seconds: float = LEASE_SECONDS) -> ScrapeTask | None:
+    """
+    Lease the most overdue free task to ``owner``; None when nothing is due
+    """
+    now = timezone.now()
+    lease = {
+        'status': 'running',
+        'lease_owner': owner,
+        'lease_expires_at': now + timedelta(seconds=lease_seconds),
+        'heartbeat_at': now,
+        'last_started_at': now,
+        'attempts': F('attempts') + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            task = (
+                ScrapeTask.objects.select_for_update(skip_locked=True)
+                .filter(claimable(now))
+                .order_by('due_at')
+                .first()
+            )
+            if task is None:
+                return None
+            ScrapeTask.objects.filter(pk=task.pk).update(**lease)
+        task.refresh_from_db()
+        return task
+
+    # A lost compare-and-set means another worker claimed that row, so every
+    # retry sees one candidate fewer and the loop ends
+    while True:
+        pk = ScrapeTask.objects.filter(claimable(now)).order_by('due_at').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        # Only one worker's UPDATE can still match the free lease
+        if ScrapeTask.objects.filter(claimable(now), pk=pk).update(**lease):
+            return ScrapeTask.objects.select_related('company').get(pk=pk)
+
+
+def heartbeat(task: ScrapeTask, owner: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+    """
+    Extend the lease; False when ``owner`` no longer holds it
+    """
+    now = timezone.now()
+    return bool(
+        ScrapeTask.objects.filter(pk=task.pk, lease_owner=owner, lease_expires_at__gte=now)
+        .update(lease_expires_at=now + timedelta(seconds=lease_seconds), heartbeat_at=now)
+    )
+
+
+def release_task(task: ScrapeTask, owner: str, error: str = '') -> bool:
+    """
+    Give the lease back and schedule the next run (sooner after a failure).
+
+    Returns False when the lease had already been lost to another worker.
+    """
+    now = timezone.now()
+    delay = RETRY_SECONDS if error else INTERVAL_SECONDS
+    return bool(
+        ScrapeTask.objects.filter(pk=task.pk, lease_owner=owner).update(
+            status='failed' if error else 'idle',
+            lease_owner='',
+            lease_expires_at=None,
+            due_at=now + timedelta(seconds=delay),
+            last_error=error,
+            last_finished_at=now,
+        )
+    )
+
+
+class Heartbeat:
+    """
+    Renews a lease from a background thread while the task runs.
+
+    ``lost`` is set once a renewal fails, so the caller can skip saving.
+    """
+
+    def __init__(self, task: ScrapeTask, owner: str, lease_seconds: float = LEASE_SECONDS) -> None:
+        self.task = task
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.lease_seconds / 3):
+                if not heartbeat(self.task, self.owner, self.lease_seconds):
+                    self.lost.set()
+                    return
+        finally:
+            connection.close()
@@ -0,0 +1,56 @@
+"""
+Lazily loaded scraper backends.
+
+The browser scraper pulls in Selenium, pandas and BeautifulSoup. Nothing on
+the API's import path imports them: callers ask for a backend by name and
+its dotted path from STOCK_SCRAPER_BACKENDS is imported on first use, so
+worker processes that only serve reads never load the scraping stack.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+DEFAULT_BACKENDS = {
+    'selenium': 'stock.utils.PriceHistoryScrapper',
+    'replay': 'stock.utils.ReplayPriceHistoryScrapper',
+}
+
+
+def backend_names() -> list[str]:
+    return list(getattr(settings, 'STOCK_SCRAPER_BACKENDS', DEFAULT_BACKENDS))
+
+
+@lru_cache(maxsize=None)
+def _import_backend(path: str):
+    return import_string(path)
+
+
+def load_backend(name: str | None = None):
+    """
+    Import and return the scraper class registered under ``name``
+    (STOCK_SCRAPER_BACKEND when omitted).
+    """
+    backends = getattr(settings, 'STOCK_SCRAPER_BACKENDS', DEFAULT_BACKENDS)
+    name = name or getattr(settings, 'STOCK_SCRAPER_BACKEND', 'selenium')
+    try:
+        path = backends[name]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Unknown scraper backend {name!r}; choose one of {", ".join(backends)}'
+        )
+    return _import_backend(path)
+
+
+def get_scraper(company, backend: str | None = None, **options):
+    """
+    Build a scraper for ``company`` with the named backend.
+
+    Backends are classes with a ``for_company(company, **options)`` classmethod
+    returning an object with ``scrap_data()``, ``fetch_page(number)`` (used
+    for gap repairs), ``stats``, ``changes`` (a fingerprints.ChangeDetector)
+    and ``driver``.
+    """
+    return load_backend(backend).for_company(company, **options)
@@ -0,0 +1,599 @@
+"""
+Market screener: a small filter expression language evaluated across every
+company at once.
+
+    sector = BANKING and close > sma_50 and volume > 2 * avg_volume_20
+
+Expressions are parsed by a recursive-descent parser into a tree of tuples
+and evaluated on column arrays with one element per company, so the cost is
+a handful of NumPy operations regardless of the number of companies. The
+arrays come from each company's last sessions in the memory-mapped series
+store (one database query covers companies without a current file), are
+adjusted for corporate actions, and are assembled once per price data
+version, at most every FRAME_TTL seconds.
+
+Grammar (keywords are case-insensitive)::
+
+    expression := or
+    or         := and ('or' and)*
+    and        := not ('and' not)*
+    not        := 'not' not | comparison
+    comparison := sum (('<' | '<=' | '>' | '>=' | '=' | '==' | '!=') sum
+                      | 'in' '(' value (',' value)* ')')?
+    sum        := product (('+' | '-') product)*
+    product    := unary (('*' | '×' | '/') unary)*
+    unary      := '-' unary | atom
+    atom       := number | string | field | '(' expression ')'
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+from itertools import groupby
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+
+from .caching import get_price_data_version
+from .metrics import registry
+from .adjustments import factors_for
+from .models import Company, PriceAdjustment, PriceHistory
+from .series_store import DB_COLUMNS, SERIES_STORE_ENABLED, rows_to_columns, series_store
+
+
+_config = getattr(settings, 'STOCK_SCREENER', {})
+# Longest indicator period, in sessions
+MAX_PERIOD = _config.get('MAX_PERIOD', 250)
+MAX_LENGTH = _config.get('MAX_LENGTH', 500)
+MAX_NODES = _config.get('MAX_NODES', 100)
+MAX_DEPTH = 20
+# Screens slower than this are counted in stock_screener_over_budget_total
+BUDGET_MS = _config.get('BUDGET_MS', 200)
+# Seconds a process reuses a frame; bounds staleness when the price data
+# version misses a save (another process's save with a per-process cache,
+# or the version key was evicted)
+FRAME_TTL = _config.get('FRAME_TTL', 60)
+
+
+PRICE_FIELDS = {
+    'open': 'Latest open',
+    'high': 'Latest high',
+    'low': 'Latest low',
+    'close': 'Latest close',
+    'volume': 'Latest volume',
+    'prev_close': 'Previous session close',
+    'change': 'close - prev_close',
+    'change_pct': 'Change from prev_close, in percent',
+}
+INDICATORS = {
+    'sma': 'Mean close of the last N sessions',
+    'avg_volume': 'Mean volume of the last N sessions',
+    'high': 'Highest high of the last N sessions',
+    'low': 'Lowest low of the last N sessions',
+    'return': 'Change of the close over N sessions, in percent',
+    'volatility': 'Standard deviation of daily log returns over N sessions, in percent',
+}
+TEXT_FIELDS = {
+    'symbol': 'Company symbol',
+    'sector': 'Company sector',
+}
+INDICATOR_RE = re.compile(r'^(' + '|'.join(INDICATORS) + r')_(\d+)$')
+
+TOKEN_RE = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+  | (?P<string>'[^']*'|"[^"]*")
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op><=|>=|!=|==|[<>=+\-*/×(),])
+''', re.VERBOSE)
+KEYWORDS = {'and', 'or', 'not', 'in'}
+COMPARISONS = {'<', '<=', '>', '>=', '=', '==', '!='}
+
+
+class ExpressionError(Exception):
+    """
+    Invalid screener expression; the message is returned to the client as a 400
+    """
+
+
+def tokenize(text: str) -> list[tuple[str, str, int]]:
+    """
+    ``(kind, value, position)`` tokens, ending with an ``('end', '', len)`` token
+    """
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if not match:
+            raise ExpressionError(f'Unexpected character {text[position]!r} at position {position}')
+        kind, value = match.lastgroup, match.group()
+        if kind == 'name' and value.lower() in KEYWORDS:
+            kind, value = 'keyword', value.lower()
+        elif kind == 'string':
+            value = value[1:-1]
+        elif kind == 'op' and value == '×':
+            value = '*'
+        if kind != 'space':
+            tokens.append((kind, value, position))
+        position = match.end()
+    tokens.append(('end', '', len(text)))
+    return tokens
+
+
+class Parser:
+    """
+    Recursive-descent parser producing tuple nodes:
+    ``('number', value)``, ``('string', value)``, ``('field', name)``,
+    ``('neg', node)``, ``('arith', op, left, right)``,
+    ``('compare', op, left, right)``, ``('in', node, values)``,
+    ``('and', left, right)``, ``('or', left, right)`` and ``('not', node)``.
+    """
+
+    def __init__(self, text: str) -> None:
+        if len(text) > MAX_LENGTH:
+            raise ExpressionError(f'Expression is longer than {MAX_LENGTH} characters')
+        self.tokens = tokenize(text)
+        self.index = 0
+        self.nodes = 0
+        self.depth = 0
+
+    def parse(self, kind: str = 'bool'):
+        node = self.expression()
+        if self.peek()[0] != 'end':
+            self.fail('Unexpected')
+        found = node_type(node)
+        if found != kind:
+            expected = 'a condition' if kind == 'bool' else 'a number'
+            raise ExpressionError(f'Expression must be {expected}')
+        return node
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def take(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def accept(self, *values):
+        kind, value, _ = self.peek()
+        if kind in ('op', 'keyword') and value in values:
+            self.index += 1
+            return value
+        return None
+
+    def expect(self, value):
+        if not self.accept(value):
+            self.fail(f'Expected {value!r} but found')
+
+    def fail(self, message):
+        kind, value, position = self.peek()
+        found = 'end of expression' if kind == 'end' else repr(value)
+        raise ExpressionError(f'{message} {found} at position {position}')
+
+    def node(self, *parts):
+        self.nodes += 1
+        if self.nodes > MAX_NODES:
+            raise ExpressionError(f'Expression has more than {MAX_NODES} terms')
+        return parts
+
+    def expression(self):
+        return self.or_()
+
+    def or_(self):
+        node = self.and_()
+        while self.accept('or'):
+            node = self.node('or', node, self.and_())
+        return node
+
+    def and_(self):
+        node = self.not_()
+        while self.accept('and'):
+            node = self.node('and', node, self.not_())
+        return node
+
+    def not_(self):
+        if self.accept('not'):
+            return self.node('not', self.not_())
+        return self.comparison()
+
+    def comparison(self):
+        left = self.sum()
+        op = self.accept(*COMPARISONS)
+        if op:
+            right = self.sum()
+            left, right = text_literals(left, right)
+            return self.node('compare', '==' if op == '=' else op, left, right)
+        if self.accept('in'):
+            self.expect('(')
+            values = [self.sum()]
+            while self.accept(','):
+                values.append(self.sum())
+            self.expect(')')
+            values = [text_literals(left, value)[1] for value in values]
+            return self.node('in', left, tuple(values))
+        return left
+
+    def sum(self):
+        node = self.product()
+        while op := self.accept('+', '-'):
+            node = self.node('arith', op, node, self.product())
+        return node
+
+    def product(self):
+        node = self.unary()
+        while op := self.accept('*', '/'):
+            node = self.node('arith', op, node, self.unary())
+        return node
+
+    def unary(self):
+        if self.accept('-'):
+            return self.node('neg', self.unary())
+        return self.atom()
+
+    def atom(self):
+        if self.accept('('):
+            self.depth += 1
+            if self.depth > MAX_DEPTH:
+                raise ExpressionError(f'Parentheses nested deeper than {MAX_DEPTH}')
+            node = self.expression()
+            self.expect(')')
+            self.depth -= 1
+            return node
+        kind, value, _ = self.peek()
+        if kind == 'number':
+            self.take()
+            return self.node('number', float(value))
+        if kind == 'string':
+            self.take()
+            return self.node('string', value.upper())
+        if kind == 'name':
+            self.take()
+            return self.node('field', value.lower())
+        self.fail('Unexpected')
+
+
+def text_literals(left, right):
+    """
+    Let text fields be compared to bare words: ``sector = BANKING``
+    """
+    if left[0] == 'field' and left[1] in TEXT_FIELDS and right[0] == 'field' and not is_field(right[1]):
+        right = ('string', right[1].upper())
+    elif right[0] == 'field' and right[1] in TEXT_FIELDS and left[0] == 'field' and not is_field(left[1]):
+        left = ('string', left[1].upper())
+    return left, right
+
+
+def is_field(name: str) -> bool:
+    return name in PRICE_FIELDS or name in TEXT_FIELDS or indicator(name) is not None
+
+
+def indicator(name: str):
+    """
+    (kind, period) for an indicator field name like sma_50, else None
+    """
+    match = INDICATOR_RE.match(name)
+    if not match:
+        return None
+    period = int(match.group(2))
+    if not 1 <= period <= MAX_PERIOD:
+        raise ExpressionError(f'{name}: period must be between 1 and {MAX_PERIOD}')
+    return match.group(1), period
+
+
+def node_type(node) -> str:
+    """
+    'number', 'text' or 'bool'; raises ExpressionError for ill-typed trees
+    """
+    kind = node[0]
+    if kind == 'number':
+        return 'number'
+    if kind == 'string':
+        return 'text'
+    if kind == 'field':
+        if node[1] in TEXT_FIELDS:
+            return 'text'
+        if not is_field(node[1]):
+            raise ExpressionError(f'Unknown field {node[1]!r}')
+        return 'number'
+    if kind in ('neg', 'arith'):
+        if any(node_type(child) != 'number' for child in node[1 if kind == 'neg' else 2:]):
+            raise ExpressionError('Arithmetic needs numbers')
+        return 'number'
+    if kind == 'compare':
+        left, right = node_type(node[2]), node_type(node[3])
+        if left != right or left == 'bool':
+            raise ExpressionError(f'Cannot compare {left} with {right}')
+        if left == 'text' and node[1] not in ('==', '!='):
+            raise ExpressionError('Text can only be compared with = or !=')
+        return 'bool'
+    if kind == 'in':
+        left = node_type(node[1])
+        if left == 'bool' or any(node_type(value) != left for value in node[2]):
+            raise ExpressionError('in (...) values must have the type of the left side')
+        return 'bool'
+    if kind in ('and', 'or', 'not'):
+        if any(node_type(child) != 'bool' for child in node[1:]):
+            raise ExpressionError(f'{kind} needs conditions on both sides')
+        return 'bool'
+    raise ExpressionError(f'Unknown node {kind}')
+
+
+def fields_in(node) -> set[str]:
+    if node[0] == 'field':
+        return {node[1]}
+    children = [child for child in node[1:] if isinstance(child, tuple)]
+    if node[0] == 'in':
+        children = [node[1], *node[2]]
+    return set().union(*map(fields_in, children)) if children else set()
+
+
+def lookback(fields) -> int:
+    """
+    Sessions of history needed to compute ``fields``
+    """
+    sessions = 2 if fields & {'prev_close', 'change', 'change_pct'} else 1
+    for name in fields:
+        found = indicator(name)
+        if found:
+            kind, period = found
+            sessions = max(sessions, period + 1 if kind in ('return', 'volatility') else period)
+    return sessions
+
+
+class MarketFrame:
+    """
+    The last ``sessions`` sessions of every company as sessions x companies
+    arrays, aligned on each company's latest session (row -1) and padded
+    with NaN above a short history.
+    """
+
+    def __init__(self, sessions: int) -> None:
+        companies = Company.objects.order_by('symbol')
+        if SERIES_STORE_ENABLED:
+            # What each series file must hold to be current
+            prices = PriceHistory.objects.filter(company_id=OuterRef('pk')).order_by()
+            companies = companies.annotate(
+                last_date=Subquery(prices.order_by('-date').values('date')[:1]),
+                row_count=Subquery(prices.values('company_id').annotate(count=Count('pk')).values('count')),
+            )
+            companies = list(companies.values_list('pk', 'symbol', 'sector', 'last_date', 'row_count'))
+        else:
+            companies = [(*company, None, None) for company in companies.values_list('pk', 'symbol', 'sector')]
+        self.sessions = sessions
+        self.symbols = np.array([company[1] for company in companies], dtype=object)
+        self.sectors = np.array([company[2] for company in companies], dtype=object)
+        self.dates = np.full(len(companies), np.datetime64('NaT'), dtype='datetime64[D]')
+        self.prices = {
+            name: np.full((sessions, len(companies)), np.nan)
+            for name in ('open', 'high', 'low', 'close', 'volume')
+        }
+
+        company_ids = [company[0] for company in companies]
+        windows = {}
+        if SERIES_STORE_ENABLED:
+            windows = store_windows(company_ids, sessions, {
+                company_id: (last_date, row_count or 0) for company_id, _, _, last_date, row_count in companies
+            })
+        missing = [company_id for company_id in company_ids if company_id not in windows]
+        if missing:
+            windows.update(database_windows(missing, sessions))
+        tables = adjustment_tables(company_ids)
+
+        for column, company_id in enumerate(company_ids):
+            window = windows.get(company_id)
+            length = 0 if window is None else len(window['date'])
+            if not length:
+                continue
+            # Split and bonus adjusted, so ex-dates do not look like crashes
+            factors = factors_for(tables.get(company_id), window['date'])
+            self.dates[column] = window['date'][-1]
+            for name, values in self.prices.items():
+                adjusted = window[name] / factors if name == 'volume' else window[name] * factors
+                values[sessions - length:, column] = adjusted
+        self._columns = {}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = self._compute(name)
+        return self._columns[name]
+
+    def _compute(self, name: str) -> np.ndarray:
+        close = self.prices['close']
+        if name == 'symbol':
+            return self.symbols
+        if name == 'sector':
+            return self.sectors
+        if name in ('open', 'high', 'low', 'close', 'volume'):
+            return self.prices[name][-1]
+        if name == 'prev_close':
+            return close[-2]
+        if name == 'change':
+            return close[-1] - close[-2]
+        if name == 'change_pct':
+            return (close[-1] / close[-2] - 1) * 100
+
+        kind, period = indicator(name)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if kind == 'sma':
+                return close[-period:].mean(axis=0)
+            if kind == 'avg_volume':
+                return self.prices['volume'][-period:].mean(axis=0)
+            if kind == 'high':
+                return self.prices['high'][-period:].max(axis=0)
+            if kind == 'low':
+                return self.prices['low'][-period:].min(axis=0)
+            if kind == 'return':
+                return (close[-1] / close[-period - 1] - 1) * 100
+            # volatility
+            return np.diff(np.log(close[-period - 1:]), axis=0).std(axis=0, ddof=1) * 100
+
+
+def store_windows(company_ids, sessions: int, expected: dict | None = None) -> dict:
+    """
+    {company_id: columns} of the last ``sessions`` rows of each company
+    that has a series file
+
+    ``expected`` maps company ids to the (last date, row count) of their
+    prices in the database; files that disagree are stale (prices changed
+    outside save_price_history and the importer) and are left out.
+    """
+    windows = {}
+    for company_id in company_ids:
+        series = series_store.read(company_id)
+        if series is None:
+            continue
+        if expected is not None:
+            last_date, row_count = expected.get(company_id, (None, 0))
+            stored = (len(series), series.date[-1] if len(series) else None)
+            if stored != (row_count, None if last_date is None else np.datetime64(last_date, 'D')):
+                continue
+        windows[company_id] = {name: values[-sessions:] for name, values in series.columns.items()}
+    return windows
+
+
+def database_windows(company_ids, sessions: int) -> dict:
+    """
+    {company_id: columns} of the last ``sessions`` rows of each company, in
+    one query; for companies without a current series file, or with the
+    store off
+    """
+    rows = (
+        PriceHistory.objects.filter(company_id__in=company_ids)
+        .annotate(recent=Window(RowNumber(), partition_by='company_id', order_by=F('date').desc()))
+        .filter(recent__lte=sessions)
+        .order_by('company_id', 'date')
+        .values_list('company_id', *DB_COLUMNS)
+    )
+    windows = {}
+    for company_id, group in groupby(rows, key=lambda row: row[0]):
+        columns = rows_to_columns([row[1:] for row in group])
+        columns['date'] = columns['date'].view('datetime64[D]')
+        windows[company_id] = columns
+    return windows
+
+
+def adjustment_tables(company_ids) -> dict:
+    """
+    {company_id: adjustment table} for the companies with corporate actions
+    """
+    tables = defaultdict(list)
+    for company_id, ex_date, factor in (
+        PriceAdjustment.objects.filter(company_id__in=company_ids)
+        .order_by('company_id', 'ex_date')
+        .values_list('company_id', 'ex_date', 'factor')
+    ):
+        tables[company_id].append((ex_date, factor))
+    return tables
+
+
+# {(price data version, sessions): (built at, frame)}
+_frames: dict[tuple, tuple[float, MarketFrame]] = {}
+_frames_lock = threading.Lock()
+
+
+def market_frame(sessions: int) -> MarketFrame:
+    """
+    MarketFrame for the current price data version, shared by the requests
+    of this process until prices change or FRAME_TTL passes
+    """
+    key = (get_price_data_version(), sessions)
+    now = time.monotonic()
+    with _frames_lock:
+        built_at, frame = _frames.get(key, (None, None))
+    if frame is None or now - built_at >= FRAME_TTL:
+        frame = MarketFrame(sessions)
+        with _frames_lock:
+            for stale in [k for k, (built, _) in _frames.items() if k[0] != key[0] or now - built >= FRAME_TTL]:
+                del _frames[stale]
+            _frames[key] = (now, frame)
+    return frame
+
+
+def evaluate(node, frame: MarketFrame):
+    kind = node[0]
+    if kind in ('number', 'string'):
+        return node[1]
+    if kind == 'field':
+        return frame.column(node[1])
+    if kind == 'neg':
+        return -evaluate(node[1], frame)
+    if kind == 'arith':
+        left, right = evaluate(node[2], frame), evaluate(node[3], frame)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.true_divide}[node[1]](left, right)
+    if kind == 'compare':
+        left, right = evaluate(node[2], frame), evaluate(node[3], frame)
+        with np.errstate(invalid='ignore'):
+            result = {
+                '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+                '==': np.equal, '!=': np.not_equal,
+            }[node[1]](left, right)
+        if node[1] == '!=' and node_type(node[2]) == 'number':
+            # NaN (missing history) never matches
+            result &= ~np.isnan(left) & ~np.isnan(right)
+        return np.broadcast_to(result, (len(frame),))
+    if kind == 'in':
+        left = evaluate(node[1], frame)
+        result = np.zeros(len(frame), dtype=bool)
+        for value in node[2]:
+            result |= np.broadcast_to(left == evaluate(value, frame), (len(frame),))
+        return result
+    if kind == 'and':
+        return evaluate(node[1], frame) & evaluate(node[2], frame)
+    if kind == 'or':
+        return evaluate(node[1], frame) | evaluate(node[2], frame)
+    if kind == 'not':
+        return ~evaluate(node[1], frame)
+    raise ExpressionError(f'Unknown node {kind}')
+
+
+def screen(expression: str, sort: str | None = None, limit: int = 50) -> dict:
+    """
+    Companies matching ``expression``, ranked ascending by the ``sort``
+    expression (``-change_pct`` for biggest gainers first) or by symbol
+    """
+    started = time.perf_counter()
+    condition = Parser(expression).parse('bool')
+    order = Parser(sort).parse('number') if sort else None
+
+    fields = fields_in(condition) | (fields_in(order) if order else set())
+    frame = market_frame(lookback(fields))
+    matched = np.flatnonzero(evaluate(condition, frame))
+
+    if order is not None:
+        keys = np.broadcast_to(evaluate(order, frame), (len(frame),))[matched]
+        # Stable, so ties stay in symbol order; NaN sorts last
+        matched = matched[np.argsort(keys, kind='stable')]
+
+    shown = sorted(fields - set(TEXT_FIELDS) - {'close', 'volume'})
+    results = [
+        {
+            'symbol': frame.symbols[column],
+            'sector': frame.sectors[column],
+            'date': None if np.isnat(frame.dates[column]) else str(frame.dates[column]),
+            'close': _number(frame.column('close')[column]),
+            'volume': _number(frame.column('volume')[column]),
+            **{name: _number(frame.column(name)[column]) for name in shown},
+        }
+        for column in matched[:limit]
+    ]
+    seconds = time.perf_counter() - started
+    registry.observe('stock_screener_seconds', seconds, help='Screener evaluation time')
+    if seconds * 1000 > BUDGET_MS:
+        registry.inc('stock_screener_over_budget_total', help=f'Screens slower than {BUDGET_MS} ms')
+    return {
+        'count': len(matched),
+        'results': results,
+        'took_ms': round(seconds * 1000, 1),
+    }
+
+
+def _number(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
@@ -0,0 +1,166 @@
+import threading
+import time
+
+from django.conf import settings
+from sortedcontainers import SortedList
+
+from .models import Company
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanySearchIndex:
+    """
+    In-memory typeahead index over company symbols and names.
+
+    Prefix lookups run against a sorted list of (key, pk) pairs, where the keys
+    are the lower-cased symbol, the full name and every word of the name.
+    Fuzzy lookups score candidates by trigram similarity.
+
+    The index is built lazily on first use. Company signals keep it up to date
+    in the writing process, and ``max_age`` forces a periodic rebuild so other
+    workers catch up as well.
+    """
+
+    # Match kinds in ranking order
+    EXACT_SYMBOL, SYMBOL_PREFIX, NAME_PREFIX, WORD_PREFIX, FUZZY = range(5)
+    MATCH_NAMES = ('exact', 'symbol', 'name', 'word', 'fuzzy')
+
+    def __init__(self, max_age: float = 300, min_similarity: float = 0.3) -> None:
+        self.max_age = max_age
+        self.min_similarity = min_similarity
+        self._lock = threading.RLock()
+        self._built_at: float | None = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._keys = SortedList()
+        self._docs: dict[int, dict] = {}
+        self._doc_keys: dict[int, list[tuple[str, int, int]]] = {}
+        self._trigrams: dict[str, set[int]] = {}
+
+    def build(self) -> None:
+        with self._lock:
+            self._reset()
+            for doc in Company.objects.values('pk', 'symbol', 'name', 'sector'):
+                self._add(doc)
+            self._built_at = time.monotonic()
+
+    def update(self, company: Company) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove(company.pk)
+            self._add({
+                'pk': company.pk,
+                'symbol': company.symbol,
+                'name': company.name,
+                'sector': company.sector,
+            })
+
+    def remove(self, pk: int) -> None:
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(pk)
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = False) -> list[dict]:
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at > self.max_age:
+                self.build()
+
+            best: dict[int, int] = {}
+            for key, kind, pk in self._keys.irange((query,), (query + '\U0010ffff',)):
+                if kind == self.SYMBOL_PREFIX and key == query:
+                    kind = self.EXACT_SYMBOL
+                if kind < best.get(pk, self.FUZZY + 1):
+                    best[pk] = kind
+
+            scores: dict[int, float] = {}
+            if fuzzy and len(best) < limit:
+                scores = self._fuzzy(query, exclude=best)
+                for pk in scores:
+                    best[pk] = self.FUZZY
+
+            ranked = sorted(
+                best.items(),
+                key=lambda item: (item[1], -scores.get(item[0], 0.0), self._docs[item[0]]['symbol'])
+            )
+            return [
+                {
+                    'symbol': self._docs[pk]['symbol'],
+                    'name': self._docs[pk]['name'],
+                    'sector': self._docs[pk]['sector'],
+                    'match': self.MATCH_NAMES[kind],
+                }
+                for pk, kind in ranked[:limit]
+            ]
+
+    def _fuzzy(self, query: str, exclude: dict[int, int]) -> dict[int, float]:
+        query_grams = _trigrams(query)
+        shared: dict[int, int] = {}
+        for gram in query_grams:
+            for pk in self._trigrams.get(gram, ()):
+                if pk not in exclude:
+                    shared[pk] = shared.get(pk, 0) + 1
+
+        scores = {}
+        for pk, count in shared.items():
+            doc_grams = self._docs[pk]['trigrams']
+            # Best of the symbol and name, so short symbols are not drowned by long names
+            similarity = max(
+                2 * len(query_grams & grams) / (len(query_grams) + len(grams))
+                for grams in doc_grams
+            )
+            if similarity >= self.min_similarity:
+                scores[pk] = similarity
+        return scores
+
+    def _add(self, doc: dict) -> None:
+        pk = doc['pk']
+        symbol = doc['symbol'].lower()
+        name = doc['name'].lower()
+
+        keys = [(symbol, self.SYMBOL_PREFIX, pk), (name, self.NAME_PREFIX, pk)]
+        keys += [(word, self.WORD_PREFIX, pk) for word in set(name.split()[1:])]
+        for key in keys:
+            self._keys.add(key)
+
+        symbol_grams, name_grams = _trigrams(symbol), _trigrams(name)
+        for gram in symbol_grams | name_grams:
+            self._trigrams.setdefault(gram, set()).add(pk)
+
+        self._docs[pk] = {
+            'symbol': doc['symbol'],
+            'name': doc['name'],
+            'sector': doc['sector'],
+            'trigrams': (symbol_grams, name_grams),
+        }
+        self._doc_keys[pk] = keys
+
+    def _remove(self, pk: int) -> None:
+        for key in self._doc_keys.pop(pk, ()):
+            self._keys.discard(key)
+        doc = self._docs.pop(pk, None)
+        if doc is None:
+            return
+        for gram in doc['trigrams'][0] | doc['trigrams'][1]:
+            pks = self._trigrams.get(gram)
+            if pks is not None:
+                pks.discard(pk)
+                if not pks:
+                    del self._trigrams[gram]
+
+
+_config = getattr(settings, 'STOCK_SEARCH_INDEX', {})
+
+company_search_index = CompanySearchIndex(
+    max_age=_config.get('MAX_AGE', 300),
+    min_similarity=_config.get('MIN_SIMILARITY', 0.3),
+)
@@ -19,6 +19,14 @@ class CompanySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
 
+    def __init__(self, *args, **kwargs):
+        # Optional sparse fieldset, e.g. CompanySerializer(qs, many=True, fields=['symbol', 'name'])
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
     def validate_symbol(self, value):
         return value.upper()
 
@@ -36,4 +44,24 @@ class PriceHistorySerializer(serializers.ModelSerializer):
             'volume',
             'created_at'
         ]
-        read_only_fields = ['created_at']
\ No newline at end of file
+        read_only_fields = ['created_at']
+
+
+class SnapshotSerializer(serializers.ModelSerializer):
+    symbol = serializers.CharField(source='company.symbol', read_only=True)
+    name = serializers.CharField(source='company.name', read_only=True)
+    sector = serializers.CharField(source='company.sector', read_only=True)
+
+    class Meta:
+        model = PriceHistory
+        fields = [
+            'symbol',
+            'name',
+            'sector',
+            'date',
+            'open_price',
+            'high_price',
+            'low_price',
+            'close_price',
+            'volume'
+        ]
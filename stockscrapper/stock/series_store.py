@@ -0,0 +1,273 @@
+"""
+Read-optimized, memory-mapped copy of each company's price history.
+
+One file per company holds a small header followed by the date, open, high,
+low, close and volume columns, each a contiguous array of 8-byte values.
+Readers map the file and get zero-copy NumPy views, so any number of worker
+processes share one page-cached copy instead of each building Decimal-laden
+model instances. Files are replaced atomically (write to a temporary file,
+then rename), so a reader sees either the old or the new series, never a mix;
+views taken before a replace keep pointing at the old, still valid mapping.
+
+The store is kept current from save_price_history and the bulk importer;
+``manage.py rebuild_series`` rebuilds it from the database. Writers take an
+flock on a per-company lock file, so merges from several processes do not
+overwrite each other's rows.
+"""
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within a process
+    fcntl = None
+
+import numpy as np
+from django.conf import settings
+
+from .models import PriceHistory
+
+
+MAGIC = b'STKSER01'
+HEADER = struct.Struct('<8sq48x')  # magic, row count, padding to 64 bytes
+COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+DTYPES = {'date': '<i8', 'open': '<f8', 'high': '<f8', 'low': '<f8', 'close': '<f8', 'volume': '<i8'}
+DB_COLUMNS = ('date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
+
+
+class PriceSeries:
+    """
+    Read-only column views over one company's mapped series, ascending by date.
+
+    ``date`` is datetime64[D]; ``open``, ``high``, ``low`` and ``close`` are
+    float64 and ``volume`` int64.
+    """
+
+    def __init__(self, columns: dict) -> None:
+        self.columns = columns
+        for name, values in columns.items():
+            setattr(self, name, values)
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def between(self, start=None, end=None) -> 'PriceSeries':
+        """
+        Views limited to ``start`` <= date <= ``end`` (either may be None)
+        """
+        lo = 0 if start is None else np.searchsorted(self.date, np.datetime64(start, 'D'), side='left')
+        hi = len(self) if end is None else np.searchsorted(self.date, np.datetime64(end, 'D'), side='right')
+        return PriceSeries({name: values[lo:hi] for name, values in self.columns.items()})
+
+
+def encode(columns: dict) -> bytes:
+    length = len(columns['date'])
+    parts = [HEADER.pack(MAGIC, length)]
+    for name in COLUMNS:
+        parts.append(np.ascontiguousarray(columns[name], dtype=DTYPES[name]).tobytes())
+    return b''.join(parts)
+
+
+def decode(buffer) -> PriceSeries:
+    magic, length = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError('Not a price series file')
+    columns = {}
+    offset = HEADER.size
+    for name in COLUMNS:
+        values = np.frombuffer(buffer, dtype=DTYPES[name], count=length, offset=offset)
+        columns[name] = values.view('datetime64[D]') if name == 'date' else values
+        offset += length * 8
+    return PriceSeries(columns)
+
+
+def rows_to_columns(rows) -> dict:
+    """
+    Columns from ascending ``(date, open, high, low, close, volume)`` rows
+    """
+    if not rows:
+        return {name: np.empty(0, dtype=DTYPES[name]) for name in COLUMNS}
+    dates, opens, highs, lows, closes, volumes = zip(*rows)
+    return {
+        'date': np.array(dates, dtype='datetime64[D]').astype('<i8'),
+        'open': np.array(opens, dtype='<f8'),
+        'high': np.array(highs, dtype='<f8'),
+        'low': np.array(lows, dtype='<f8'),
+        'close': np.array(closes, dtype='<f8'),
+        'volume': np.array(volumes, dtype='<i8'),
+    }
+
+
+class SeriesStore:
+    """
+    Directory of per-company series files with a per-process cache of open
+    mappings, reopened when the file on disk has been replaced.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._maps: dict[int, tuple[int, mmap.mmap, PriceSeries]] = {}
+
+    def path(self, company_id: int) -> Path:
+        return self.directory / f'{company_id}.series'
+
+    @contextmanager
+    def locked(self, company_id: int):
+        """
+        Hold the company's write lock, across threads and processes
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._write_lock, open(self.directory / f'{company_id}.lock', 'a') as fp:
+            if fcntl is not None:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+    def read(self, company_id: int) -> PriceSeries | None:
+        """
+        Zero-copy views of the company's series, or None when it has no file
+        """
+        path = self.path(company_id)
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._maps.get(company_id)
+            if cached and cached[0] == inode:
+                return cached[2]
+
+        with open(path, 'rb') as fp:
+            if os.fstat(fp.fileno()).st_size == 0:
+                return None
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            inode = os.fstat(fp.fileno()).st_ino
+        series = decode(mapped)
+        with self._lock:
+            self._maps[company_id] = (inode, mapped, series)
+        return series
+
+    def write(self, company_id: int, columns: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(encode(columns))
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(tmp, self.path(company_id))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def rebuild(self, company_id: int) -> int:
+        """
+        Rewrite the company's file from the database; returns the row count
+        """
+        with self.locked(company_id):
+            return self._rebuild(company_id)
+
+    def _rebuild(self, company_id: int) -> int:
+        rows = list(
+            PriceHistory.objects.filter(company_id=company_id)
+            .order_by('date')
+            .values_list(*DB_COLUMNS)
+        )
+        self.write(company_id, rows_to_columns(rows))
+        return len(rows)
+
+    def update(self, company_id: int, rows) -> int:
+        """
+        Merge saved ``(date, open, high, low, close, volume)`` rows into the
+        company's file; rows for dates already stored replace them. Without a
+        file yet, the series is rebuilt from the database.
+        """
+        with self.locked(company_id):
+            current = self.read(company_id)
+            if current is None:
+                return self._rebuild(company_id)
+            if not rows:
+                return len(current)
+
+            new = rows_to_columns(sorted(rows))
+            old_dates = current.date.view('<i8')
+            keep = ~np.isin(old_dates, new['date'])
+            merged = {
+                name: np.concatenate([
+                    (old_dates if name == 'date' else current.columns[name])[keep],
+                    new[name],
+                ])
+                for name in COLUMNS
+            }
+            order = np.argsort(merged['date'], kind='stable')
+            self.write(company_id, {name: values[order] for name, values in merged.items()})
+            return len(order)
+
+    def delete(self, company_id: int) -> None:
+        self.path(company_id).unlink(missing_ok=True)
+        with self._lock:
+            self._maps.pop(company_id, None)
+
+    @contextmanager
+    def scratch(self):
+        """
+        Point the store at a temporary directory, removed on exit, so runs
+        against a throwaway database never write or delete the live files
+        """
+        directory, maps = self.directory, self._maps
+        self.directory = Path(tempfile.mkdtemp(prefix='series-'))
+        self._maps = {}
+        try:
+            yield self.directory
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory, self._maps = directory, maps
+
+
+_config = getattr(settings, 'STOCK_SERIES_STORE', {})
+SERIES_STORE_ENABLED = _config.get('ENABLED', True)
+
+series_store = SeriesStore(_config.get('DIRECTORY', Path(settings.BASE_DIR) / 'series'))
+
+
+def refresh_series(company_id: int, entries) -> None:
+    """
+    Merge freshly saved PriceHistory ``entries`` into the company's series
+    """
+    if not SERIES_STORE_ENABLED:
+        return
+    series_store.update(company_id, [
+        (e.date, e.open_price, e.high_price, e.low_price, e.close_price, e.volume)
+        for e in entries
+    ])
+
+
+def rebuild_series(company_ids) -> int:
+    """
+    Rewrite the series of ``company_ids`` from the database
+    """
+    if not SERIES_STORE_ENABLED:
+        return 0
+    return sum(series_store.rebuild(company_id) for company_id in company_ids)
+
+
+def load_series(symbol: str) -> PriceSeries | None:
+    """
+    Series for a symbol, for notebooks: ``load_series('NABIL').close``
+    """
+    from .models import Company
+
+    company_id = Company.objects.filter(symbol=symbol.upper()).values_list('pk', flat=True).first()
+    return None if company_id is None else series_store.read(company_id)
@@ -0,0 +1,145 @@
+import json
+
+from django.db import transaction
+
+from .models import PriceHistory, QuarantinedPriceRow, TradingDay
+from .adjustments import refresh_rights_factors
+from .caching import bump_price_data_version
+from .fingerprints import row_digest, stored_row_digests
+from .metrics import registry
+from .pubsub import publish_price_update
+
+
+def without_held_rows(rows):
+    """
+    ``rows`` (unsaved QuarantinedPriceRow objects) less the undated ones
+    already held with the same reason and data. NULL dates never conflict in
+    the unique constraint, so bulk_create(ignore_conflicts=True) alone would
+    add those again on every run.
+    """
+    undated = [row for row in rows if row.date is None]
+    if not undated:
+        return rows
+
+    def key(company_id, source, reason, data):
+        return company_id, source, reason, json.dumps(data, sort_keys=True, default=str)
+
+    held = {
+        key(*values) for values in QuarantinedPriceRow.objects.filter(
+            company_id__in={row.company_id for row in undated},
+            source__in={row.source for row in undated},
+            date__isnull=True,
+        ).values_list('company_id', 'source', 'reason', 'data')
+    }
+    kept = []
+    for row in rows:
+        if row.date is None:
+            row_key = key(row.company_id, row.source, row.reason, row.data)
+            if row_key in held:
+                continue
+            held.add(row_key)
+        kept.append(row)
+    return kept
+
+
+def quarantine_rows(company, rejected, scrapped_data, source='scrape'):
+    """
+    Hold rejected rows back for review, keeping the scraped values as they came.
+    Rows already held for the same date, reason and source are not added again.
+    """
+    rows = [
+        QuarantinedPriceRow(
+            company=company,
+            date=None if row.date != row.date else row.date.date(),  # NaT != NaT
+            reason=row.reason,
+            source=source,
+            data=scrapped_data[index],
+        )
+        for index, row in zip(rejected.index, rejected.itertuples(index=False))
+    ]
+    QuarantinedPriceRow.objects.bulk_create(without_held_rows(rows), ignore_conflicts=True)
+
+
+def save_price_history(company, scrapped_data, report=None):
+    """
+    Validate the scraped batch, quarantine the bad rows and save the rest.
+    Rows identical to the stored ones are not written again.
+
+    ``report``, when given, is filled with the validation counts.
+    """
+    # Imported here so the API process does not load pandas until a save
+    from .series_store import refresh_series
+    from .validation import validate_price_batch
+
+    saved_entries = []
+    if not scrapped_data:
+        return saved_entries
+
+    result = validate_price_batch(company, scrapped_data)
+    valid = result['valid']
+    unchanged = 0
+
+    with transaction.atomic():
+        quarantine_rows(company, result['rejected'], scrapped_data)
+
+        stored = {}
+        if len(valid):
+            stored = stored_row_digests(company, valid['date'].min().date(), valid['date'].max().date())
+        for row in valid.itertuples(index=False):
+            day = row.date.date()
+            if stored.get(day) == row_digest(
+                day, row.open_price, row.high_price, row.low_price, row.close_price, row.volume
+            ):
+                # Same values already stored; skip the write and the updated_at bump
+                unchanged += 1
+                continue
+
+            # Create or update price history entry
+            price_history, created = PriceHistory.objects.update_or_create(
+                company=company,
+                date=day,
+                defaults={
+                    'open_price': row.open_price,
+                    'high_price': row.high_price,
+                    'low_price': row.low_price,
+                    'close_price': row.close_price,
+                    'volume': int(row.volume)
+                }
+            )
+            saved_entries.append(price_history)
+
+        if saved_entries:
+            TradingDay.objects.bulk_create(
+                [TradingDay(date=day) for day in {entry.date for entry in saved_entries}],
+                ignore_conflicts=True
+            )
+            # Rights factors are computed from the last close before the
+            # ex-date, which may have just arrived or changed
+            saved_dates = [entry.date for entry in saved_entries]
+            refresh_rights_factors(company.pk, min(saved_dates), max(saved_dates))
+
+            # Push the new rows to stream subscribers once they are visible to
+            # readers, and keep the memory-mapped series current. The rows are
+            # saved by then, so a failure of either is logged, not raised.
+            transaction.on_commit(lambda: publish_price_update(company, saved_entries), robust=True)
+            transaction.on_commit(lambda: refresh_series(company.pk, saved_entries), robust=True)
+            transaction.on_commit(bump_price_data_version)
+
+    if unchanged:
+        registry.inc('price_writes_avoided_total', unchanged,
+                     help='Scraped rows not written because the stored row was identical')
+
+    if report is not None:
+        report.update({
+            'saved': len(saved_entries),
+            'unchanged': unchanged,
+            'quarantined': len(result['rejected']),
+            'quarantine_reasons': {
+                reason: int(count) for reason, count in result['rejected']['reason'].value_counts().items()
+            },
+            'duplicates_dropped': result['duplicates'],
+            'gap_count': result['gap_count'],
+            'gaps': [day.isoformat() for day in result['gaps']],
+        })
+
+    return saved_entries
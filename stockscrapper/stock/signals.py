@@ -0,0 +1,61 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import bump_company_list_version, bump_price_data_version
+from .middleware import install_query_counter
+from .adjustments import apply_corporate_action, rebuild_adjustments
+from .models import Company, CorporateAction, ScrapeTask
+from .resolvers import symbol_resolver
+from .search import company_search_index
+from .series_store import series_store
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_caches(sender, instance, **kwargs):
+    bump_company_list_version()
+    symbol_resolver.invalidate(instance)
+
+
+@receiver(post_save, sender=Company)
+def index_company(sender, instance, **kwargs):
+    company_search_index.update(instance)
+
+
+@receiver(post_delete, sender=Company)
+def unindex_company(sender, instance, **kwargs):
+    company_search_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Company)
+def queue_scrape(sender, instance, created, raw=False, **kwargs):
+    # New companies are due for a scrape right away
+    if created and not raw:
+        ScrapeTask.objects.get_or_create(company=instance, defaults={'due_at': timezone.now()})
+
+
+@receiver(post_delete, sender=Company)
+def drop_series(sender, instance, **kwargs):
+    series_store.delete(instance.pk)
+
+
+@receiver(post_save, sender=CorporateAction)
+def materialize_adjustment(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_corporate_action(instance)
+    else:
+        rebuild_adjustments(instance.company_id)
+    bump_price_data_version()
+
+
+@receiver(post_delete, sender=CorporateAction)
+def drop_adjustment(sender, instance, **kwargs):
+    rebuild_adjustments(instance.company_id)
+    bump_price_data_version()
+
+
+connection_created.connect(install_query_counter, dispatch_uid='stock-query-counter')
@@ -0,0 +1,21 @@
+from contextlib import ExitStack
+
+from django.test.runner import DiscoverRunner
+
+from .series_store import series_store
+
+
+class StockTestRunner(DiscoverRunner):
+    """
+    Test runner that gives the suite a scratch series store, as the test
+    database's companies share ids with the live ones
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._scratch = ExitStack()
+        self._scratch.enter_context(series_store.scratch())
+
+    def teardown_test_environment(self, **kwargs):
+        self._scratch.close()
+        super().teardown_test_environment(**kwargs)
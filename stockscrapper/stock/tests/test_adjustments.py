@@ -0,0 +1,129 @@
+import io
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase
+
+from stock import series_store
+from stock.adjustments import (
+    action_factor, adjust_rows, adjustment_table, factors_for, rebuild_adjustments, refresh_rights_factors
+)
+from stock.importers import import_price_history
+from stock.models import Company, CorporateAction, PriceAdjustment, PriceHistory
+from stock.series_store import SeriesStore
+from stock.services import save_price_history
+
+
+class ActionFactorTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+        PriceHistory.objects.create(company=self.company, date=date(2024, 3, 1), open_price=400,
+                                    high_price=410, low_price=390, close_price=400, volume=10)
+
+    def action(self, action_type, ratio, ex_date=date(2024, 3, 5), issue_price=None):
+        # post_save folds it into the materialized factors
+        return CorporateAction.objects.create(company=self.company, action_type=action_type,
+                                              ratio=ratio, ex_date=ex_date, issue_price=issue_price)
+
+    def test_bonus_and_split(self):
+        self.assertAlmostEqual(action_factor(self.action('bonus', '0.1')), 1 / 1.1)
+        self.assertAlmostEqual(action_factor(self.action('split', '1', ex_date=date(2024, 4, 1))), 0.5)
+
+    def test_rights_uses_last_close(self):
+        # 1 right per 2 held at 100: TERP = (400 + 100 * 0.5) / 1.5 = 300
+        self.assertAlmostEqual(action_factor(self.action('rights', '0.5', issue_price=100)), 0.75)
+
+    def test_rights_without_earlier_close(self):
+        self.assertEqual(action_factor(self.action('rights', '0.5', ex_date=date(2024, 1, 1), issue_price=100)), 1.0)
+
+
+class IncrementalFactorTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='Hydro', symbol='HYDRO', sector='HYDROPOWER')
+        PriceHistory.objects.bulk_create([
+            PriceHistory(company=self.company, date=date(2024, 1, 1) + timedelta(i), open_price=100,
+                         high_price=100, low_price=100, close_price=100, volume=1000)
+            for i in range(100)
+        ])
+
+    def add(self, ex_day, action_type='bonus', ratio='0.25', issue_price=None):
+        CorporateAction.objects.create(company=self.company, action_type=action_type, ratio=ratio,
+                                       ex_date=date(2024, 1, 1) + timedelta(ex_day), issue_price=issue_price)
+
+    def test_out_of_order_actions_match_a_rebuild(self):
+        # Added newest, oldest, middle, then a second action on an existing ex-date
+        self.add(80)
+        self.add(20, 'split', '1')
+        self.add(50, 'rights', '0.5', issue_price=40)
+        self.add(20, 'bonus', '0.1')
+        incremental = adjustment_table(self.company)
+
+        rebuild_adjustments(self.company.pk)
+        rebuilt = adjustment_table(self.company)
+        self.assertEqual([day for day, _ in incremental], [day for day, _ in rebuilt])
+        np.testing.assert_allclose([f for _, f in incremental], [f for _, f in rebuilt])
+
+        # Before every ex-date: 0.8 (bonus) * 0.8 (rights) * 0.5 (split) / 1.1 (bonus)
+        factors = dict(incremental)
+        self.assertAlmostEqual(factors[date(2024, 1, 21)], 0.8 * 0.8 * 0.5 / 1.1)
+        self.assertAlmostEqual(factors[date(2024, 3, 21)], 0.8)
+
+    def test_factors_for_dates(self):
+        self.add(50)
+        table = adjustment_table(self.company)
+        days = [date(2024, 1, 1), date(2024, 2, 19), date(2024, 2, 20), date(2024, 4, 1)]
+        np.testing.assert_allclose(factors_for(table, days), [0.8, 0.8, 1.0, 1.0])
+
+        rows = [(days[0], 100, 100, 100, 100, 1000), (days[2], 100, 100, 100, 100, 1000)]
+        self.assertEqual(adjust_rows(table, rows)[0][1:], (80.0, 80.0, 80.0, 80.0, 1250))
+        self.assertEqual(adjust_rows(table, rows)[1][1:], (100.0, 100.0, 100.0, 100.0, 1000))
+
+    def test_delete_rebuilds(self):
+        self.add(50)
+        self.add(70)
+        CorporateAction.objects.filter(ex_date=date(2024, 2, 20)).delete()
+        self.assertEqual(list(PriceAdjustment.objects.values_list('ex_date', flat=True)), [date(2024, 3, 11)])
+
+
+class PendingRightsFactorTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(series_store, 'series_store', SeriesStore(Path(tempfile.mkdtemp())))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+        # Recorded before any price: nothing to compute the factor from yet
+        CorporateAction.objects.create(company=self.company, action_type='rights', ratio='0.5',
+                                       ex_date=date(2024, 3, 5), issue_price=100)
+
+    def factors(self):
+        return dict(adjustment_table(self.company))
+
+    def test_scrapes_saving_the_cum_date_close_rebuild(self):
+        self.assertEqual(self.factors(), {date(2024, 3, 5): 1.0})
+        save_price_history(self.company, [{
+            'date': '2024-03-01', 'open_price': 400, 'high_price': 410, 'low_price': 390,
+            'close_price': 400, 'volume': 10,
+        }])
+        self.assertAlmostEqual(self.factors()[date(2024, 3, 5)], 0.75)
+
+    def test_imports_saving_the_cum_date_close_rebuild(self):
+        file = io.BytesIO(b'date,open,high,low,close,volume\n2024-03-01,400,410,390,400,10\n')
+        file.name = 'prices.csv'
+        import_price_history(file, symbol='BANK')
+        self.assertAlmostEqual(self.factors()[date(2024, 3, 5)], 0.75)
+
+    def test_other_rows_leave_the_factors_alone(self):
+        PriceHistory.objects.bulk_create([
+            PriceHistory(company=self.company, date=day, open_price=400, high_price=410,
+                         low_price=390, close_price=400, volume=10)
+            for day in (date(2024, 2, 1), date(2024, 3, 1), date(2024, 3, 6))
+        ])
+        # Rows before the cum date and on or after the ex-date do not change the close used
+        with mock.patch('stock.adjustments.rebuild_adjustments') as rebuild:
+            self.assertFalse(refresh_rights_factors(self.company.pk, date(2024, 2, 1), date(2024, 2, 1)))
+            self.assertFalse(refresh_rights_factors(self.company.pk, date(2024, 3, 6), date(2024, 3, 6)))
+            self.assertTrue(refresh_rights_factors(self.company.pk, date(2024, 2, 1), date(2024, 3, 1)))
+        rebuild.assert_called_once_with(self.company.pk)
@@ -0,0 +1,73 @@
+import datetime
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from account.models import CustomUser
+from stock import admin as stock_admin
+from stock.models import Company, PriceHistory
+
+CHANGELIST = '/admin/stock/pricehistory/'
+
+
+class PriceHistoryAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            email='admin@example.com', password='pw', role='admin',
+            first_name='Ad', last_name='Min', phone_no='1', gender='male'
+        )
+        start = datetime.date(2024, 1, 1)
+        for i in range(5):
+            company = Company.objects.create(name=f'Co{i}', symbol=f'C{i}', sector='BANKING')
+            PriceHistory.objects.bulk_create(
+                PriceHistory(company=company, date=start + datetime.timedelta(days=day), open_price=1,
+                             high_price=2, low_price=1, close_price=1, volume=1)
+                for day in range(30)
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist_joins_companies(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(CHANGELIST)
+        self.assertEqual(response.status_code, 200)
+        per_company = [q['sql'] for q in queries.captured_queries
+                       if 'FROM "stock_company"' in q['sql'] and 'WHERE "stock_company"."id" =' in q['sql']]
+        self.assertEqual(per_company, [])
+        self.assertContains(response, 'name="company_symbol"')
+
+    def test_large_unfiltered_lists_use_the_estimate(self):
+        with mock.patch.object(stock_admin, 'EXACT_COUNT_THRESHOLD', 10):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(CHANGELIST)
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'COUNT(*)' in q['sql']])
+        self.assertContains(response, '150 price')
+
+        # Filtered lists are counted exactly
+        with mock.patch.object(stock_admin, 'EXACT_COUNT_THRESHOLD', 10):
+            response = self.client.get(CHANGELIST, {'company_symbol': 'c1'})
+        self.assertContains(response, '30 price')
+
+    def test_company_autocomplete(self):
+        response = self.client.get('/admin/autocomplete/', {
+            'app_label': 'stock', 'model_name': 'pricehistory', 'field_name': 'company', 'term': 'C1',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'Co1 (C1)')
+
+    def test_export_streams_the_selection(self):
+        response = self.client.post(f'{CHANGELIST}?company_symbol=C2', {
+            'action': 'export_csv',
+            'select_across': '1',
+            '_selected_action': [str(PriceHistory.objects.first().pk)],
+            'index': 0,
+        })
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'symbol,date,open,high,low,close,volume')
+        self.assertEqual(lines[1], 'C2,2024-01-01,1.00,2.00,1.00,1.00,1')
+        self.assertEqual(len(lines), 31)
@@ -0,0 +1,168 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from stock.admission import AdmissionRejected, ScrapeAdmission
+from stock.models import Company
+
+
+class ScrapeAdmissionTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def start(self, target, *args):
+        thread = threading.Thread(target=target, args=args)
+        thread.start()
+        self.addCleanup(thread.join)
+        return thread
+
+    def test_limits_queue_and_shares_running_scrapes(self):
+        admission = ScrapeAdmission(max_in_flight=1, max_queued=1, queue_timeout=2, poll_interval=0.02)
+        gate = threading.Event()
+        calls, out = [], {}
+
+        def scrape(tag):
+            calls.append(tag)
+            gate.wait()
+            return tag
+
+        def run(name, key, tag):
+            try:
+                out[name] = admission.run(key, lambda: scrape(tag))
+            except AdmissionRejected as e:
+                out[name] = e.retry_after
+
+        threads = []
+        for name, key, tag in [('a', 1, 'A'), ('shared', 1, 'A2'), ('b', 2, 'B')]:
+            threads.append(self.start(run, name, key, tag))
+            time.sleep(0.1)
+        # One running, one queued: the queue is full
+        run('c', 3, 'C')
+        self.assertEqual(out['c'], 2)
+        stats = admission.stats()
+        self.assertEqual((stats['in_flight'], stats['queued']), (1, 1))
+
+        gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(out['a'], ('A', False))
+        self.assertEqual(out['shared'], ('A', True))
+        self.assertEqual(out['b'], ('B', False))
+        self.assertEqual(calls, ['A', 'B'])
+        stats = admission.stats()
+        self.assertEqual((stats['in_flight'], stats['admitted'], stats['shared'], stats['rejected']), (0, 2, 1, 1))
+
+    def test_lower_priority_value_goes_first(self):
+        admission = ScrapeAdmission(max_in_flight=1, max_queued=5, queue_timeout=5, poll_interval=0.02)
+        gate = threading.Event()
+        order = []
+        first = self.start(admission.run, 0, gate.wait)
+        time.sleep(0.05)
+        waiters = []
+        for key, priority in [(1, 1), (2, 1), (3, 0)]:
+            waiters.append(self.start(admission.run, key, lambda key=key: order.append(key), priority))
+            time.sleep(0.05)
+        gate.set()
+        first.join()
+        for thread in waiters:
+            thread.join()
+        self.assertEqual(order[0], 3)
+        self.assertEqual(sorted(order), [1, 2, 3])
+
+    def test_queue_timeout_rejects(self):
+        admission = ScrapeAdmission(max_in_flight=1, max_queued=1, queue_timeout=0.2, poll_interval=0.02)
+        gate = threading.Event()
+        self.start(admission.run, 1, gate.wait)
+        time.sleep(0.05)
+        with self.assertRaisesMessage(AdmissionRejected, 'Timed out waiting for a scrape slot'):
+            admission.run(2, lambda: 'late')
+        gate.set()
+
+    def test_errors_reach_requests_sharing_the_scrape(self):
+        admission = ScrapeAdmission(max_in_flight=1, max_queued=1, queue_timeout=2, poll_interval=0.02)
+        gate = threading.Event()
+        out = {}
+
+        def broken():
+            gate.wait()
+            raise ValueError('bad page')
+
+        def run(name):
+            try:
+                out[name] = admission.run(7, broken)
+            except Exception as e:
+                out[name] = f'{type(e).__name__}: {e}'
+
+        leader = self.start(run, 'leader')
+        time.sleep(0.1)
+        follower = self.start(run, 'follower')
+        time.sleep(0.1)
+        gate.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(out, {'leader': 'ValueError: bad page', 'follower': 'RuntimeError: bad page'})
+        self.assertEqual(admission.stats()['in_flight'], 0)
+
+    def test_instances_on_one_cache_share_slots_and_scrapes(self):
+        # Separate instances stand in for separate processes
+        one = ScrapeAdmission(max_in_flight=1, max_queued=0, queue_timeout=1, poll_interval=0.02)
+        two = ScrapeAdmission(max_in_flight=1, max_queued=0, queue_timeout=1, poll_interval=0.02)
+        gate = threading.Event()
+        out = {}
+        leader = self.start(lambda: out.setdefault('one', one.run(1, lambda: gate.wait() and 'x')))
+        time.sleep(0.1)
+        with self.assertRaises(AdmissionRejected):
+            two.run(2, lambda: 'y')
+        follower = self.start(lambda: out.setdefault('two', two.run(1, lambda: 'z')))
+        time.sleep(0.1)
+        gate.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(out, {'one': ('x', False), 'two': ('x', True)})
+
+    def test_running_scrapes_keep_their_slot_past_the_timeout(self):
+        admission = ScrapeAdmission(max_in_flight=1, max_queued=0, shared_timeout=0.6, poll_interval=0.02)
+        other = ScrapeAdmission(max_in_flight=1, max_queued=0, queue_timeout=0.1, poll_interval=0.02)
+        out = {}
+
+        def slow():
+            time.sleep(1.5)
+            return 'done'
+
+        leader = self.start(lambda: out.setdefault('leader', admission.run(1, slow)))
+        time.sleep(1)
+        self.assertEqual(admission.stats()['in_flight'], 1)
+        with self.assertRaises(AdmissionRejected):
+            other.run(2, lambda: 'second')
+        # Requests for the same company still share the running scrape
+        self.assertEqual(other.run(1, lambda: 'again'), ('done', True))
+        leader.join()
+        self.assertEqual(out['leader'], ('done', False))
+        self.assertEqual(admission.stats()['in_flight'], 0)
+
+
+class UpdateEndpointAdmissionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            email='admin@example.com', password='pw', role='admin'
+        ))
+        Company.objects.create(name='Bank', symbol='BANK', sector='BANKING', website='http://example.com')
+
+    def test_rejected_scrapes_answer_503(self):
+        rejected = AdmissionRejected('Too many scrapes queued', 30)
+        with mock.patch('stock.views.scrape_admission.run', side_effect=rejected):
+            response = self.client.post('/api/companies/price-history/update/', {'company': 'BANK'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_admitted_scrapes_report_sharing(self):
+        with mock.patch('stock.views.UpdatePriceHistoryAPIView._scrape', return_value={'message': 'ok'}):
+            response = self.client.post('/api/companies/price-history/update/', {'company': 'BANK'})
+        self.assertEqual(response.json(), {'message': 'ok', 'shared': False})
@@ -0,0 +1,139 @@
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from stock import analytics
+from stock.analytics import equal_weight_index, pairwise_moments, rolling_beta, window_dates
+from stock.models import Company, PriceHistory, TradingDay
+
+START = date(2024, 1, 1)
+
+
+class PairwiseMomentsTests(SimpleTestCase):
+    def setUp(self):
+        self.returns = np.random.default_rng(7).normal(0, 0.02, size=(120, 4))
+
+    def test_matches_numpy_on_complete_data(self):
+        cov, var_x, var_y, n = pairwise_moments(self.returns, self.returns, min_periods=2)
+        np.testing.assert_allclose(cov, np.cov(self.returns, rowvar=False))
+        np.testing.assert_allclose(np.diag(var_x), self.returns.var(axis=0, ddof=1))
+        np.testing.assert_allclose(var_x, var_y.T)
+        self.assertTrue((n == 120).all())
+
+    def test_pairwise_complete(self):
+        x = self.returns.copy()
+        x[:30, 0] = np.nan
+        x[100:, 1] = np.nan
+        cov, var_x, var_y, n = pairwise_moments(x, x, min_periods=2)
+
+        both = slice(30, 100)
+        self.assertEqual(n[0, 1], 70)
+        np.testing.assert_allclose(cov[0, 1], np.cov(x[both, 0], x[both, 1])[0, 1])
+        # Each variance is over the rows the pair has in common
+        np.testing.assert_allclose(var_x[0, 1], x[both, 0].var(ddof=1))
+        np.testing.assert_allclose(var_y[0, 1], x[both, 1].var(ddof=1))
+
+    def test_min_periods(self):
+        x = self.returns[:, :2].copy()
+        x[10:, 1] = np.nan
+        cov, var_x, var_y, n = pairwise_moments(x, x, min_periods=20)
+        self.assertEqual(n[0, 1], 10)
+        self.assertTrue(np.isnan(cov[0, 1]) and np.isnan(var_x[0, 1]) and np.isnan(var_y[0, 1]))
+        self.assertFalse(np.isnan(cov[0, 0]))
+
+
+class RollingBetaTests(SimpleTestCase):
+    def test_matches_window_by_window(self):
+        rng = np.random.default_rng(11)
+        index = rng.normal(0, 0.01, 80)
+        x = np.column_stack([1.5 * index + rng.normal(0, 0.002, 80), rng.normal(0, 0.01, 80)])
+        x[20:25, 1] = np.nan
+
+        betas = rolling_beta(x, index, window=30, min_periods=10)
+        self.assertEqual(betas.shape, (51, 2))
+        for end in (30, 47, 80):
+            for column in range(2):
+                rows = slice(end - 30, end)
+                ok = ~np.isnan(x[rows, column])
+                xs, ms = x[rows, column][ok], index[rows][ok]
+                expected = np.cov(xs, ms)[0, 1] / ms.var(ddof=1)
+                self.assertAlmostEqual(betas[end - 30, column], expected)
+        self.assertTrue(np.allclose(betas[:, 0], 1.5, atol=0.1))
+
+    def test_too_few_observations(self):
+        x = np.full((40, 1), np.nan)
+        x[-5:, 0] = [0.01, -0.02, 0.03, 0.0, 0.01]
+        betas = rolling_beta(x, np.linspace(-0.01, 0.01, 40), window=20, min_periods=10)
+        self.assertTrue(np.isnan(betas).all())
+
+    def test_equal_weight_index_skips_missing(self):
+        returns = np.array([[0.01, np.nan, 0.03], [np.nan, np.nan, np.nan]])
+        np.testing.assert_allclose(equal_weight_index(returns), [0.02, np.nan])
+
+
+class WindowDatesTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+
+    def prices(self, days, calendar=True):
+        PriceHistory.objects.bulk_create(
+            PriceHistory(company=self.company, date=START + timedelta(day), open_price=100, high_price=110,
+                         low_price=90, close_price=100 + day, volume=10)
+            for day in days
+        )
+        if calendar:
+            TradingDay.objects.bulk_create(TradingDay(date=START + timedelta(day)) for day in days)
+
+    def test_uses_the_calendar(self):
+        self.prices(range(10))
+        self.assertEqual(window_dates(3), (START + timedelta(6), START + timedelta(9)))
+        self.assertEqual(window_dates(3, end=START + timedelta(5)), (START + timedelta(2), START + timedelta(5)))
+        self.assertIsNone(window_dates(3, end=START - timedelta(1)))
+
+    def test_falls_back_to_price_dates_past_the_calendar(self):
+        self.prices(range(10))
+        # Added without calendar days, as admin edits are
+        self.prices(range(10, 12), calendar=False)
+        self.assertEqual(window_dates(3), (START + timedelta(8), START + timedelta(11)))
+
+    def test_falls_back_to_price_dates_when_the_calendar_is_short(self):
+        self.prices(range(5), calendar=False)
+        self.prices(range(5, 7))
+        self.assertEqual(window_dates(10), (START, START + timedelta(6)))
+
+    def test_no_prices(self):
+        TradingDay.objects.create(date=START)
+        self.assertIsNone(window_dates(3))
+
+
+class CorrelationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            email='editor@example.com', password='pw', role='editor'
+        ))
+        rng = np.random.default_rng(3)
+        for symbol in ('AAA', 'BBB'):
+            company = Company.objects.create(name=symbol, symbol=symbol, sector='BANKING')
+            closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 30)))
+            PriceHistory.objects.bulk_create(
+                PriceHistory(company=company, date=START + timedelta(day), open_price=close, high_price=close,
+                             low_price=close, close_price=round(close, 2), volume=10)
+                for day, close in enumerate(closes)
+            )
+
+    def test_results_are_cached_with_a_timeout(self):
+        # No calendar rows: the window comes from the price dates
+        with mock.patch('stock.views.cache.set', wraps=cache.set) as cache_set:
+            response = self.client.get('/api/companies/analytics/correlation/', {'window': 20})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['observations'], 20)
+        self.assertEqual(response.json()['symbols'], ['AAA', 'BBB'])
+        self.assertEqual(cache_set.call_args.args[2], analytics.CACHE_TIMEOUT)
+        self.assertEqual(analytics.CACHE_TIMEOUT, 300)
@@ -0,0 +1,73 @@
+import json
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from account.models import CustomUser
+from stock.models import Company, PriceHistory
+
+
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = CustomUser.objects.create_user(email='editor@example.com', password='secret', role='editor')
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        for i in range(3):
+            company = Company.objects.create(name=f'Company {i}', symbol=f'S{i}',
+                                             sector='BANKING' if i else 'HYDROPOWER')
+            for day in range(5):
+                PriceHistory.objects.create(company=company, date=date(2024, 1, 1 + day), open_price=10,
+                                            high_price=11, low_price=9, close_price=10 + day % 2, volume=5)
+        self.company = Company.objects.get(symbol='S1')
+
+    def get(self, path, params=None):
+        return self.async_client.get(f'/api/companies/async/{path}', params or {}, headers=self.headers)
+
+    async def test_same_payloads_as_the_sync_views(self):
+        cases = [
+            ('', {'page_size': 2}),
+            ('', {'page_size': 2, 'page': 2}),
+            ('', {'fields': 'symbol', 'sector': 'banking'}),
+            ('', {'fields': 'bad'}),
+            ('', {'page': 9}),
+            (f'{self.company.pk}/', {}),
+            ('0/', {}),
+            ('price-history/', {'symbol': 's1'}),
+            ('price-history/', {'symbol': 's1', 'max_points': 3}),
+            ('price-history/', {'symbol': 's1', 'start_date': '2030-01-01'}),
+            ('price-history/', {'symbol': 's1', 'start_date': 'bad'}),
+            ('price-history/', {'symbol': 'zz'}),
+            ('price-history/', {}),
+            ('snapshot/', {}),
+            ('snapshot/', {'sector': 'hydropower'}),
+        ]
+        sync_get = sync_to_async(self.client.get)
+        for path, params in cases:
+            with self.subTest(path=path, params=params):
+                expected = await sync_get(f'/api/companies/{path}', params, headers=self.headers)
+                response = await self.get(path, params)
+                self.assertEqual(response.status_code, expected.status_code)
+                if expected.status_code == 200:
+                    # Page links point back at the endpoint that was asked
+                    self.assertEqual(
+                        json.loads(response.content.decode().replace('/api/companies/async/', '/api/companies/')),
+                        expected.json()
+                    )
+
+    async def test_snapshot_has_the_latest_row(self):
+        data = (await self.get('snapshot/', {'sector': 'banking'})).json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([row['date'] for row in data['results']], ['2024-01-05', '2024-01-05'])
+
+    async def test_authentication_and_permissions(self):
+        self.assertEqual((await self.async_client.get('/api/companies/async/snapshot/')).status_code, 401)
+        response = await self.async_client.get('/api/companies/async/', headers={'Authorization': 'Bearer nonsense'})
+        self.assertEqual(response.status_code, 401)
+        # Editors may not delete; the read-only views have no POST
+        response = await self.async_client.delete('/api/companies/async/snapshot/', headers=self.headers)
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.post('/api/companies/async/snapshot/', headers=self.headers)
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from stock.models import Company
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class CompanyListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(60):
+            Company.objects.create(name=f'Company {i:02}', symbol=f'S{i:02}',
+                                   sector='BANKING' if i % 2 else 'OTHERS', description='x' * 1000)
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            email='editor@example.com', password='secret', role='editor'
+        ))
+
+    def test_pagination(self):
+        first = self.client.get('/api/companies/').json()
+        self.assertEqual((first['count'], len(first['results']), first['previous']), (60, 50, None))
+        self.assertTrue(first['next'].endswith('/api/companies/?page=2'))
+
+        last = self.client.get('/api/companies/', {'page': 2}).json()
+        self.assertEqual((len(last['results']), last['next']), (10, None))
+        self.assertTrue(last['previous'].endswith('/api/companies/'))
+
+        self.assertEqual(len(self.client.get('/api/companies/', {'page_size': 1000}).json()['results']), 60)
+        self.assertEqual(self.client.get('/api/companies/', {'page': 3}).status_code, 404)
+
+    def test_filters_and_fields(self):
+        response = self.client.get('/api/companies/', {'fields': 'symbol,name', 'sector': 'banking', 'symbol': 's1'})
+        self.assertEqual(response.json()['count'], 5)
+        self.assertEqual(response.json()['results'][0], {'symbol': 'S11', 'name': 'Company 11'})
+
+        self.assertEqual(self.client.get('/api/companies/', {'fields': 'bogus'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/companies/', {'sector': 'nowhere'}).status_code, 400)
+
+    def test_cached_pages_are_invalidated(self):
+        params = {'sector': 'banking', 'symbol': 's1'}
+        self.assertEqual(self.client.get('/api/companies/', params).json()['count'], 5)
+        with self.assertNumQueries(0):
+            self.client.get('/api/companies/', params)
+
+        Company.objects.create(name='New', symbol='S1Z', sector='BANKING')
+        self.assertEqual(self.client.get('/api/companies/', params).json()['count'], 6)
+        Company.objects.get(symbol='S1Z').delete()
+        self.assertEqual(self.client.get('/api/companies/', params).json()['count'], 5)
+
+    def test_cached_links_follow_the_request_host(self):
+        for prefix in ('/api/companies/', '/api/companies/async/'):
+            with self.subTest(prefix=prefix):
+                one = self.client.get(prefix, {'page': 2, 'page_size': 1}, HTTP_HOST='one.example').json()
+                two = self.client.get(prefix, {'page': 2, 'page_size': 1}, HTTP_HOST='two.example').json()
+                self.assertIn('one.example', one['next'])
+                self.assertIn('two.example', two['next'])
+                self.assertIn('two.example', two['previous'])
+                self.assertEqual(one['results'], two['results'])
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from stock.downsample import downsample_price_rows, lttb, ohlc_buckets
+from stock.models import Company, PriceHistory
+
+
+class LttbTests(SimpleTestCase):
+    def test_keeps_endpoints_and_count(self):
+        x = np.arange(1000)
+        y = np.sin(x / 50)
+        picked = lttb(x, y, 100)
+        self.assertEqual(len(picked), 100)
+        self.assertEqual((picked[0], picked[-1]), (0, 999))
+        self.assertTrue((np.diff(picked) > 0).all())
+
+    def test_keeps_a_spike(self):
+        y = np.zeros(500)
+        y[237] = 50
+        self.assertIn(237, lttb(np.arange(500), y, 20))
+
+    def test_short_series(self):
+        np.testing.assert_array_equal(lttb([1, 2, 3], [3, 2, 1], 10), [0, 1, 2])
+        with self.assertRaises(ValueError):
+            lttb(np.arange(10), np.arange(10), 2)
+
+
+class OhlcBucketsTests(SimpleTestCase):
+    def test_aggregates(self):
+        dates = [date(2024, 1, 1) + timedelta(i) for i in range(7)]
+        opens = [10, 11, 12, 13, 14, 15, 16]
+        highs = [12, 15, 13, 14, 20, 16, 17]
+        lows = [9, 10, 8, 12, 13, 11, 15]
+        closes = [11, 12, 13, 14, 15, 16, 17]
+        volumes = [100, 200, 300, 400, 500, 600, 700]
+
+        candles = ohlc_buckets(dates, opens, highs, lows, closes, volumes, 3)
+        self.assertEqual(candles, [
+            {'date': dates[0], 'end_date': dates[1], 'open_price': '10.00', 'high_price': '15.00',
+             'low_price': '9.00', 'close_price': '12.00', 'volume': 300},
+            {'date': dates[2], 'end_date': dates[3], 'open_price': '12.00', 'high_price': '14.00',
+             'low_price': '8.00', 'close_price': '14.00', 'volume': 700},
+            {'date': dates[4], 'end_date': dates[6], 'open_price': '14.00', 'high_price': '20.00',
+             'low_price': '11.00', 'close_price': '17.00', 'volume': 1800},
+        ])
+
+    def test_rows_that_fit_are_unchanged(self):
+        rows = [(date(2024, 1, 1) + timedelta(i), 10, 11, 9, 10, 100) for i in range(5)]
+        self.assertEqual(len(downsample_price_rows(rows, 10)), 5)
+        self.assertEqual(len(downsample_price_rows(rows, 3, mode='line')), 3)
+        self.assertEqual(len(downsample_price_rows(rows, 2)), 2)
+
+
+class DownsampledPriceHistoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            email='editor@example.com', password='secret', role='editor'
+        ))
+        company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+        closes = 100 + 10 * np.sin(np.arange(2500) / 40)
+        PriceHistory.objects.bulk_create([
+            PriceHistory(company=company, date=date(2015, 1, 1) + timedelta(i), open_price=round(close, 2),
+                         high_price=round(close + 1, 2), low_price=round(close - 1, 2),
+                         close_price=round(close, 2), volume=100)
+            for i, close in enumerate(closes)
+        ])
+
+    def get(self, **params):
+        return self.client.get('/api/companies/price-history/', {'symbol': 'bank', **params})
+
+    def test_modes(self):
+        # Warm the symbol resolver so each request below is one price query
+        self.get(max_points=800)
+        for mode in ('candle', 'line'):
+            with self.subTest(mode=mode), self.assertNumQueries(1):
+                data = self.get(max_points=800, mode=mode).json()
+            self.assertEqual((data['mode'], data['points'], data['total_records']), (mode, 800, 2500))
+            # Newest first, like the full response
+            newest = data['price_history'][0]
+            self.assertEqual(newest.get('end_date', newest['date']), '2021-11-04')
+            self.assertEqual(data['price_history'][-1]['date'], '2015-01-01')
+
+        candle = self.get(max_points=800).json()['price_history'][-1]
+        self.assertEqual((candle['end_date'], candle['volume']), ('2015-01-03', 300))
+
+    def test_date_range_and_small_results(self):
+        data = self.get(max_points=800, start_date='2021-10-01').json()
+        self.assertEqual((data['points'], data['total_records']), (35, 35))
+
+    def test_invalid_params(self):
+        for params in ({'max_points': 2}, {'max_points': 'x'}, {'max_points': 10, 'mode': 'bar'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(**params).status_code, 400)
@@ -0,0 +1,135 @@
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from stock import series_store
+from stock.benchmarks.pages import render_pages
+from stock.fingerprints import ChangeDetector, detect_changes, page_digest, remember_pages, row_digest, scraped_row_digest
+from stock.models import Company, PageFingerprint, PriceHistory
+from stock.scrapers import get_scraper
+from stock.series_store import SeriesStore
+from stock.services import save_price_history
+
+
+START = date(2023, 1, 2)
+
+
+def price_rows(count):
+    return [
+        {'date': START + timedelta(i), 'open_price': 10.0, 'high_price': 11.0, 'low_price': 9.0,
+         'close_price': 10.0 + (i % 5) * 0.1, 'total_traded_quantity': 100 + i}
+        for i in range(count)
+    ]
+
+
+class RowDigestTests(SimpleTestCase):
+    def test_normalized_like_stored_rows(self):
+        self.assertEqual(
+            row_digest(date(2024, 1, 1), 10, 11, 9, 10.5, 100),
+            scraped_row_digest({'date': ' 2024-01-01 ', 'open_price': '10.001', 'high_price': '11',
+                                'low_price': '9.00', 'close_price': 10.5, 'total_traded_quantity': '100.0'})
+        )
+        self.assertNotEqual(row_digest(date(2024, 1, 1), 10, 11, 9, 10.5, 100),
+                            row_digest(date(2024, 1, 1), 10, 11, 9, 10.51, 100))
+
+    def test_missing_value(self):
+        self.assertIsNone(row_digest(date(2024, 1, 1), 10, None, 9, 10, 100))
+        self.assertIsNone(scraped_row_digest({'date': '2024-01-01', 'open_price': 'n/a'}))
+
+
+class ChangeDetectorTests(SimpleTestCase):
+    def setUp(self):
+        self.rows = price_rows(3)
+        self.known = frozenset(scraped_row_digest(row) for row in self.rows)
+
+    def test_default_is_a_full_pass(self):
+        changes = ChangeDetector()
+        self.assertTrue(changes.full)
+        self.assertFalse(changes.skip_page(1, '<tbody></tbody>'))
+        changes.parsed(self.rows)
+        self.assertFalse(changes.done)
+        self.assertEqual(changes.page_hashes, {'1': page_digest('<tbody></tbody>')})
+
+    def test_unchanged_pages_are_skipped(self):
+        changes = ChangeDetector(previous_hashes={'1': page_digest('a'), '2': page_digest('b')}, full=False)
+        self.assertTrue(changes.skip_page(1, 'a'))
+        self.assertFalse(changes.skip_page(2, 'changed'))
+        self.assertEqual(changes.page_hashes['2'], page_digest('changed'))
+
+    def test_stop_after_unchanged_run(self):
+        changes = ChangeDetector(previous_hashes={'1': page_digest('a')}, known_rows=self.known,
+                                 stop_after=2, full=False)
+        changes.skip_page(1, 'a')
+        self.assertFalse(changes.done)
+        # A page with a new row breaks the run
+        changes.parsed([*self.rows, *price_rows(4)[3:]])
+        changes.parsed(self.rows)
+        self.assertFalse(changes.done)
+        changes.parsed(self.rows[:1])
+        self.assertTrue(changes.done)
+
+    def test_no_stop_without_stop_after(self):
+        changes = ChangeDetector(known_rows=self.known, full=False)
+        for _ in range(5):
+            changes.parsed(self.rows)
+        self.assertFalse(changes.done)
+
+
+class ChangeDetectionCycleTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(series_store, 'series_store', SeriesStore(Path(tempfile.mkdtemp())))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+
+    def scrape(self, rows, full=False):
+        scraper = get_scraper(self.company, backend='replay', pages=render_pages(rows))
+        detect_changes(scraper, self.company, full=full)
+        data = scraper.scrap_data()
+        with self.captureOnCommitCallbacks(execute=True):
+            saved = save_price_history(self.company, data)
+        remember_pages(scraper, self.company)
+        return scraper.stats, len(saved)
+
+    def test_pages_are_remembered_after_a_full_pass(self):
+        stats, saved = self.scrape(price_rows(100))
+        self.assertEqual((stats['pages'], stats['pages_skipped'], saved), (5, 0, 100))
+        fingerprint = PageFingerprint.objects.get()
+        self.assertEqual(len(fingerprint.page_hashes), 5)
+        self.assertIsNotNone(fingerprint.full_pass_at)
+
+    def test_reads_every_page_by_default(self):
+        self.scrape(price_rows(100))
+        rows = price_rows(101)
+        rows[5]['close_price'] = 10.77  # an old row, on the last page
+        stats, saved = self.scrape(rows)
+        self.assertEqual((stats['pages'], stats['stopped_early'], saved), (6, False, 2))
+        self.assertEqual(float(PriceHistory.objects.get(date=rows[5]['date']).close_price), 10.77)
+
+    @mock.patch('stock.fingerprints.STOP_AFTER_UNCHANGED', 2)
+    def test_opt_in_early_stop(self):
+        self.scrape(price_rows(100))
+        stats, saved = self.scrape(price_rows(100))
+        self.assertEqual((stats['pages'], stats['pages_skipped'], stats['stopped_early'], saved), (2, 2, True, 0))
+
+        # A new day shifts every page; parsing stops on pages of known rows
+        stats, saved = self.scrape(price_rows(101))
+        self.assertEqual((stats['pages'], stats['pages_skipped'], stats['stopped_early'], saved), (3, 0, True, 1))
+
+    @mock.patch('stock.fingerprints.STOP_AFTER_UNCHANGED', 2)
+    def test_periodic_full_pass(self):
+        self.scrape(price_rows(100))
+        rows = price_rows(100)
+        rows[5]['close_price'] = 10.77
+        self.assertEqual(self.scrape(rows)[1], 0)  # the early stop misses it
+
+        PageFingerprint.objects.update(full_pass_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+        stats, saved = self.scrape(rows)
+        self.assertEqual((stats['pages'], stats['pages_skipped'], saved), (5, 0, 1))
+        self.assertEqual(self.scrape(rows)[0]['pages_skipped'], 2)
+
+        stats, saved = self.scrape(rows, full=True)
+        self.assertEqual((stats['pages'], stats['pages_skipped']), (5, 0))
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+
+from stock.benchmarks.pages import render_pages
+from stock.gaps import estimate_pages, find_gaps, rebuild_trading_calendar, repair_gaps
+from stock.models import Company, PriceHistory, TradingDay
+from stock.scrapers import get_scraper
+
+
+START = date(2023, 1, 2)
+
+
+class GapTests(TestCase):
+    def setUp(self):
+        self.days = [START + timedelta(i) for i in range(200)]
+        self.rows = [
+            {'date': day, 'open_price': 10.0, 'high_price': 11.0, 'low_price': 9.0,
+             'close_price': 10.0 + (i % 5) * 0.1, 'total_traded_quantity': 100 + i}
+            for i, day in enumerate(self.days)
+        ]
+        self.complete = Company.objects.create(name='Complete', symbol='FULL', sector='BANKING')
+        self.company = Company.objects.create(name='Gappy', symbol='GAPPY', sector='BANKING')
+        self.missing = [self.days[i] for i in (5, 6, 100, 150, 151, 152)]
+        self.store(self.complete, self.rows)
+        self.store(self.company, [row for row in self.rows if row['date'] not in self.missing])
+        TradingDay.objects.bulk_create([TradingDay(date=day) for day in self.days])
+
+    def store(self, company, rows):
+        PriceHistory.objects.bulk_create([
+            PriceHistory(company=company, date=row['date'], open_price=row['open_price'],
+                         high_price=row['high_price'], low_price=row['low_price'],
+                         close_price=row['close_price'], volume=row['total_traded_quantity'])
+            for row in rows
+        ])
+
+    def test_find_gaps(self):
+        self.assertEqual(find_gaps(), {self.company.pk: self.missing})
+        self.assertEqual(find_gaps([self.complete.pk]), {})
+        self.assertEqual(find_gaps([]), {})
+        self.assertEqual(
+            find_gaps([self.company.pk], start=self.days[100], end=self.days[150]),
+            {self.company.pk: [self.days[100], self.days[150]]}
+        )
+
+    def test_days_outside_a_companys_span_are_not_gaps(self):
+        PriceHistory.objects.filter(company=self.company, date__lt=self.days[10]).delete()
+        self.assertEqual(find_gaps()[self.company.pk], self.missing[2:])
+
+    def test_estimate_pages(self):
+        # 20 rows per page, newest first: the newest day is on page 1
+        estimates = estimate_pages([self.days[-1], self.days[-20], self.days[-21], self.days[0]])
+        self.assertEqual(list(estimates.values()), [1, 1, 2, 10])
+
+    def test_repair(self):
+        scraper = get_scraper(self.company, backend='replay', pages=render_pages(self.rows))
+        result = repair_gaps(self.company, scraper, self.missing)
+        self.assertEqual((result['found'], result['repaired'], result['unresolved']), (6, 6, []))
+        self.assertEqual(result['pages_fetched'], [3, 5, 10])
+        self.assertEqual(find_gaps(), {})
+
+    def test_repair_probes_when_the_estimate_is_off(self):
+        # The calendar runs 30 days past the site's newest row, so every
+        # estimate is one or two pages too far
+        TradingDay.objects.bulk_create([TradingDay(date=self.days[-1] + timedelta(i + 1)) for i in range(30)])
+        scraper = get_scraper(self.company, backend='replay', pages=render_pages(self.rows))
+        result = repair_gaps(self.company, scraper, self.missing)
+        self.assertEqual((result['repaired'], result['unresolved']), (6, []))
+
+    def test_repair_reports_days_the_site_lacks(self):
+        rows = [row for row in self.rows if row['date'] != self.days[100]]
+        scraper = get_scraper(self.company, backend='replay', pages=render_pages(rows))
+        result = repair_gaps(self.company, scraper, self.missing)
+        self.assertEqual((result['repaired'], result['unresolved']), (5, [self.days[100].isoformat()]))
+
+    def test_rebuild_trading_calendar(self):
+        TradingDay.objects.create(date=START - timedelta(days=1))
+        PriceHistory.objects.filter(date=self.days[-1]).delete()
+        self.assertEqual(rebuild_trading_calendar(), 199)
+        self.assertEqual(TradingDay.objects.order_by('date').first().date, START)
+        self.assertFalse(TradingDay.objects.filter(date=self.days[-1]).exists())
@@ -0,0 +1,101 @@
+import io
+import tempfile
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from stock import series_store
+from stock.importers import PriceHistoryImportError, import_price_history
+from stock.models import Company, PriceHistory, TradingDay
+from stock.series_store import SeriesStore
+
+
+CSV = '''symbol,date,open,high,low,close,volume
+nabil,2024-01-01,100,110,90,105,"1,000"
+NABIL,02/01/2024,100,110,90,105,1000
+NABIL,2024-01-03,100,90,95,105,1000
+NABIL,bad,100,110,90,105,1000
+XXX,2024-01-03,100,110,90,105,1000
+NABIL,2024-01-04,120,110,90,105,1000
+NABIL,2024-01-05,100,110,90,105,-5
+NABIL,2024-01-01,101,110,90,105,1000
+'''
+
+
+def upload(content: bytes, name: str):
+    file = io.BytesIO(content)
+    file.name = name
+    return file
+
+
+class ImportPriceHistoryTests(TestCase):
+    def setUp(self):
+        self.store = SeriesStore(Path(tempfile.mkdtemp()))
+        patcher = mock.patch.object(series_store, 'series_store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.company = Company.objects.create(name='Nabil Bank', symbol='NABIL', sector='BANKING')
+
+    def test_csv(self):
+        report = import_price_history(upload(CSV.encode(), 'prices.csv'), chunksize=3)
+        self.assertEqual(
+            (report['rows_read'], report['rows_loaded'], report['rows_rejected'], report['chunks']), (8, 3, 5, 3)
+        )
+        self.assertEqual([(row['line'], row['reason']) for row in report['rejected']], [
+            (4, 'High price must be greater than low price'),
+            (5, 'Invalid or missing date'),
+            (6, 'Unknown company symbol'),
+            (7, 'Open price must be between high and low prices'),
+            (8, 'Volume must not be negative'),
+        ])
+        # The later row for 2024-01-01 wins
+        self.assertEqual(
+            list(PriceHistory.objects.order_by('date').values_list('date', 'open_price', 'volume')),
+            [(date(2024, 1, 1), Decimal('101.00'), 1000), (date(2024, 1, 2), Decimal('100.00'), 1000)]
+        )
+        self.assertEqual(TradingDay.objects.count(), 2)
+        self.assertEqual(len(self.store.read(self.company.pk)), 2)
+
+    def test_xlsx_for_one_symbol(self):
+        buffer = io.BytesIO()
+        pd.read_csv(io.StringIO(CSV)).drop(columns=['symbol']).to_excel(buffer, index=False)
+        report = import_price_history(upload(buffer.getvalue(), 'prices.xlsx'), symbol='nabil')
+        # The XXX row belongs to NABIL now
+        self.assertEqual((report['rows_loaded'], report['rows_rejected']), (3, 4))
+        self.assertEqual(PriceHistory.objects.count(), 3)
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(PriceHistoryImportError, 'Missing columns: volume, symbol'):
+            import_price_history(upload(b'date,open,high,low,close\n', 'prices.csv'))
+
+    def test_command_writes_rejects(self):
+        directory = Path(tempfile.mkdtemp())
+        (directory / 'prices.csv').write_text(CSV)
+        call_command('import_price_history', str(directory / 'prices.csv'),
+                     '--rejects', str(directory / 'rejects.csv'), stdout=io.StringIO())
+        rejects = pd.read_csv(directory / 'rejects.csv')
+        self.assertEqual(rejects['line'].tolist(), [4, 5, 6, 7, 8])
+
+    def test_endpoint_is_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_user(email='e@example.com', password='x', role='editor'))
+        response = client.post('/api/companies/price-history/import/',
+                               {'file': upload(CSV.encode(), 'prices.csv')}, format='multipart')
+        self.assertEqual(response.status_code, 403)
+
+        client.force_authenticate(CustomUser.objects.create_user(email='a@example.com', password='x', role='admin'))
+        self.assertEqual(client.post('/api/companies/price-history/import/', {}, format='multipart').status_code, 400)
+        response = client.post('/api/companies/price-history/import/',
+                               {'file': upload(CSV.encode(), 'prices.csv')}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['rows_loaded'], 2)
+        response = client.post('/api/companies/price-history/import/',
+                               {'file': upload(b'date\n2024-01-01\n', 'prices.csv')}, format='multipart')
+        self.assertEqual(response.status_code, 400)
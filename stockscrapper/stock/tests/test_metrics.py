@@ -0,0 +1,83 @@
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from stock.metrics import MetricsRegistry, record_phase, registry
+from stock.models import Company
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_render(self):
+        metrics = MetricsRegistry()
+        metrics.inc('scrapes_total', help='Scrapes run', outcome='ok')
+        metrics.inc('scrapes_total', outcome='ok')
+        metrics.observe('scrape_seconds', 1.5, help='Scrape time')
+        metrics.register_collector(lambda: [('queue_depth', 'Queued tasks', 3, {'name': 'a"b'})])
+        self.assertEqual(metrics.render().splitlines(), [
+            '# HELP scrapes_total Scrapes run',
+            '# TYPE scrapes_total counter',
+            'scrapes_total{outcome="ok"} 2',
+            '# HELP scrape_seconds Scrape time',
+            '# TYPE scrape_seconds summary',
+            'scrape_seconds_count 1',
+            'scrape_seconds_sum 1.5',
+            '# HELP queue_depth Queued tasks',
+            '# TYPE queue_depth gauge',
+            'queue_depth{name="a\\"b"} 3',
+        ])
+
+    def test_record_phase_outside_a_request(self):
+        with record_phase('serialize'):
+            pass
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+        self.user = CustomUser.objects.create_user(email='editor@example.com', password='secret', role='editor')
+
+    @override_settings(STOCK_SERVER_TIMING=True)
+    def test_request_metrics(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/companies/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=')
+
+        rendered = registry.render()
+        labels = 'endpoint="stock:company-list-create",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 1', rendered)
+        for name in ('http_request_duration_seconds', 'http_request_db_queries', 'http_request_serialize_seconds'):
+            self.assertIn(f'{name}_count{{{labels}}} 1', rendered)
+
+    def test_no_header_by_default(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertNotIn('Server-Timing', client.get('/api/companies/'))
+
+
+class MetricsAccessTests(TestCase):
+    def test_anonymous_is_forbidden(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    def test_staff(self):
+        user = CustomUser.objects.create_user(email='staff@example.com', password='secret', role='editor')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        user.is_staff = True
+        user.save()
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    @override_settings(STOCK_METRICS={'TOKEN': 'secret', 'ALLOWED_IPS': []})
+    def test_bearer_token(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    @override_settings(STOCK_METRICS={'TOKEN': '', 'ALLOWED_IPS': ['10.0.0.5']})
+    def test_allowed_addresses(self):
+        self.assertEqual(Client(REMOTE_ADDR='10.0.0.5').get('/metrics').status_code, 200)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        # An empty token never matches
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
@@ -0,0 +1,128 @@
+import asyncio
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from account.models import CustomUser
+from stock import series_store
+from stock.models import Company, PriceEvent, PriceHistory
+from stock.pubsub import PriceBroker, publish_price_update
+from stock.series_store import SeriesStore
+from stock.services import save_price_history
+
+
+ROW = {'date': '2024-01-01', 'open_price': 1, 'high_price': 2, 'low_price': 1, 'close_price': 2,
+       'total_traded_quantity': 5}
+
+
+def isolated_series_store(test):
+    patcher = mock.patch.object(series_store, 'series_store', SeriesStore(Path(tempfile.mkdtemp())))
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+class PriceBrokerTests(SimpleTestCase):
+    async def test_fan_out_by_symbol(self):
+        broker = PriceBroker(queue_size=2)
+        with mock.patch.object(broker.poller, 'ensure_running'):
+            nabil = broker.subscribe(['nabil'])
+            everything = broker.subscribe()
+        self.assertEqual(broker.publish('NABIL', {'id': 1}), 2)
+        self.assertEqual(broker.publish('NBL', {'id': 2}), 1)
+        await asyncio.sleep(0)
+
+        self.assertEqual(await nabil.get(timeout=1), {'id': 1})
+        self.assertIsNone(await nabil.get(timeout=0.01))
+        self.assertEqual([await everything.get(timeout=1) for _ in range(2)], [{'id': 1}, {'id': 2}])
+
+        nabil.close()
+        self.assertEqual(broker.subscriber_count(), 1)
+        self.assertEqual(broker.publish('NABIL', {'id': 3}), 1)
+
+    async def test_slow_clients_drop_the_oldest_events(self):
+        broker = PriceBroker(queue_size=2)
+        with mock.patch.object(broker.poller, 'ensure_running'):
+            subscription = broker.subscribe()
+        for i in range(3):
+            broker.publish('NABIL', {'id': i})
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.dropped, 1)
+        self.assertEqual([await subscription.get(timeout=1) for _ in range(2)], [{'id': 1}, {'id': 2}])
+
+
+class PublishTests(TestCase):
+    def setUp(self):
+        isolated_series_store(self)
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+
+    def test_saves_publish_an_event(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            save_price_history(self.company, [ROW, {**ROW, 'date': '2024-01-02'}])
+        event = PriceEvent.objects.get()
+        self.assertEqual(event.symbol, 'BANK')
+        self.assertEqual(event.payload['event'], 'price_update')
+        self.assertEqual([row['date'] for row in event.payload['rows']], ['2024-01-02', '2024-01-01'])
+        self.assertEqual(event.payload['rows'][0]['close_price'], '2.00')
+
+    def test_old_events_are_pruned(self):
+        PriceEvent.objects.create(symbol='BANK', payload={})
+        PriceEvent.objects.update(created_at=timezone.now() - timedelta(days=1))
+        entry = PriceHistory.objects.create(company=self.company, date='2024-01-01', open_price=1,
+                                            high_price=2, low_price=1, close_price=2, volume=5)
+        entry.refresh_from_db()
+        pk = publish_price_update(self.company, [entry])
+        self.assertEqual(list(PriceEvent.objects.values_list('pk', flat=True)), [pk])
+        self.assertIsNone(publish_price_update(self.company, []))
+
+    def test_a_failed_publish_does_not_fail_the_save(self):
+        with mock.patch('stock.services.publish_price_update', side_effect=DatabaseError('locked')), \
+                self.assertLogs('django.test', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            saved = save_price_history(self.company, [ROW])
+        self.assertEqual(len(saved), 1)
+        self.assertEqual(PriceHistory.objects.count(), 1)
+
+
+class PriceStreamTests(TransactionTestCase):
+    def setUp(self):
+        isolated_series_store(self)
+
+    async def test_stream(self):
+        user = await sync_to_async(CustomUser.objects.create_user)(
+            email='editor@example.com', password='secret', role='editor'
+        )
+        token = str(AccessToken.for_user(user))
+        watched = await Company.objects.acreate(name='Watched', symbol='WATCH')
+        other = await Company.objects.acreate(name='Other', symbol='OTHER')
+
+        # EventSource clients put the token in the query string
+        response = await self.async_client.get('/api/companies/async/price-history/stream/',
+                                               {'symbol': 'watch', 'token': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = response.streaming_content.__aiter__()
+        self.assertEqual(await events.__anext__(), b'retry: 5000\n\n')
+        # Let the poller note where it starts
+        await asyncio.sleep(1.5)
+
+        save = sync_to_async(save_price_history, thread_sensitive=False)
+        await save(other, [ROW])
+        await save(watched, [ROW])
+        event = (await asyncio.wait_for(events.__anext__(), 5)).decode()
+        pk = await PriceEvent.objects.filter(symbol='WATCH').values_list('pk', flat=True).aget()
+        self.assertTrue(event.startswith(f'id: {pk}\nevent: price_update\ndata: {{'))
+        self.assertIn('"company_symbol": "WATCH"', event)
+        await events.aclose()
+
+        response = await self.async_client.get('/api/companies/async/price-history/stream/', {'token': 'junk'})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/api/companies/async/price-history/stream/', {'symbol': 'nope'},
+                                               headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,96 @@
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from stock import series_store
+from stock.benchmarks.pages import load_fixture_pages, render_pages
+from stock.models import Company, PriceHistory
+from stock.scrapers import get_scraper
+from stock.series_store import SeriesStore
+from stock.utils import PageRecorder, PriceHistoryScrapper, ReplayPriceHistoryScrapper, parse_price_table
+
+
+def price_rows(count):
+    return [
+        {'date': date(2024, 1, 1) + timedelta(i), 'open_price': 1000.0 + i, 'high_price': 1010.0 + i,
+         'low_price': 990.0 + i, 'close_price': 1005.0 + i, 'total_traded_quantity': 1200 + i}
+        for i in range(count)
+    ]
+
+
+class ParsePriceTableTests(SimpleTestCase):
+    def test_rendered_rows_round_trip(self):
+        rows = parse_price_table(render_pages(price_rows(2))[0])
+        self.assertEqual(rows[0]['date'], '2024-01-02')
+        self.assertEqual(
+            [rows[0][name] for name in ('sn', 'open_price', 'high_price', 'low_price', 'close_price',
+                                       'total_traded_quantity')],
+            [1.0, 1001.0, 1011.0, 991.0, 1006.0, 1201.0]
+        )
+
+    def test_fixture_pages_parse(self):
+        for html in load_fixture_pages():
+            rows = parse_price_table(html)
+            self.assertTrue(rows)
+            self.assertTrue(all(row['date'] and row['close_price'] for row in rows))
+
+
+class ReplayScrapperTests(SimpleTestCase):
+    def test_shares_the_live_scrape_loop(self):
+        # Only the page source is replaced
+        self.assertIs(ReplayPriceHistoryScrapper.scrap_data, PriceHistoryScrapper.scrap_data)
+        self.assertIs(ReplayPriceHistoryScrapper.fetch_page, PriceHistoryScrapper.fetch_page)
+
+    def test_scrap_data(self):
+        scraper = ReplayPriceHistoryScrapper(pages=render_pages(price_rows(45)))
+        rows = scraper.scrap_data()
+        self.assertEqual(len(rows), 45)
+        self.assertEqual((rows[0]['date'], rows[-1]['date']), ('2024-02-14', '2024-01-01'))
+        self.assertEqual((scraper.stats['pages'], scraper.stats['pages_skipped']), (3, 0))
+
+    def test_fetch_page(self):
+        scraper = ReplayPriceHistoryScrapper(pages=render_pages(price_rows(45)))
+        self.assertEqual([row['date'] for row in scraper.fetch_page(3)],
+                         ['2024-01-05', '2024-01-04', '2024-01-03', '2024-01-02', '2024-01-01'])
+        self.assertEqual(len(scraper.fetch_page(1)), 20)
+        self.assertEqual(scraper.fetch_page(4), [])
+        self.assertEqual(scraper.fetch_page(0), [])
+
+    def test_no_pages(self):
+        self.assertEqual(ReplayPriceHistoryScrapper(pages=[]).scrap_data(), [])
+
+    def test_recording_round_trip(self):
+        directory = Path(tempfile.mkdtemp()) / 'BANK'
+        pages = render_pages(price_rows(30))
+        recorder = PageRecorder(directory, url='https://example.com/company/BANK')
+        for i, html in enumerate(pages):
+            recorder.add_page(html, next_disabled=i == len(pages) - 1)
+        recorder.save()
+
+        company = Company(name='Bank', symbol='BANK')
+        scraper = get_scraper(company, backend='replay', record_dir=directory.parent)
+        self.assertEqual(scraper.url, 'https://example.com/company/BANK')
+        self.assertEqual(len(scraper.scrap_data()), 30)
+
+
+class ReplayCommandTests(TestCase):
+    def test_replay_saves_through_the_live_path(self):
+        patcher = mock.patch.object(series_store, 'series_store', SeriesStore(Path(tempfile.mkdtemp())))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+        directory = Path(tempfile.mkdtemp())
+        recorder = PageRecorder(directory / 'BANK')
+        recorder.add_page(render_pages(price_rows(5))[0], next_disabled=True)
+        recorder.save()
+
+        out = StringIO()
+        call_command('scrape_price_history', 'BANK', '--replay', str(directory), stdout=out)
+        self.assertIn('BANK: 1 pages (0 unchanged), 5 rows, 5 saved', out.getvalue())
+        self.assertEqual(PriceHistory.objects.count(), 5)
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from stock.models import Company
+from stock.resolvers import SymbolResolver, symbol_resolver
+
+
+class SymbolResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name='Nabil Bank', symbol='NABIL')
+
+    def test_cached_lookups(self):
+        for shared in (False, True):
+            with self.subTest(shared=shared):
+                resolver = SymbolResolver(shared_cache=shared)
+                with self.assertNumQueries(1):
+                    self.assertEqual(resolver.resolve('nabil'), self.company)
+                    self.assertEqual(resolver.resolve('NABIL'), self.company)
+                self.assertEqual(resolver.stats()['hits'], 1)
+                with self.assertRaises(Company.DoesNotExist):
+                    resolver.resolve('missing')
+
+    def test_shared_cache_serves_other_workers(self):
+        SymbolResolver(shared_cache=True).resolve('NABIL')
+        other = SymbolResolver(shared_cache=True)
+        with self.assertNumQueries(0):
+            other.resolve('NABIL')
+        self.assertEqual(other.stats()['shared_hits'], 1)
+
+    def test_lru_and_ttl(self):
+        Company.objects.create(name='Nepal Bank', symbol='NBL')
+        Company.objects.create(name='Himalayan Bank', symbol='HBL')
+        resolver = SymbolResolver(maxsize=2, ttl=60)
+        resolver.resolve('NABIL')
+        resolver.resolve('NBL')
+        resolver.resolve('NABIL')
+        resolver.resolve('HBL')  # evicts NBL, the least recently used
+        with self.assertNumQueries(0):
+            resolver.resolve('NABIL')
+        with self.assertNumQueries(1):
+            resolver.resolve('NBL')
+        self.assertEqual(resolver.stats()['evictions'], 2)
+
+        with mock.patch('stock.resolvers.time.monotonic', return_value=10 ** 9), self.assertNumQueries(1):
+            resolver.resolve('NABIL')
+
+    def test_signals_invalidate_the_shared_resolver(self):
+        symbol_resolver.resolve('NABIL')
+        self.company.symbol = 'NABL'
+        self.company.save()
+        with self.assertRaises(Company.DoesNotExist):
+            symbol_resolver.resolve('NABIL')
+        self.assertEqual(symbol_resolver.resolve('NABL').pk, self.company.pk)
+
+        self.company.delete()
+        with self.assertRaises(Company.DoesNotExist):
+            symbol_resolver.resolve('NABL')
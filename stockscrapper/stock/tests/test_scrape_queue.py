@@ -0,0 +1,84 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from stock import scrape_queue
+from stock.models import Company, ScrapeTask
+from stock.scrape_queue import claim_task, ensure_tasks, heartbeat, release_task
+
+
+class ClaimTaskTests(TestCase):
+    def setUp(self):
+        # Creating a company queues it (see stock/signals.py)
+        self.first = Company.objects.create(name='First', symbol='FIRST', sector='BANKING')
+        self.second = Company.objects.create(name='Second', symbol='SECOND', sector='BANKING')
+        now = timezone.now()
+        ScrapeTask.objects.filter(company=self.first).update(due_at=now - timedelta(hours=2))
+        ScrapeTask.objects.filter(company=self.second).update(due_at=now - timedelta(hours=1))
+
+    def test_new_companies_are_queued(self):
+        self.assertEqual(ScrapeTask.objects.count(), 2)
+        self.assertEqual(ensure_tasks(), 0)
+
+    def test_claims_most_overdue_first(self):
+        task = claim_task('a')
+        self.assertEqual(task.company, self.first)
+        self.assertEqual((task.status, task.lease_owner, task.attempts), ('running', 'a', 1))
+        self.assertEqual(claim_task('b').company, self.second)
+        # Both leases are live
+        self.assertIsNone(claim_task('c'))
+
+    def test_not_due_yet(self):
+        ScrapeTask.objects.update(due_at=timezone.now() + timedelta(minutes=5))
+        self.assertIsNone(claim_task('a'))
+
+    def test_lost_compare_and_set_moves_on(self):
+        if connection.features.has_select_for_update_skip_locked:
+            self.skipTest('claims use SELECT ... FOR UPDATE SKIP LOCKED on this database')
+
+        claimable = scrape_queue.claimable
+        calls = []
+
+        def rival_first(now):
+            # The worker's compare-and-set on its first candidate runs after
+            # a rival's, as if the two raced for it
+            calls.append(now)
+            if len(calls) == 2:
+                ScrapeTask.objects.filter(company=self.first).update(
+                    lease_owner='rival', lease_expires_at=now + timedelta(minutes=5), status='running'
+                )
+            return claimable(now)
+
+        with mock.patch('stock.scrape_queue.claimable', rival_first):
+            task = claim_task('a')
+
+        self.assertEqual(task.company, self.second)
+        self.assertEqual(task.lease_owner, 'a')
+        self.assertEqual(ScrapeTask.objects.get(company=self.first).lease_owner, 'rival')
+
+    def test_expired_lease_is_taken_over(self):
+        task = claim_task('a', lease_seconds=60)
+        ScrapeTask.objects.filter(pk=task.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        taken = claim_task('b')
+        self.assertEqual((taken.pk, taken.lease_owner, taken.attempts), (task.pk, 'b', 2))
+        # The first worker finds out it lost the lease
+        self.assertFalse(heartbeat(task, 'a'))
+        self.assertFalse(release_task(task, 'a'))
+        self.assertEqual(ScrapeTask.objects.get(pk=task.pk).lease_owner, 'b')
+
+    def test_heartbeat_and_release(self):
+        task = claim_task('a', lease_seconds=60)
+        expires = ScrapeTask.objects.get(pk=task.pk).lease_expires_at
+        self.assertTrue(heartbeat(task, 'a', lease_seconds=600))
+        self.assertGreater(ScrapeTask.objects.get(pk=task.pk).lease_expires_at, expires)
+
+        self.assertTrue(release_task(task, 'a', error='timeout'))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.lease_owner, task.lease_expires_at), ('failed', '', None))
+        self.assertAlmostEqual(
+            (task.due_at - task.last_finished_at).total_seconds(), scrape_queue.RETRY_SECONDS
+        )
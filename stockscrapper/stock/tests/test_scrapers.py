@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from stock.benchmarks.pages import load_fixture_pages
+from stock.models import Company, PriceHistory
+from stock.scrapers import get_scraper, load_backend
+
+LOAD_URLCONF = '''
+import sys
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+import stockscrapper.asgi
+print(' '.join(name for name in ('selenium', 'bs4', 'pandas', 'stock.utils') if name in sys.modules))
+'''
+
+
+class ScraperBackendTests(SimpleTestCase):
+    def test_backends_load_by_name(self):
+        self.assertEqual(load_backend('replay').__name__, 'ReplayPriceHistoryScrapper')
+        with self.assertRaisesMessage(ImproperlyConfigured, "Unknown scraper backend 'nope'"):
+            load_backend('nope')
+
+    def test_serving_requests_does_not_load_the_scraping_stack(self):
+        # A fresh interpreter, as modules loaded by other tests would hide an import
+        completed = subprocess.run(
+            [sys.executable, '-c', LOAD_URLCONF], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'stockscrapper.settings'}, check=True,
+        )
+        self.assertEqual(completed.stdout.strip(), '')
+
+
+class UpdateEndpointBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            email='admin@example.com', password='pw', role='admin'
+        ))
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING',
+                                              website='http://example.com')
+
+    def test_update_uses_the_named_backend(self):
+        pages = load_fixture_pages()
+        with mock.patch('stock.views.get_scraper',
+                        lambda company: get_scraper(company, backend='replay', pages=pages)):
+            response = self.client.post('/api/companies/price-history/update/', {'company': 'BANK'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['records_updated'], PriceHistory.objects.filter(company=self.company).count())
+        self.assertGreater(response.json()['records_updated'], 0)
+
+    @override_settings(STOCK_SCRAPER_BACKEND='replay')
+    def test_default_backend_comes_from_settings(self):
+        # The replay backend without recorded pages finds no rows
+        response = self.client.post('/api/companies/price-history/update/', {'company': 'BANK'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,164 @@
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase
+
+from stock import screener
+from stock.models import Company, CorporateAction, PriceHistory
+from stock.screener import ExpressionError, Parser, lookback, fields_in, screen, tokenize
+from stock.series_store import SeriesStore
+
+
+class ParserTests(TestCase):
+    def test_precedence(self):
+        self.assertEqual(
+            Parser('close > 1 + 2 * sma_5 or not volume < 10 and change > 0').parse(),
+            ('or',
+             ('compare', '>', ('field', 'close'),
+              ('arith', '+', ('number', 1.0), ('arith', '*', ('number', 2.0), ('field', 'sma_5')))),
+             ('and',
+              ('not', ('compare', '<', ('field', 'volume'), ('number', 10.0))),
+              ('compare', '>', ('field', 'change'), ('number', 0.0))))
+        )
+
+    def test_text_fields_take_bare_words(self):
+        self.assertEqual(
+            Parser("sector = banking and symbol in (NABIL, 'nbl')").parse(),
+            ('and',
+             ('compare', '==', ('field', 'sector'), ('string', 'BANKING')),
+             ('in', ('field', 'symbol'), (('string', 'NABIL'), ('string', 'NBL'))))
+        )
+
+    def test_multiplication_sign(self):
+        self.assertEqual(tokenize('2×sma_5')[1][:2], ('op', '*'))
+        self.assertEqual(Parser('-close').parse('number'), ('neg', ('field', 'close')))
+
+    def test_syntax_errors(self):
+        for text in ('close >', '(close > 1', 'close 1', 'close $ 1', 'close > 1)', 'and close > 1'):
+            with self.subTest(text=text), self.assertRaises(ExpressionError):
+                Parser(text).parse()
+
+    def test_limits(self):
+        for text in ('(' * 30 + 'close > 1' + ')' * 30, ' or '.join(['close > 1'] * 60), 'c' * 600):
+            with self.subTest(text=text[:20]), self.assertRaises(ExpressionError):
+                Parser(text).parse()
+
+    def test_type_errors(self):
+        for text in (
+            'close',                   # not a condition
+            'close > foo',             # unknown field
+            'sector > BANKING',        # text ordering
+            'close + sector > 1',      # arithmetic on text
+            'sector = 1',              # text against number
+            '(close > 1) > 2',         # comparing conditions
+            'close in (1, BANKING)',   # mixed in (...) values
+            'close > 1 and volume',    # and of a number
+            'sma_999 > 1',             # period out of range
+        ):
+            with self.subTest(text=text), self.assertRaises(ExpressionError):
+                Parser(text).parse()
+
+    def test_lookback(self):
+        tree = Parser('close > sma_20 and change_pct > 1 and volatility_10 < 3').parse()
+        self.assertEqual(fields_in(tree), {'close', 'sma_20', 'change_pct', 'volatility_10'})
+        # volatility_10 needs 11 closes
+        self.assertEqual(lookback(fields_in(tree)), 20)
+        self.assertEqual(lookback({'return_30'}), 31)
+
+
+class ScreenTests(TestCase):
+    start = date(2023, 1, 2)
+
+    def setUp(self):
+        cache.clear()
+        screener._frames.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(screener, 'series_store', SeriesStore(Path(directory.name)))
+        self.store = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        rows = []
+        for symbol, sector, base, step in (('UP', 'BANKING', 100, 1), ('DOWN', 'BANKING', 200, -1),
+                                           ('HYDRO', 'HYDROPOWER', 50, 0.5)):
+            company = Company.objects.create(name=symbol, symbol=symbol, sector=sector)
+            for i in range(60):
+                close = base + step * i
+                rows.append(PriceHistory(
+                    company=company, date=self.start + timedelta(i), open_price=close,
+                    high_price=close + 1, low_price=close - 1, close_price=close,
+                    volume=5000 if i == 59 else 100
+                ))
+        PriceHistory.objects.bulk_create(rows)
+        Company.objects.create(name='No prices', symbol='EMPTY', sector='OTHERS')
+
+    def symbols(self, expression, **kwargs):
+        return [row['symbol'] for row in screen(expression, **kwargs)['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.symbols('sector = BANKING and close > sma_50'), ['UP'])
+        self.assertEqual(self.symbols('volume > 2 * avg_volume_20'), ['DOWN', 'HYDRO', 'UP'])
+        self.assertEqual(self.symbols('return_10 < 0'), ['DOWN'])
+        self.assertEqual(self.symbols('high_5 = close + 1 and low_5 = close - 5'), ['UP'])
+
+    def test_sort_and_limit(self):
+        # Latest closes: UP 159, DOWN 141, HYDRO 79.5
+        self.assertEqual(self.symbols('close > 0', sort='-close', limit=2), ['UP', 'DOWN'])
+        self.assertEqual(self.symbols('close > 0', sort='close'), ['HYDRO', 'DOWN', 'UP'])
+
+    def test_adjusts_for_corporate_actions(self):
+        # A 1:1 bonus halves UP's price from the ex-date on
+        up = Company.objects.get(symbol='UP')
+        ex_date = self.start + timedelta(40)
+        for row in PriceHistory.objects.filter(company=up, date__gte=ex_date):
+            for field in ('open_price', 'high_price', 'low_price', 'close_price'):
+                setattr(row, field, getattr(row, field) / 2)
+            row.save()
+        CorporateAction.objects.create(company=up, action_type='bonus', ex_date=ex_date, ratio=1)
+
+        frame = screener.market_frame(60)
+        column = list(frame.symbols).index('UP')
+        np.testing.assert_allclose(frame.prices['close'][:, column], (100 + np.arange(60)) / 2)
+        self.assertEqual(frame.prices['volume'][0, column], 200)
+        self.assertEqual(self.symbols('symbol = UP and return_50 > 0'), ['UP'])
+
+    def test_store_and_database_frames_agree(self):
+        from_database = screener.MarketFrame(30)
+        for company_id in Company.objects.values_list('pk', flat=True):
+            self.store.rebuild(company_id)
+        from_store = screener.MarketFrame(30)
+        with mock.patch.object(screener, 'SERIES_STORE_ENABLED', False):
+            store_off = screener.MarketFrame(30)
+        for name in ('close', 'volume', 'sma_20', 'high_10', 'volatility_20'):
+            np.testing.assert_allclose(from_database.column(name), from_store.column(name), equal_nan=True)
+            np.testing.assert_allclose(store_off.column(name), from_store.column(name), equal_nan=True)
+
+    def test_screen_does_not_write_series(self):
+        with mock.patch.object(self.store, 'write', side_effect=AssertionError('written during a screen')):
+            self.assertEqual(len(self.symbols('close > 0')), 3)
+
+    def test_stale_files_are_read_from_the_database(self):
+        for company_id in Company.objects.values_list('pk', flat=True):
+            self.store.rebuild(company_id)
+        up = Company.objects.get(symbol='UP')
+        # Deleted outside save_price_history, so UP's file still has the row
+        PriceHistory.objects.filter(company=up, date=self.start + timedelta(59)).delete()
+
+        frame = screener.MarketFrame(30)
+        column = list(frame.symbols).index('UP')
+        self.assertEqual(frame.dates[column], np.datetime64(self.start + timedelta(58)))
+        self.assertEqual(frame.column('close')[column], 158)
+        self.assertEqual(len(self.store.read(up.pk)), 60)
+
+    def test_frames_expire(self):
+        now = 1000.0
+        with mock.patch.object(screener.time, 'monotonic', side_effect=lambda: now):
+            frame = screener.market_frame(60)
+            self.assertIs(screener.market_frame(60), frame)
+            # No version bump, e.g. the save happened in another process
+            now += screener.FRAME_TTL
+            self.assertIsNot(screener.market_frame(60), frame)
@@ -0,0 +1,65 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from stock.models import Company
+from stock.search import CompanySearchIndex, company_search_index
+
+
+class CompanySearchIndexTests(TestCase):
+    def setUp(self):
+        Company.objects.create(name='Nabil Bank Limited', symbol='NABIL', sector='BANKING')
+        Company.objects.create(name='Nepal Bank Limited', symbol='NBL', sector='BANKING')
+        Company.objects.create(name='Arun Valley Hydropower', symbol='AHPC', sector='HYDROPOWER')
+        self.index = CompanySearchIndex()
+
+    def matches(self, query, **options):
+        return [(hit['symbol'], hit['match']) for hit in self.index.search(query, **options)]
+
+    def test_ranking(self):
+        Company.objects.create(name='NB Insurance', symbol='NB', sector='INSURANCE')
+        self.assertEqual(self.matches('nb'), [('NB', 'exact'), ('NBL', 'symbol')])
+        self.assertEqual(self.matches('n'), [('NABIL', 'symbol'), ('NB', 'symbol'), ('NBL', 'symbol')])
+        self.assertEqual(self.matches('bank'), [('NABIL', 'word'), ('NBL', 'word')])
+        self.assertEqual(self.matches('arun'), [('AHPC', 'name')])
+        self.assertEqual(self.matches('n', limit=1), [('NABIL', 'symbol')])
+        self.assertEqual(self.matches('  '), [])
+
+    def test_fuzzy(self):
+        self.assertEqual(self.matches('nabl'), [])
+        self.assertEqual(self.matches('nabl', fuzzy=True)[0], ('NABIL', 'fuzzy'))
+        self.assertEqual(self.matches('hydropwer', fuzzy=True), [('AHPC', 'fuzzy')])
+
+    def test_update_and_remove(self):
+        self.index.build()
+        company = Company.objects.get(symbol='AHPC')
+        company.name = 'Nyadi Hydro'
+        self.index.update(company)
+        self.assertEqual(self.matches('ny'), [('AHPC', 'name')])
+        self.assertEqual(self.matches('arun'), [])
+        self.index.remove(company.pk)
+        self.assertEqual(self.matches('hydro'), [])
+
+
+class CompanySearchViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            email='editor@example.com', password='secret', role='editor'
+        ))
+        self.company = Company.objects.create(name='Arun Valley Hydropower', symbol='AHPC', sector='HYDROPOWER')
+
+    def test_search_follows_saves(self):
+        company_search_index.build()
+        response = self.client.get('/api/companies/search/', {'q': 'arun'})
+        self.assertEqual(response.json()['results'][0]['symbol'], 'AHPC')
+
+        self.company.name = 'Nyadi Hydro'
+        self.company.save()
+        self.assertEqual(self.client.get('/api/companies/search/', {'q': 'ny'}).json()['results'][0]['symbol'], 'AHPC')
+        self.company.delete()
+        self.assertEqual(self.client.get('/api/companies/search/', {'q': 'ny'}).json()['results'], [])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/companies/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/companies/search/', {'q': 'a', 'limit': 'x'}).status_code, 400)
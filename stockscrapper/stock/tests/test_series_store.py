@@ -0,0 +1,155 @@
+import io
+import mmap
+import multiprocessing
+import os
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from stock import series_store
+from stock.importers import import_price_history
+from stock.management.commands import benchmark
+from stock.models import Company, PriceHistory
+from stock.series_store import SeriesStore, decode, encode, load_series, rows_to_columns
+from stock.services import save_price_history
+
+START = date(2023, 1, 2)
+
+
+def scraped(day, close=10.5, volume=999):
+    return {'date': day, 'open_price': 10.0, 'high_price': 11.0, 'low_price': 9.0,
+            'close_price': close, 'total_traded_quantity': volume}
+
+
+def merge_rows(directory, company_id, start, count):
+    store = SeriesStore(directory)
+    for i in range(start, start + count):
+        store.update(company_id, [(date(2024, 1, 1) + timedelta(days=i), 1, 1, 1, 1, i)])
+
+
+class EncodingTests(SimpleTestCase):
+    def test_round_trip(self):
+        columns = rows_to_columns([(START, 1, 2, 0.5, 1.5, 10), (START + timedelta(1), 2, 3, 1, 2.5, 20)])
+        series = decode(encode(columns))
+        self.assertEqual(series.date.tolist(), [START, START + timedelta(1)])
+        self.assertEqual(series.close.tolist(), [1.5, 2.5])
+        self.assertEqual(series.volume.dtype, np.int64)
+        self.assertEqual(len(decode(encode(rows_to_columns([])))), 0)
+
+    def test_rejects_other_files(self):
+        with self.assertRaisesMessage(ValueError, 'Not a price series file'):
+            decode(b'\0' * 64)
+
+
+class SeriesStoreTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.store = SeriesStore(self.directory)
+        patcher = mock.patch.object(series_store, 'series_store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+        PriceHistory.objects.bulk_create(
+            PriceHistory(company=self.company, date=START + timedelta(i), open_price=10, high_price=11,
+                         low_price=9, close_price=10 + i * 0.01, volume=100 + i)
+            for i in range(50)
+        )
+
+    def test_rebuild_maps_the_file(self):
+        self.assertEqual(self.store.rebuild(self.company.pk), 50)
+        series = load_series('bank')
+        self.assertIsInstance(series.close.base.obj, mmap.mmap)
+        self.assertFalse(series.close.flags.writeable)
+        self.assertEqual((series.date[0], series.volume[-1]), (np.datetime64('2023-01-02'), 149))
+        self.assertIs(self.store.read(self.company.pk), series)
+
+        window = series.between('2023-01-05', '2023-01-07')
+        self.assertEqual(len(window), 3)
+        self.assertTrue(np.shares_memory(window.close, series.close))
+
+    def test_saves_merge_and_replace_atomically(self):
+        self.store.rebuild(self.company.pk)
+        old = self.store.read(self.company.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            save_price_history(self.company, [scraped(START + timedelta(i)) for i in (49, 50, 51)])
+
+        series = self.store.read(self.company.pk)
+        self.assertIsNot(series, old)
+        # Views of the replaced file stay valid
+        self.assertEqual(len(old), 50)
+        self.assertEqual(len(series), 52)
+        self.assertEqual(series.volume[-3:].tolist(), [999, 999, 999])
+        self.assertTrue((np.diff(series.date.view('i8')) > 0).all())
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         [f'{self.company.pk}.lock', f'{self.company.pk}.series'])
+
+    def test_first_save_builds_from_the_database(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            save_price_history(self.company, [scraped(START + timedelta(60))])
+        self.assertEqual(len(self.store.read(self.company.pk)), 51)
+
+    def test_imports_commands_and_deletes(self):
+        file = io.BytesIO(b'date,open,high,low,close,volume\n2024-01-01,1,2,1,1.5,10\n')
+        file.name = 'prices.csv'
+        import_price_history(file, symbol='BANK')
+        self.assertEqual(len(self.store.read(self.company.pk)), 51)
+
+        out = io.StringIO()
+        call_command('rebuild_series', 'BANK', stdout=out)
+        self.assertIn('51 rows', out.getvalue())
+
+        self.company.delete()
+        self.assertFalse(self.store.path(self.company.pk).exists())
+
+    def test_concurrent_merges_keep_every_row(self):
+        self.store.write(5, rows_to_columns([]))
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=merge_rows, args=(self.directory, 5, k * 30, 30)) for k in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual([worker.exitcode for worker in workers], [0] * 4)
+        self.assertEqual(sorted(self.store.read(5).volume.tolist()), list(range(120)))
+
+
+class ScratchStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.live = Path(tempfile.mkdtemp())
+        self.store = SeriesStore(self.live)
+        self.store.write(1, rows_to_columns([(START, 1, 1, 1, 1, 1)]))
+        self.store.write(2, rows_to_columns([(START, 2, 2, 2, 2, 2)]))
+
+    def test_scratch_leaves_the_live_files_alone(self):
+        live = self.store.read(1)
+        with self.store.scratch() as directory:
+            self.assertEqual(self.store.directory, directory)
+            self.assertIsNone(self.store.read(1))
+            self.store.write(3, rows_to_columns([]))
+            self.store.delete(2)
+        self.assertFalse(directory.exists())
+        self.assertEqual(self.store.directory, self.live)
+        self.assertIs(self.store.read(1), live)
+        self.assertEqual(sorted(os.listdir(self.live)), ['1.series', '2.series'])
+
+    def test_benchmark_uses_a_scratch_store(self):
+        def bench_dataset(runner, size, options):
+            # As the benchmark's Company delete and saves do
+            self.store.delete(2)
+            self.store.write(3, rows_to_columns([]))
+
+        with mock.patch.object(benchmark, 'series_store', self.store), \
+                mock.patch.object(benchmark, 'setup_test_environment'), \
+                mock.patch.object(benchmark, 'teardown_test_environment'), \
+                mock.patch.object(benchmark.connection.creation, 'create_test_db'), \
+                mock.patch.object(benchmark.connection.creation, 'destroy_test_db'), \
+                mock.patch.object(benchmark.Command, '_bench_parser'), \
+                mock.patch.object(benchmark.Command, '_bench_dataset', side_effect=bench_dataset):
+            call_command('benchmark', sizes=[1], output=str(Path(tempfile.mkdtemp()) / 'bench.json'),
+                         stdout=io.StringIO())
+        self.assertEqual(sorted(os.listdir(self.live)), ['1.series', '2.series'])
@@ -0,0 +1,145 @@
+import io
+import tempfile
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase
+
+from stock import series_store
+from stock.importers import import_price_history
+from stock.models import Company, PriceHistory, QuarantinedPriceRow, TradingDay
+from stock.series_store import SeriesStore
+from stock.services import save_price_history
+from stock.validation import ohlc_rejections, scraped_frame, validate_price_batch
+
+
+def row(day, close=100, **values):
+    return {
+        'date': day, 'open_price': close, 'high_price': close + 5, 'low_price': close - 5,
+        'close_price': close, 'total_traded_quantity': 1000, **values,
+    }
+
+
+class OhlcRejectionsTests(TestCase):
+    def test_reasons(self):
+        rows = [
+            row('2024-01-01'),
+            row('01/02/2024'),
+            row('someday'),
+            row('2024-01-03', open_price='n/a'),
+            row('2024-01-04', low_price=0),
+            row('2024-01-05', close=10 ** 8, high_price=10 ** 8),
+            row('2024-01-06', total_traded_quantity=-1),
+            row('2024-01-07', total_traded_quantity=2 ** 31),
+            row('2024-01-08', high_price=90, low_price=95),
+            row('2024-01-09', open_price=110),
+            row('2024-01-10', close_price=90),
+        ]
+        self.assertEqual(ohlc_rejections(scraped_frame(rows)).tolist(), [
+            '',
+            '',
+            'Invalid or missing date',
+            'Missing or non-numeric price or volume',
+            'Prices must be positive',
+            'Price out of range',
+            'Volume must not be negative',
+            'Volume out of range',
+            'High price must be greater than low price',
+            'Open price must be between high and low prices',
+            'Close price must be between high and low prices',
+        ])
+
+    def test_missing_columns_are_rejected(self):
+        frame = scraped_frame([{'date': '2024-01-01', 'close_price': 100}])
+        self.assertEqual(ohlc_rejections(frame).tolist(), ['Missing or non-numeric price or volume'])
+
+
+class ValidatePriceBatchTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+
+    def test_duplicates(self):
+        result = validate_price_batch(self.company, [
+            row('2024-01-01'), row('2024-01-01'),
+            row('2024-01-02', close=100), row('2024-01-02', close=101),
+            row('2024-01-03'),
+        ])
+        self.assertEqual(result['duplicates'], 1)
+        self.assertEqual(result['valid']['date'].dt.day.tolist(), [1, 3])
+        self.assertEqual(result['rejected']['reason'].tolist(), ['Conflicting duplicate date in batch'] * 2)
+
+    def test_spike_but_not_level_shift(self):
+        closes = [100, 101, 250, 102, 103, 50, 51, 52]
+        result = validate_price_batch(
+            self.company, [row(f'2024-01-{day:02}', close) for day, close in enumerate(closes, start=1)]
+        )
+        self.assertEqual(result['rejected']['close_price'].tolist(), [250])
+        self.assertEqual(result['rejected']['reason'].tolist(), ['Outlier price jump'])
+        self.assertEqual(len(result['valid']), 7)
+
+    def test_gaps(self):
+        TradingDay.objects.bulk_create([TradingDay(date=date(2024, 1, day)) for day in range(1, 11)])
+        PriceHistory.objects.create(company=self.company, date=date(2024, 1, 4), open_price=100,
+                                    high_price=105, low_price=95, close_price=100, volume=10)
+        result = validate_price_batch(
+            self.company, [row('2024-01-02'), row('2024-01-03'), row('2024-01-08')]
+        )
+        # Only inside the batch's range, less what is stored or in the batch
+        self.assertEqual(result['gaps'], [date(2024, 1, 5), date(2024, 1, 6), date(2024, 1, 7)])
+        self.assertEqual(result['gap_count'], 3)
+
+
+class QuarantineTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(series_store, 'series_store', SeriesStore(Path(tempfile.mkdtemp())))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.company = Company.objects.create(name='Bank', symbol='BANK', sector='BANKING')
+
+    def test_save_quarantines_and_reports(self):
+        report = {}
+        saved = save_price_history(self.company, [
+            row('2024-01-01'), row('2024-01-01'),
+            row('2024-01-02', open_price=0),
+            row('2024-01-03', close_price=None),
+            row('someday'),
+            row('2024-01-04'),
+        ], report)
+        self.assertEqual(len(saved), 2)
+        self.assertEqual(
+            {key: report[key] for key in ('saved', 'quarantined', 'duplicates_dropped')},
+            {'saved': 2, 'quarantined': 3, 'duplicates_dropped': 1}
+        )
+        self.assertEqual(report['quarantine_reasons'], {
+            'Prices must be positive': 1,
+            'Missing or non-numeric price or volume': 1,
+            'Invalid or missing date': 1,
+        })
+        held = QuarantinedPriceRow.objects.get(reason='Invalid or missing date')
+        self.assertEqual((held.date, held.source, held.data['date']), (None, 'scrape', 'someday'))
+
+    def test_refreshes_do_not_hold_a_row_twice(self):
+        data = [row('2024-01-02', open_price=0), row('someday'), row('2024-01-04')]
+        save_price_history(self.company, data)
+        save_price_history(self.company, data)
+        self.assertEqual(QuarantinedPriceRow.objects.count(), 2)
+        # A different undated row is still held
+        save_price_history(self.company, [row('someday', close=101)])
+        self.assertEqual(QuarantinedPriceRow.objects.count(), 3)
+
+    def test_imports_quarantine_known_companies_once(self):
+        csv = (
+            'symbol,date,open,high,low,close,volume\n'
+            'BANK,2024-01-02,0,1,1,1,5\n'
+            'BANK,someday,1,1,1,1,5\n'
+            'NOPE,2024-01-02,1,1,1,1,5\n'
+            'BANK,2024-01-03,1,2,1,1,5\n'
+        )
+        for _ in range(2):
+            report = import_price_history(io.StringIO(csv), 'csv')
+        self.assertEqual(report['rows_rejected'], 3)
+        self.assertEqual(
+            sorted(QuarantinedPriceRow.objects.values_list('source', 'reason')),
+            [('import', 'Invalid or missing date'), ('import', 'Prices must be positive')]
+        )
@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+_config = getattr(settings, 'STOCK_THROTTLE', {})
+THROTTLE_RATES = _config.get('RATES', {'admin': '1200/min', 'editor': '300/min'})
+THROTTLE_BURST = _config.get('BURST', {'admin': 100, 'editor': 30})
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str) -> float:
+    """
+    Turn a DRF-style rate such as ``'300/min'`` into tokens per second.
+    """
+    num, period = rate.split('/')
+    return int(num) / DURATIONS[period[0]]
+
+
+def take_token(state, now: float, capacity: float, refill: float):
+    """
+    Refill a ``(tokens, timestamp)`` bucket up to ``now`` and try to take one token.
+
+    Returns ``(allowed, new_state, wait_seconds)``.
+    """
+    tokens, last = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - last) * refill)
+    if tokens >= 1:
+        return True, (tokens - 1, now), 0.0
+    return False, (tokens, now), (1 - tokens) / refill
+
+
+class RoleTokenBucketThrottle(BaseThrottle):
+    """
+    Per-user token bucket whose rate and burst depend on ``request.user.role``.
+
+    Buckets live in Django's cache, keyed by user id. The read-modify-write is
+    not atomic, so concurrent requests from the same user can overshoot by a
+    few tokens; that is fine for shedding load.
+    """
+    scope = 'api'
+
+    def __init__(self) -> None:
+        self._wait = None
+
+    def get_bucket(self, request):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return None
+        role = getattr(user, 'role', None) or 'editor'
+        if role not in THROTTLE_RATES:
+            return None
+        key = f'stock:throttle:{self.scope}:{user.pk}'
+        return key, THROTTLE_BURST.get(role, 1), parse_rate(THROTTLE_RATES[role])
+
+    def allow_request(self, request, view):
+        bucket = self.get_bucket(request)
+        if bucket is None:
+            return True
+        key, capacity, refill = bucket
+        allowed, state, self._wait = take_token(cache.get(key), time.time(), capacity, refill)
+        cache.set(key, state, int(capacity / refill) + 1)
+        return allowed
+
+    async def aallow_request(self, request, view):
+        bucket = self.get_bucket(request)
+        if bucket is None:
+            return True
+        key, capacity, refill = bucket
+        allowed, state, self._wait = take_token(await cache.aget(key), time.time(), capacity, refill)
+        await cache.aset(key, state, int(capacity / refill) + 1)
+        return allowed
+
+    def wait(self):
+        return self._wait
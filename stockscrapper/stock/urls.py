@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'stock'
 
@@ -13,6 +13,10 @@ urlpatterns = [
          views.CompanyDetailAPIView.as_view(), 
          name='company-detail'),
 
+    path('search/', 
+         views.CompanySearchAPIView.as_view(), 
+         name='company-search'),
+
     # Price History endpoints
     path('price-history/', 
          views.PriceHistoryAPIView.as_view(), 
@@ -20,4 +24,39 @@ urlpatterns = [
     path('price-history/update/', 
          views.UpdatePriceHistoryAPIView.as_view(), 
          name='update-price-history'),
+    path('price-history/import/', 
+         views.ImportPriceHistoryAPIView.as_view(), 
+         name='import-price-history'),
+    path('price-history/gaps/', 
+         views.PriceGapsAPIView.as_view(), 
+         name='price-history-gaps'),
+
+    path('analytics/correlation/', 
+         views.CorrelationAPIView.as_view(), 
+         name='analytics-correlation'),
+
+    path('screener/', 
+         views.ScreenerAPIView.as_view(), 
+         name='screener'),
+
+    path('snapshot/', 
+         views.MarketSnapshotAPIView.as_view(), 
+         name='market-snapshot'),
+
+    # Async read endpoints, for ASGI deployments
+    path('async/', 
+         async_views.AsyncCompanyListAPIView.as_view(), 
+         name='async-company-list'),
+    path('async/<int:pk>/', 
+         async_views.AsyncCompanyDetailAPIView.as_view(), 
+         name='async-company-detail'),
+    path('async/price-history/', 
+         async_views.AsyncPriceHistoryAPIView.as_view(), 
+         name='async-price-history'),
+    path('async/price-history/stream/', 
+         async_views.PriceStreamView.as_view(), 
+         name='price-history-stream'),
+    path('async/snapshot/', 
+         async_views.AsyncMarketSnapshotAPIView.as_view(), 
+         name='async-market-snapshot'),
 ]
@@ -1,21 +1,94 @@
 import re
-import pandas as pd
+import json
 import time
-from datetime import date, timedelta
+from pathlib import Path
+from datetime import date, timedelta, datetime, timezone
 from selenium.webdriver import Chrome
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support.ui import Select
 from bs4 import BeautifulSoup
+from django.conf import settings
+
+from .fingerprints import ChangeDetector
+from .metrics import registry
 
 DRIVER_PATH = '/usr/bin/chromedriver'
 
+PRICE_TABLE_COLUMNS = ["sn", "date", "open_price", "high_price", "low_price", "close_price",
+                       "total_traded_quantity", "total_turnover", "previous_day_closing_price",
+                       "week_high_52", "week_low_52", "total_trades", "average_traded_price"]
+
+
+def parse_numeric(text):
+    try:
+        # Removes non-numeric characters except for dot and minus
+        return float(re.sub(r'[^\d.-]', '', text))
+    except ValueError:
+        return None
+
+
+def page_number(text: str) -> int | None:
+    """Page number shown by a paginator item ("page 3", "3"), None for Next/Previous/..."""
+    match = re.search(r'(\d[\d,]*)\s*$', text or '')
+    return int(match.group(1).replace(',', '')) if match else None
+
+
+def parse_price_table(html: str) -> list[dict]:
+    """Parses the tbody HTML of the #pricehistorys table into row dicts.
+
+    Works without a browser, so saved pages can be replayed offline.
+    """
+    soup = BeautifulSoup(html, 'lxml')
+    data = []
+    for row in soup.find_all('tr'):
+        row_data = {}
+        for i, col in enumerate(row.find_all('td')):
+            if i == 1:
+                row_data[PRICE_TABLE_COLUMNS[i]] = col.get_text(strip=True)
+            else:
+                row_data[PRICE_TABLE_COLUMNS[i]] = parse_numeric(
+                    col.get_text(strip=True)
+                )
+        data.append(row_data)
+    return data
+
+
+class PageRecorder:
+    """Saves each scraped page's tbody HTML and pagination state so the
+    scrape can be replayed later without a browser.
+
+    directory/
+        manifest.json
+        page_0001.html
+        ...
+    """
+
+    def __init__(self, directory: str | Path, url: str = '') -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.url = url
+        self.pages: list[dict] = []
+
+    def add_page(self, html: str, next_disabled: bool) -> None:
+        file_name = f'page_{len(self.pages) + 1:04d}.html'
+        (self.directory / file_name).write_text(html)
+        self.pages.append({'file': file_name, 'next_disabled': next_disabled})
+
+    def save(self) -> None:
+        manifest = {
+            'url': self.url,
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+            'pages': self.pages,
+        }
+        (self.directory / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+
 
 class Scrapper:
     def __init__(self, url: str, driver_path: str) -> None:
@@ -24,6 +97,7 @@ class Scrapper:
         self.driver: Chrome = self._setup_driver()
 
     def _setup_driver(self) -> Chrome:
+        started = time.perf_counter()
         options = Options()
         options.add_argument('--headless')
         options.add_argument('--no-sandbox')
@@ -32,6 +106,9 @@ class Scrapper:
         service = Service(self.driver_path)
         self.driver = Chrome(service=service, options=options)
         self.driver.set_window_size(1920, 1080)
+        self.driver_startup_seconds = time.perf_counter() - started
+        registry.observe('scraper_driver_startup_seconds', self.driver_startup_seconds,
+                         help='Time to start the Chrome driver')
         return self.driver
 
     def load_page(self, locator: tuple[str, str]) -> WebElement | None:
@@ -70,58 +147,219 @@ class Scrapper:
             return None
 
     def parse_numeric(self, text):
-        try:
-            # Removes non-numeric characters except for dot and minus
-            return float(re.sub(r'[^\d.-]', '', text))
-        except ValueError:
-            return None
+        return parse_numeric(text)
 
 
 class PriceHistoryScrapper(Scrapper):
-    def __init__(self, url: str, driver_path: str) -> None:
+    @classmethod
+    def for_company(cls, company, driver_path: str | None = None, record_dir: str | Path | None = None):
+        """
+        Scraper for the company's website; ``record_dir`` is the recordings
+        root, pages go to ``record_dir/<SYMBOL>/``
+        """
+        return cls(
+            url=company.website,
+            driver_path=driver_path or settings.DRIVER_PATH,
+            record_dir=Path(record_dir) / company.symbol if record_dir else None
+        )
+
+    def __init__(self, url: str, driver_path: str, record_dir: str | Path | None = None) -> None:
         super().__init__(url, driver_path)
+        self.recorder = PageRecorder(record_dir, url) if record_dir else None
         self.locator = (By.ID, 'pricehistory-tab')
         self.content_element = super().load_page(locator=self.locator)
         self.content_element.click()
         self.data = []
+        # Replaced by stock.fingerprints.detect_changes to skip unchanged pages
+        self.changes = ChangeDetector()
+        self.stats = {
+            'driver_startup_seconds': self.driver_startup_seconds,
+            'pages': 0,
+            'pages_skipped': 0,
+            'stopped_early': False,
+            'wait_seconds': 0.0,
+            'parse_seconds': 0.0,
+        }
+
+    PAGINATION = '#pricehistorys > div.pagination_ngx > pagination-controls > pagination-template > ul'
 
-    def _get_table_data(self):
+    # Page source: the methods below are all scrap_data and fetch_page need
+    # from the browser, and all ReplayPriceHistoryScrapper replaces
+
+    def _read_table(self) -> str:
+        """Waits for the current page's table and returns its tbody HTML."""
         tbody = super().wait_for_element(
             self.driver, locator=(
                 By.CSS_SELECTOR, '#pricehistorys > div.table-responsive > table > tbody'
             )
         )
-        soup = BeautifulSoup(tbody.get_attribute('outerHTML'), 'lxml')
-        rows = soup.find_all('tr')
-
-        columns = ["sn", "date", "open_price", "high_price", "low_price", "close_price",
-                   "total_traded_quantity", "total_turnover", "previous_day_closing_price",
-                   "week_high_52", "week_low_52", "total_trades", "average_traded_price"]
-
-        for row in rows:
-            cols = row.find_all('td')
-            row_data = {}
-            for i, col in enumerate(cols):
-                if i == 1:
-                    row_data[columns[i]] = col.get_text(strip=True)
-                else:
-                    row_data[columns[i]] = self.parse_numeric(
-                        col.get_text(strip=True)
-                    )
-            self.data.append(row_data)
+        return tbody.get_attribute('outerHTML')
 
-    def scrap_data(self):
-        next_button = super().wait_for_element(
-            self.driver, locator=(
-                By.CSS_SELECTOR, "#pricehistorys > div.pagination_ngx > pagination-controls > pagination-template > ul > li.pagination-next")
+    def _next_button(self):
+        return super().wait_for_element(
+            self.driver, locator=(By.CSS_SELECTOR, f'{self.PAGINATION} > li.pagination-next')
         )
+
+    def _is_last_page(self) -> bool:
+        return 'disabled' in self._next_button().get_attribute('class')
+
+    def _next_page(self) -> None:
+        self._next_button().click()
+
+    def _get_table_data(self, page: int | None = None):
+        """Reads the current page's table; with ``page``, a page whose hash
+        is unchanged since the last run is not parsed."""
+        started = time.perf_counter()
+        html = self._read_table()
+        waited = time.perf_counter() - started
+
+        self.stats['pages'] += 1
+        self.stats['wait_seconds'] += waited
+        registry.inc('scraper_pages_total', help='Price history pages scraped')
+        registry.observe('scraper_page_wait_seconds', waited,
+                         help='Time waiting for a price history page to load')
+
+        if page is not None and self.changes.skip_page(page, html):
+            self.stats['pages_skipped'] += 1
+            registry.inc('scraper_pages_skipped_total',
+                         help='Price history pages not parsed because their content was unchanged')
+            return html
+
+        started = time.perf_counter()
+        rows = parse_price_table(html)
+        self.data.extend(rows)
+        parsed = time.perf_counter() - started
+
+        if page is not None:
+            self.changes.parsed(rows)
+        self.stats['parse_seconds'] += parsed
+        registry.observe('scraper_page_parse_seconds', parsed,
+                         help='Time parsing a price history page')
+        return html
+
+    def fetch_page(self, number: int) -> list[dict]:
+        """Parses paginator page ``number`` only, jumping there through the
+        numbered page links instead of reading every page on the way.
+
+        Returns [] past the last page.
+        """
+        if not self._go_to_page(number):
+            return []
+        before = len(self.data)
+        self._get_table_data()
+        return self.data[before:]
+
+    def _current_page(self, driver=None) -> int:
+        current = (driver or self.driver).find_element(By.CSS_SELECTOR, f'{self.PAGINATION} > li.current')
+        return page_number(current.text) or 1
+
+    def _go_to_page(self, number: int) -> bool:
+        current = self._current_page()
+        while current != number:
+            links = {}
+            for link in self.driver.find_elements(By.CSS_SELECTOR, f'{self.PAGINATION} > li > a'):
+                page = page_number(link.text)
+                if page:
+                    links[page] = link
+
+            if number in links:
+                target = number
+            else:
+                # ngx-pagination shows a window of pages; hop to its far end
+                between = [page for page in links if min(current, number) < page < max(current, number)]
+                if not between:
+                    return False
+                target = max(between) if number > current else min(between)
+
+            links[target].click()
+            WebDriverWait(
+                self.driver, timeout=10, ignored_exceptions=[StaleElementReferenceException]
+            ).until(lambda driver: self._current_page(driver) == target)
+            current = target
+        return True
+
+    def scrap_data(self):
+        page = 1
         while True:
-            self._get_table_data()
-            next_button = super().wait_for_element(
-                self.driver, locator=(
-                    By.CSS_SELECTOR, "#pricehistorys > div.pagination_ngx > pagination-controls > pagination-template > ul > li.pagination-next")
-            )
-            if 'disabled' in next_button.get_attribute('class'):
+            html = self._get_table_data(page)
+            next_disabled = self._is_last_page()
+            if self.recorder:
+                self.recorder.add_page(html, next_disabled)
+            if next_disabled:
+                break
+            # Newest rows come first, so nothing older has changed either
+            if self.changes.done:
+                self.stats['stopped_early'] = True
                 break
-            next_button.click()
-        return self.data
\ No newline at end of file
+            self._next_page()
+            page += 1
+        if self.recorder:
+            self.recorder.save()
+        registry.inc('scraper_runs_total', help='Completed price history scrapes')
+        registry.observe('scraper_run_pages', self.stats['pages'],
+                         help='Pages per price history scrape')
+        return self.data
+
+
+class ReplayPriceHistoryScrapper(PriceHistoryScrapper):
+    """Runs the scrap_data loop over pages saved by PageRecorder, without a
+    browser, so the parse and save pipeline can be profiled at full CPU speed.
+
+    Only the page source is replaced; pagination, parsing, change detection
+    and stats are PriceHistoryScrapper's own. Pass either the recording
+    directory or the tbody HTML pages themselves.
+    """
+
+    @classmethod
+    def for_company(cls, company, record_dir: str | Path | None = None, pages: list[str] | None = None):
+        """
+        Replay ``record_dir/<SYMBOL>/``, or the given pages
+        """
+        if record_dir is not None:
+            return cls(Path(record_dir) / company.symbol)
+        return cls(pages=pages)
+
+    def __init__(self, record_dir: str | Path | None = None, pages: list[str] | None = None) -> None:
+        # No browser: PriceHistoryScrapper.__init__ would start one
+        self.driver = None
+        self.recorder = None
+        self.data = []
+        self.changes = ChangeDetector()
+        self.stats = {
+            'driver_startup_seconds': 0.0,
+            'pages': 0,
+            'pages_skipped': 0,
+            'stopped_early': False,
+            'wait_seconds': 0.0,
+            'parse_seconds': 0.0,
+        }
+        if record_dir is not None:
+            record_dir = Path(record_dir)
+            manifest = json.loads((record_dir / 'manifest.json').read_text())
+            self.url = manifest['url']
+            self.pages = [
+                ((record_dir / page['file']).read_text(), page['next_disabled'])
+                for page in manifest['pages']
+            ]
+        else:
+            self.url = ''
+            pages = pages or []
+            self.pages = [(html, i == len(pages) - 1) for i, html in enumerate(pages)]
+        self.current = 1
+
+    def _read_table(self) -> str:
+        if not 1 <= self.current <= len(self.pages):
+            return '<tbody></tbody>'
+        return self.pages[self.current - 1][0]
+
+    def _is_last_page(self) -> bool:
+        return self.current >= len(self.pages) or self.pages[self.current - 1][1]
+
+    def _next_page(self) -> None:
+        self.current += 1
+
+    def _go_to_page(self, number: int) -> bool:
+        if not 1 <= number <= len(self.pages):
+            return False
+        self.current = number
+        return True
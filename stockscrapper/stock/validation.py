@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .models import PriceHistory, TradingDay
+
+
+PRICE_COLUMNS = ['open_price', 'high_price', 'low_price', 'close_price']
+
+# DecimalField(max_digits=10, decimal_places=2) and PositiveIntegerField bounds
+MAX_PRICE = 10 ** 8
+MAX_VOLUME = 2 ** 31 - 1
+
+_config = getattr(settings, 'STOCK_VALIDATION', {})
+
+# Absolute close-to-close log return above which a one-day spike (a jump
+# immediately reversed) is treated as a bad row. Single level shifts, such as
+# bonus or rights adjustments, are not flagged.
+OUTLIER_JUMP = _config.get('OUTLIER_JUMP', 0.4)
+
+# Trading calendar gaps listed in the report; the count is always complete
+REPORT_GAPS_LIMIT = 50
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Parse dates in the formats the scraper save path accepts (YYYY-MM-DD, DD/MM/YYYY)
+    """
+    dates = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+    fallback = pd.to_datetime(values[dates.isna()], format='%d/%m/%Y', errors='coerce')
+    return dates.fillna(fallback)
+
+
+def ohlc_rejections(frame: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized version of the PriceHistoryAdmin.save_model / PriceHistorySerializer
+    checks. Returns the rejection reason per row, or '' for valid rows.
+
+    Expects parsed ``date`` (datetime64, NaT when unparseable), the price columns
+    and ``volume`` as floats (NaN when missing or unparseable).
+    """
+    reasons = pd.Series('', index=frame.index, dtype=object)
+
+    def flag(mask, reason):
+        reasons[np.asarray(mask) & (reasons == '').to_numpy()] = reason
+
+    flag(frame['date'].isna(), 'Invalid or missing date')
+    flag(frame[PRICE_COLUMNS + ['volume']].isna().any(axis=1), 'Missing or non-numeric price or volume')
+    flag((frame[PRICE_COLUMNS] <= 0).any(axis=1), 'Prices must be positive')
+    flag((frame[PRICE_COLUMNS] >= MAX_PRICE).any(axis=1), 'Price out of range')
+    flag(frame['volume'] < 0, 'Volume must not be negative')
+    flag(frame['volume'] > MAX_VOLUME, 'Volume out of range')
+    flag(frame['high_price'] < frame['low_price'], 'High price must be greater than low price')
+    flag(
+        (frame['open_price'] < frame['low_price']) | (frame['open_price'] > frame['high_price']),
+        'Open price must be between high and low prices'
+    )
+    flag(
+        (frame['close_price'] < frame['low_price']) | (frame['close_price'] > frame['high_price']),
+        'Close price must be between high and low prices'
+    )
+    return reasons
+
+
+def scraped_frame(scrapped_data: list[dict]) -> pd.DataFrame:
+    """
+    Scraped row dicts as a frame with parsed date, price and volume columns.
+    Missing values stay NaN/NaT instead of defaulting to zero.
+    """
+    raw = pd.DataFrame.from_records(scrapped_data)
+    frame = pd.DataFrame(index=raw.index)
+    frame['date'] = parse_dates(raw['date'].astype(str) if 'date' in raw else pd.Series('', index=raw.index))
+    for column in PRICE_COLUMNS:
+        frame[column] = pd.to_numeric(raw[column], errors='coerce') if column in raw else np.nan
+    volume = raw.get('total_traded_quantity', raw.get('volume'))
+    frame['volume'] = pd.to_numeric(volume, errors='coerce') if volume is not None else np.nan
+    frame[PRICE_COLUMNS] = frame[PRICE_COLUMNS].round(2)
+    return frame
+
+
+def validate_price_batch(company, scrapped_data: list[dict]) -> dict:
+    """
+    Validate a whole scraped batch for one company at once.
+
+    Returns a dict with:
+        valid       - frame of rows to save
+        rejected    - frame of rows to quarantine, with a ``reason`` column
+        duplicates  - identical repeated rows dropped silently
+        gaps        - trading days (dates any company traded) missing for this company
+        gap_count   - total number of such days in the batch's date range
+    """
+    frame = scraped_frame(scrapped_data)
+    reasons = ohlc_rejections(frame)
+    ok = reasons == ''
+
+    # Pages can shift while paging, repeating a row: drop exact repeats,
+    # quarantine dates that come back with different values
+    exact = ok & frame.duplicated(subset=['date'] + PRICE_COLUMNS + ['volume'], keep='first')
+    ok &= ~exact
+    conflicting = ok & frame['date'].where(ok).duplicated(keep=False)
+    reasons[conflicting] = 'Conflicting duplicate date in batch'
+    ok &= ~conflicting
+
+    # One-day spikes: a large move into the row immediately reversed out of it
+    ordered = frame[ok].sort_values('date')
+    if len(ordered) > 2:
+        returns = np.log(ordered['close_price']).diff()
+        following = returns.shift(-1)
+        spike = (
+            (returns.abs() > OUTLIER_JUMP)
+            & (following.abs() > OUTLIER_JUMP)
+            & (np.sign(returns) != np.sign(following))
+        )
+        spike_index = ordered.index[spike.to_numpy()]
+        reasons[spike_index] = 'Outlier price jump'
+        ok[spike_index] = False
+
+    valid = frame[ok]
+    rejected = frame[reasons != ''].assign(reason=reasons[reasons != ''])
+
+    gaps = []
+    if not valid.empty:
+        start, end = valid['date'].min().date(), valid['date'].max().date()
+        calendar = set(
+            TradingDay.objects.filter(date__range=(start, end))
+            .values_list('date', flat=True)
+        )
+        stored = set(
+            PriceHistory.objects.filter(company=company, date__range=(start, end))
+            .values_list('date', flat=True)
+        )
+        gaps = sorted(calendar - stored - set(valid['date'].dt.date))
+
+    return {
+        'valid': valid,
+        'rejected': rejected,
+        'duplicates': int(exact.sum()),
+        'gaps': gaps[:REPORT_GAPS_LIMIT],
+        'gap_count': len(gaps),
+    }
@@ -2,29 +2,72 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from .serializers import CompanySerializer, PriceHistorySerializer
-from django.db.models import Q
+from .serializers import CompanySerializer, PriceHistorySerializer, SnapshotSerializer
+from django.core.cache import cache
 from .models import PriceHistory, Company
+from .pagination import CompanyPagination, paginated_data
+from .caching import analytics_cache_key, company_list_cache_key, COMPANY_LIST_CACHE_TIMEOUT
+from .resolvers import symbol_resolver
+from .search import company_search_index
+from .downsample import downsample_price_rows, PRICE_HISTORY_COLUMNS
+from .adjustments import adjust_rows, adjust_serialized, adjustment_table
+from .metrics import record_phase, registry
+from .services import save_price_history
+from .fingerprints import detect_changes, remember_pages
+from .admission import AdmissionRejected, scrape_admission, scrape_priority
+from .throttling import RoleTokenBucketThrottle
+from .queries import (
+    QueryParamError, adjusted_param, analytics_params, company_list_queryset, date_range_params,
+    downsample_params, latest_prices_queryset, price_history_filter
+)
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 from datetime import datetime
-from .utils import PriceHistoryScrapper
-from datetime import datetime
+from .scrapers import get_scraper
+from .gaps import estimate_pages, find_gaps
+from . import analytics
+from .screener import ExpressionError, screen
 from rest_framework.permissions import IsAuthenticated
-from account.permissions import IsAdminOrEditorReadOnly
-
+from account.authentication import STATELESS_AUTHENTICATION_CLASSES
+from account.permissions import IsAdmin, IsAdminOrEditorReadOnly
+from rest_framework.parsers import MultiPartParser
 
-DRIVER_PATH = '/usr/bin/chromedriver'
 
 
 class CompanyListCreateAPIView(APIView):
     """
     List all companies or create a new company
     """
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
+    throttle_classes = [RoleTokenBucketThrottle]
 
     def get(self, request):
-        companies = Company.objects.all()
-        serializer = CompanySerializer(companies, many=True)
-        return Response(serializer.data)
+        cache_key = company_list_cache_key(request.query_params)
+        # Cached without links; those depend on the requesting host
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response(paginated_data(request, **cached))
+
+        try:
+            companies, fields = company_list_queryset(request.query_params)
+        except QueryParamError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = CompanyPagination()
+        page = paginator.paginate_queryset(companies, request, view=self)
+        serializer = CompanySerializer(page, many=True, fields=fields)
+        with record_phase('serialize'):
+            data = serializer.data
+        page_data = {
+            'count': paginator.page.paginator.count,
+            'page_number': paginator.page.number,
+            'page_size': paginator.page.paginator.per_page,
+            'results': data,
+        }
+        cache.set(cache_key, page_data, COMPANY_LIST_CACHE_TIMEOUT)
+        return Response(paginated_data(request, **page_data))
 
     def post(self, request):
         serializer = CompanySerializer(data=request.data)
@@ -39,7 +82,9 @@ class CompanyDetailAPIView(APIView):
     Retrieve, update or delete a company instance
     """
 
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
+    throttle_classes = [RoleTokenBucketThrottle]
 
     def get_object(self, pk):
         return get_object_or_404(Company, pk=pk)
@@ -47,7 +92,9 @@ class CompanyDetailAPIView(APIView):
     def get(self, request, pk):
         company = self.get_object(pk)
         serializer = CompanySerializer(company)
-        return Response(serializer.data)
+        with record_phase('serialize'):
+            data = serializer.data
+        return Response(data)
 
     def put(self, request, pk):
         company = self.get_object(pk)
@@ -63,6 +110,37 @@ class CompanyDetailAPIView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class CompanySearchAPIView(APIView):
+    """
+    Typeahead search over company symbols and names
+    """
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
+    throttle_classes = [RoleTokenBucketThrottle]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        fuzzy = request.query_params.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+
+        if not query.strip():
+            return Response(
+                {'error': 'Search query q is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response(
+                {'error': 'Invalid limit format. Must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, 100))
+
+        results = company_search_index.search(query, limit=limit, fuzzy=fuzzy)
+        return Response({'query': query, 'results': results})
+
+
 # Price History
 
 class PriceHistoryAPIView(APIView):
@@ -70,15 +148,13 @@ class PriceHistoryAPIView(APIView):
     Retrieve price history with filtering capabilities
     """
 
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
+    throttle_classes = [RoleTokenBucketThrottle]
 
     def get(self, request):
         try:
             company_symbol = request.query_params.get('symbol')
-            start_date = request.query_params.get('start_date')
-            end_date = request.query_params.get('end_date')
-            min_price = request.query_params.get('min_price')
-            max_price = request.query_params.get('max_price')
 
             # Validate company symbol
             if not company_symbol:
@@ -89,67 +165,24 @@ class PriceHistoryAPIView(APIView):
 
             # Get company
             try:
-                company = Company.objects.get(symbol=company_symbol.upper())
+                company = symbol_resolver.resolve(company_symbol)
             except Company.DoesNotExist:
                 return Response(
                     {'error': f'Company with symbol {company_symbol} not found'}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Build query
-            query = Q(company=company)
-
-            # Add date filters if provided
-            if start_date:
-                try:
-                    start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                    query &= Q(date__gte=start_date)
-                except ValueError:
-                    return Response(
-                        {'error': 'Invalid start_date format. Use YYYY-MM-DD'}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-            if end_date:
-                try:
-                    end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-                    query &= Q(date__lte=end_date)
-                except ValueError:
-                    return Response(
-                        {'error': 'Invalid end_date format. Use YYYY-MM-DD'}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-            # price range filters if provided
-            if min_price:
-                try:
-                    min_price = float(min_price)
-                    query &= (
-                        Q(open_price__gte=min_price) |
-                        Q(close_price__gte=min_price) |
-                        Q(high_price__gte=min_price) |
-                        Q(low_price__gte=min_price)
-                    )
-                except ValueError:
-                    return Response(
-                        {'error': 'Invalid min_price format. Must be a number'}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-            if max_price:
-                try:
-                    max_price = float(max_price)
-                    query &= (
-                        Q(open_price__lte=max_price) |
-                        Q(close_price__lte=max_price) |
-                        Q(high_price__lte=max_price) |
-                        Q(low_price__lte=max_price)
-                    )
-                except ValueError:
-                    return Response(
-                        {'error': 'Invalid max_price format. Must be a number'}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+            try:
+                query = price_history_filter(company, request.query_params)
+                # Downsampling for charts: ?max_points=800&mode=candle|line
+                max_points, mode = downsample_params(request.query_params)
+                # Split/bonus/rights adjusted prices: ?adjusted=true
+                adjusted = adjusted_param(request.query_params)
+            except QueryParamError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if max_points:
+                return self._downsampled_response(company, query, max_points, mode, adjusted)
 
             # Get price history
             price_history = PriceHistory.objects.filter(query).order_by('-date')
@@ -163,13 +196,19 @@ class PriceHistoryAPIView(APIView):
 
             # Serialize data
             serializer = PriceHistorySerializer(price_history, many=True)
+            with record_phase('serialize'):
+                data = serializer.data
+                if adjusted:
+                    data = adjust_serialized(adjustment_table(company), data)
 
             response_data = {
                 'company_symbol': company.symbol,
                 'company_name': company.name,
                 'total_records': price_history.count(),
-                'price_history': serializer.data
+                'price_history': data
             }
+            if adjusted:
+                response_data['adjusted'] = True
 
             return Response(response_data, status=status.HTTP_200_OK)
 
@@ -179,12 +218,186 @@ class PriceHistoryAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _downsampled_response(self, company, query, max_points, mode, adjusted=False):
+        """
+        Fetch the matching rows in one values_list query and reduce them to max_points
+        """
+        rows = list(
+            PriceHistory.objects.filter(query)
+            .order_by('date')
+            .values_list(*PRICE_HISTORY_COLUMNS)
+        )
+
+        if not rows:
+            return Response(
+                {'error': 'No price history found for the specified criteria'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        if adjusted:
+            rows = adjust_rows(adjustment_table(company), rows)
+
+        with record_phase('serialize'):
+            points = downsample_price_rows(rows, max_points, mode)
+
+        # Newest first, like the regular response
+        points.reverse()
+
+        response_data = {
+            'company_symbol': company.symbol,
+            'company_name': company.name,
+            'total_records': len(rows),
+            'mode': mode,
+            'points': len(points),
+            'price_history': points
+        }
+        if adjusted:
+            response_data['adjusted'] = True
+
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class PriceGapsAPIView(APIView):
+    """
+    Trading days missing from stored price history, per company or for one symbol
+    """
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
+    throttle_classes = [RoleTokenBucketThrottle]
+
+    def get(self, request):
+        try:
+            start_date, end_date = date_range_params(request.query_params)
+        except QueryParamError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        company_symbol = request.query_params.get('symbol')
+        if company_symbol:
+            try:
+                company = symbol_resolver.resolve(company_symbol)
+            except Company.DoesNotExist:
+                return Response(
+                    {'error': f'Company with symbol {company_symbol} not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            missing = find_gaps([company.pk], start_date, end_date).get(company.pk, [])
+            pages = estimate_pages(missing)
+            return Response({
+                'company_symbol': company.symbol,
+                'gap_count': len(missing),
+                'gaps': missing,
+                'pages': sorted(set(pages.values())),
+            })
+
+        gaps = find_gaps(start=start_date, end=end_date)
+        symbols = dict(Company.objects.filter(pk__in=gaps).values_list('pk', 'symbol'))
+        companies = [
+            {
+                'company_symbol': symbols[company_id],
+                'gap_count': len(missing),
+                'first_gap': missing[0],
+                'last_gap': missing[-1],
+            }
+            for company_id, missing in gaps.items()
+        ]
+        companies.sort(key=lambda row: row['company_symbol'])
+        return Response({
+            'total_gaps': sum(row['gap_count'] for row in companies),
+            'companies': companies,
+        })
+
+
+class MarketSnapshotAPIView(APIView):
+    """
+    Latest price of every company, optionally filtered by sector
+    """
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
+    throttle_classes = [RoleTokenBucketThrottle]
+
+    def get(self, request):
+        latest = latest_prices_queryset(request.query_params.get('sector'))
+        serializer = SnapshotSerializer(latest, many=True)
+        with record_phase('serialize'):
+            data = serializer.data
+        return Response({'count': len(data), 'results': data})
+
+
+class CorrelationAPIView(APIView):
+    """
+    Log-return correlation, covariance and market/sector betas across companies
+    """
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
+    throttle_classes = [RoleTokenBucketThrottle]
+
+    def get(self, request):
+        try:
+            params = analytics_params(request.query_params, analytics.DEFAULT_WINDOW, analytics.MAX_WINDOW)
+        except QueryParamError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Computed once per price data version, not per request
+        cache_key = analytics_cache_key('correlation', params)
+        report = cache.get(cache_key)
+        if report is None:
+            with record_phase('compute'):
+                report = analytics.correlation_report(**params)
+            if report is None:
+                return Response(
+                    {'error': 'No price history found for the specified criteria'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            cache.set(cache_key, report, analytics.CACHE_TIMEOUT)
+
+        if not report['symbols']:
+            return Response(
+                {'error': 'No companies with prices match the specified criteria'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(report)
+
+
+class ScreenerAPIView(APIView):
+    """
+    Companies whose latest prices and indicators match a filter expression
+    """
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
+    throttle_classes = [RoleTokenBucketThrottle]
+
+    def get(self, request):
+        expression = request.query_params.get('q')
+        if not expression:
+            return Response(
+                {'error': 'Filter expression q is required, e.g. q=close > sma_50'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get('limit', 50))
+            if not 1 <= limit <= 500:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {'error': 'Invalid limit. Must be an integer from 1 to 500'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with record_phase('screen'):
+                result = screen(expression, request.query_params.get('sort'), limit)
+        except ExpressionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'expression': expression, **result})
+
 
 # view for scraping and updating price history
 class UpdatePriceHistoryAPIView(APIView):
     """
     API endpoint for manually triggering price history update for a company
     """
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated, IsAdminOrEditorReadOnly]
 
     def post(self, request):
@@ -198,45 +411,41 @@ class UpdatePriceHistoryAPIView(APIView):
                 )
 
             try:
-                company = Company.objects.get(symbol=company_symbol.upper())
+                company = symbol_resolver.resolve(company_symbol)
             except Company.DoesNotExist:
                 return Response(
                     {'error': f'Company with symbol {company_symbol} not found'}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Initialize scraper and update data
-            scraper = None
+            # Read every page instead of skipping unchanged ones
+            full = str(request.data.get('full', '')).lower() in ('1', 'true', 'yes')
+
             try:
-                scraper = PriceHistoryScrapper(
-                    url=company.website, 
-                    driver_path=DRIVER_PATH
+                payload, shared = scrape_admission.run(
+                    company.pk,
+                    lambda: self._scrape(company, full),
+                    priority=scrape_priority(request.user)
+                )
+            except AdmissionRejected as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': str(e.retry_after)}
                 )
-                scraped_data = scraper.scrap_data()
-                
-                if not scraped_data:
-                    return Response(
-                        {'error': 'No data found to update'}, 
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-
-                # Save scraped data
-                saved_entries = self._save_price_history(company, scraped_data)
-                
-                return Response({
-                    'message': 'Price history updated successfully',
-                    'company_symbol': company.symbol,
-                    'records_updated': len(saved_entries)
-                }, status=status.HTTP_200_OK)
-
             except Exception as e:
                 return Response(
                     {'error': f'Error updating price history: {str(e)}'}, 
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
-            finally:
-                if scraper and scraper.driver:
-                    scraper.driver.quit()
+
+            if payload is None:
+                return Response(
+                    {'error': 'No data found to update'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            return Response({**payload, 'shared': shared}, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response(
@@ -244,48 +453,97 @@ class UpdatePriceHistoryAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    # @transaction.atomic
-    def _save_price_history(self, company, scrapped_data):
+    def _scrape(self, company, full=False):
+        """
+        Scrape and save one company; returns the response payload, or None
+        when the page had no rows. ``full`` reads every page.
+        """
+        scraper = None
+        try:
+            scraper = get_scraper(company)
+            detect_changes(scraper, company, full=full)
+            scraped_data = scraper.scrap_data()
+            
+            # Pages skipped as unchanged still count as found
+            if not scraped_data and not scraper.stats['pages_skipped']:
+                return None
+
+            # Save scraped data
+            validation = {}
+            saved_entries = self._save_price_history(company, scraped_data, validation)
+            remember_pages(scraper, company)
+            
+            return {
+                'message': 'Price history updated successfully',
+                'company_symbol': company.symbol,
+                'records_updated': len(saved_entries),
+                'scrape': {**scraper.stats, 'full_pass': scraper.changes.full},
+                'validation': validation
+            }
+        finally:
+            if scraper and scraper.driver:
+                scraper.driver.quit()
+
+    def _save_price_history(self, company, scrapped_data, report=None):
         """
         Save scraped data to database
         """
-        saved_entries = []
-        
-        for entry in scrapped_data:
-            try:
-                # Convert date string to date object if needed
-                date_str = entry.get('date')
-                if isinstance(date_str, str):
-                    try:
-                        for date_format in ['%Y-%m-%d', '%d/%m/%Y']:
-                            try:
-                                date_obj = datetime.strptime(date_str, date_format).date()
-                                break
-                            except ValueError:
-                                continue
-                    except ValueError:
-                        print(f"Invalid date format: {date_str}")
-                        continue
-                else:
-                    date_obj = date_str
-
-                # Create or update price history entry
-                price_history, created = PriceHistory.objects.update_or_create(
-                    company=company,
-                    date=date_obj,
-                    defaults={
-                        'open_price': entry.get('open_price', 0.0),
-                        'high_price': entry.get('high_price', 0.0),
-                        'low_price': entry.get('low_price', 0.0),
-                        'close_price': entry.get('close_price', 0.0),
-                        'volume': entry.get('total_traded_quantity', 0)
-                    }
-                )
-                
-                saved_entries.append(price_history)
-                
-            except Exception as e:
-                print(f"Error saving entry for date {entry.get('date')}: {e}")
-                continue
+        return save_price_history(company, scrapped_data, report)
+
+
+class ImportPriceHistoryAPIView(APIView):
+    """
+    Admin-only bulk upload of price history from a CSV or XLSX file
+    """
+    authentication_classes = STATELESS_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdmin]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        # pandas/openpyxl are only loaded by processes that take imports
+        from .importers import PriceHistoryImportError, import_price_history
+
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {'error': 'A CSV or XLSX file is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        return saved_entries
\ No newline at end of file
+        try:
+            report = import_price_history(upload, symbol=request.data.get('symbol') or None)
+        except PriceHistoryImportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'error': f'Error importing price history: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response(report, status=status.HTTP_200_OK)
+
+
+def metrics_access_allowed(request) -> bool:
+    """
+    Staff session, the STOCK_METRICS bearer token, or an allowlisted address
+    """
+    config = getattr(settings, 'STOCK_METRICS', {})
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+
+    token = config.get('TOKEN')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and constant_time_compare(header[len('Bearer '):], token):
+        return True
+
+    return request.META.get('REMOTE_ADDR') in config.get('ALLOWED_IPS', ())
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of the request, scraper and cache metrics
+    """
+    if not metrics_access_allowed(request):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
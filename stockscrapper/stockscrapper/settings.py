@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'stock.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,6 +89,129 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Swap for a shared backend (Redis/Memcached) when running several workers
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stockscrapper',
+    }
+}
+
+# Seconds a company list page stays cached; saves and deletes invalidate it earlier
+COMPANY_LIST_CACHE_TIMEOUT = 300
+
+# Symbol -> Company lookups used by the price history endpoints.
+# SHARED_CACHE also stores entries in the default cache so workers share them.
+STOCK_SYMBOL_RESOLVER = {
+    'MAXSIZE': 1024,
+    'TTL': 300,
+    'SHARED_CACHE': False,
+}
+
+# In-memory company typeahead index; MAX_AGE seconds before a full rebuild
+STOCK_SEARCH_INDEX = {
+    'MAX_AGE': 300,
+    'MIN_SIMILARITY': 0.3,
+}
+
+
+# Scraped batch validation; see stock/validation.py
+STOCK_VALIDATION = {
+    'OUTLIER_JUMP': 0.4,
+}
+
+# Who may read /metrics besides staff users: scrapers presenting
+# "Authorization: Bearer <TOKEN>" and these client addresses
+STOCK_METRICS = {
+    'TOKEN': '',
+    'ALLOWED_IPS': [],
+}
+
+# Server-Sent Events price stream: per-client event buffer and keepalive seconds
+STOCK_PUSH = {
+    'QUEUE_SIZE': 100,
+    'KEEPALIVE': 15,
+    # Seconds between polls for new PriceEvent rows while a stream is open
+    'POLL_INTERVAL': 1.0,
+    # PriceEvent rows older than this are deleted as new ones are published
+    'RETENTION_SECONDS': 600,
+}
+
+# Per-role token buckets for the read endpoints: sustained rate and burst size
+STOCK_THROTTLE = {
+    'RATES': {'admin': '1200/min', 'editor': '300/min'},
+    'BURST': {'admin': 100, 'editor': 30},
+}
+
+# Browser scrapes across every process sharing the default cache: concurrent
+# limit, waiting queue (lower priority value is admitted first) and how long
+# a request may wait
+STOCK_SCRAPE_ADMISSION = {
+    'MAX_IN_FLIGHT': 2,
+    'MAX_QUEUED': 8,
+    'QUEUE_TIMEOUT': 30,
+    'SHARED_TIMEOUT': 300,
+    # Seconds between cache polls of a request waiting for a slot or a shared scrape
+    'POLL_INTERVAL': 0.2,
+    'ROLE_PRIORITY': {'admin': 0, 'editor': 1},
+}
+
+# Gap repairs: rows per page of the site's price history table and how many
+# neighbouring pages to try when the estimated page misses a date
+STOCK_GAPS = {
+    'PAGE_SIZE': 20,
+    'MAX_PROBES': 3,
+}
+
+# Memory-mapped per-company price series (stock.series_store), kept current
+# after every save; rebuild with manage.py rebuild_series
+STOCK_SERIES_STORE = {
+    'ENABLED': True,
+    'DIRECTORY': BASE_DIR / 'series',
+}
+
+# Tests write series files to a temporary directory instead of the store above
+TEST_RUNNER = 'stock.test_runner.StockTestRunner'
+
+# Correlation/beta analytics: default and largest window in daily returns,
+# fewest common returns for a statistic, and result cache lifetime (seconds).
+# Results are also keyed on the price data version; the lifetime bounds how
+# stale a process can serve them when another process saved the prices
+STOCK_ANALYTICS = {
+    'DEFAULT_WINDOW': 250,
+    'MAX_WINDOW': 1250,
+    'MIN_PERIODS': 20,
+    'CACHE_TIMEOUT': 300,
+}
+
+# Screener expressions: longest indicator period (sessions), size limits,
+# the latency budget (slower screens are counted in /metrics) and how long a
+# process reuses its market arrays (seconds)
+STOCK_SCREENER = {
+    'MAX_PERIOD': 250,
+    'MAX_LENGTH': 500,
+    'MAX_NODES': 100,
+    'BUDGET_MS': 200,
+    'FRAME_TTL': 60,
+}
+
+# Skip price history pages whose content hash is unchanged since the last
+# scrape. STOP_AFTER_UNCHANGED > 0 also stops paginating after that many
+# unchanged pages in a row, which misses corrections to older rows until the
+# next full pass; FULL_PASS_SECONDS is how often every page is read anyway.
+STOCK_CHANGE_DETECTION = {
+    'ENABLED': True,
+    'STOP_AFTER_UNCHANGED': 0,
+    'FULL_PASS_SECONDS': 7 * 86400,
+}
+
+# Add a Server-Timing header (db, serialize, total) to every response
+STOCK_SERVER_TIMING = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -130,14 +254,29 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 DRIVER_PATH = '/usr/bin/chromedriver'
 
+# Scraper classes by name, imported only when a scrape runs
+STOCK_SCRAPER_BACKENDS = {
+    'selenium': 'stock.utils.PriceHistoryScrapper',
+    'replay': 'stock.utils.ReplayPriceHistoryScrapper',
+}
+STOCK_SCRAPER_BACKEND = 'selenium'
+
+# Shared scrape queue (manage.py scrape_worker): lease length, how often each
+# company is refreshed, and how soon a failed scrape is retried, in seconds
+STOCK_SCRAPE_QUEUE = {
+    'LEASE_SECONDS': 300,
+    'INTERVAL_SECONDS': 86400,
+    'RETRY_SECONDS': 900,
+}
+
 AUTH_USER_MODEL = 'account.CustomUser'
 
 # REST Framework configs
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.BasicAuthentication',
+        'account.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
     ),
 }
 
@@ -147,6 +286,13 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer', 'JWT'),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    'TOKEN_OBTAIN_SERIALIZER': 'account.serializers.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'account.serializers.RoleTokenRefreshSerializer',
+}
+
+# Seconds a user loaded by CachedJWTAuthentication stays in the cache.
+ACCOUNT_AUTH = {
+    'USER_CACHE_TIMEOUT': 60,
 }
 
 DJOSER = {